@@ -0,0 +1,140 @@
+# ai_player.py
+
+# ===================================================================================
+# コンピュータ側のプレイヤー(AI)をまとめたファイルです。
+# どのプレイヤーも choose_action(engine) で「次の行動」を返すだけで、
+# 盤面を直接書き換えることはありません(行動の適用は GameEngine が行います)。
+# ===================================================================================
+
+import random
+from constants import *
+from cube_geometry import geometry
+
+STANDARD_GEOMETRY = geometry()   # g を省略したときのキューブ(3×3×3)
+from search import AlphaBetaSearch, action_from_code
+from maxn import MaxNSearch
+
+# --- AIの思考ロジックをまとめたクラス ---
+class AIPlayer:
+    # ... (AIの思考ロジック。2人対戦ではアルファベータ探索で、3人対戦では paranoid / max-n 探索で depth 手先まで読む)
+    # tablebase(tablebase.Tablebase)を渡すと、ノーマルモードで表に載っている局面は探索せずに表の手を指す
+    # (表の一番長い決着までの手数が探索の深さ以下なら、探索で同じことが分かるので、表は引かない)
+    # 3人対戦は、ほかの2人が組んでいるものとして読む paranoid が既定。multi='maxn' で max-n にする(maxn.py)
+    # (max-n はほかの2人もそれぞれ最善を尽くすと見るので、相手の勝ちを防がない greedy などには負けやすい)
+    # 既定の depth=4 は、序盤なら 0.1 秒以内に読み切るが、2人対戦の中盤では 4 万局面ほど(0.3〜0.4 秒)調べることがあり、
+    # time_limit の 0.4 秒に収まらなかった局面では、読み終えた深さ 3 の結果を指す(読めた深さは search.completed_depth)
+    def __init__(self, marker='X', rng=None, depth=4, time_limit=0.4, tablebase=None, multi='paranoid'):
+        self.marker = marker
+        self.rng = rng if rng is not None else random
+        self.search = AlphaBetaSearch(depth=depth, time_limit=time_limit)
+        self.multi_search = MaxNSearch(depth=depth, time_limit=time_limit, paranoid=multi == 'paranoid')
+        self.tablebase = tablebase
+        self.nodes = 0   # 直前の1手で探索した局面の数(探索しなかった手は0)
+
+    def make_move(self, engine):
+        # ... (行動を選んで、そのままエンジンに適用する)
+        return engine.apply_action(self.choose_action(engine))
+
+    def choose_action(self, engine, progress=None, cancel=None):
+        # ... (次の行動を返す。progress(深さ, 行動) を渡すと、読み終えた深さごとにその時点の最善手を知らせる)
+        # cancel(threading.Event)がセットされると、探索を打ち切ってそこまでの最善手を返す
+        game_logic = engine.game
+        self.nodes = 0
+        if engine.ruleset == 'custom':
+            golden_eggs = [pos for pos, type in game_logic.egg_positions.items() if type == 'golden']
+            if golden_eggs: return ('egg', golden_eggs[0])
+            f_face_eggs = [pos for pos in game_logic.egg_positions if pos[0] == 'F']
+            if f_face_eggs: return ('egg', f_face_eggs[0])
+        if self.search.depth <= 0:
+            return self.greedy_action(engine)
+        if engine.game_mode == '3P':
+            return self.multi_action(engine, progress, cancel)
+
+        boards = game_logic.bitboards
+        opponent = 'O' if self.marker != 'O' else 'X'
+        if self.search.geometry is not engine.geometry:
+            # キューブの大きさが変わったら、その大きさの表で探索し直す(置換表も作り直す)
+            search = self.search
+            self.search = AlphaBetaSearch(search.depth, search.time_limit, search.max_quiet_moves, search.tt_limit, engine.geometry)
+        if (self.tablebase is not None and self.tablebase.longest > self.search.depth
+                and engine.ruleset == 'normal' and engine.geometry.standard):
+            known = self.tablebase.best_move(boards[self.marker], boards[opponent])
+            if known is not None: return action_from_code(known[0])
+
+        # 怪獣は回転で一緒に動き、卵はその場に残るので、別々のマスクとして渡す
+        kaiju = game_logic.kaiju_mask if engine.ruleset == 'custom' else 0
+        eggs = game_logic.egg_mask if engine.ruleset == 'custom' else 0
+        report = None
+        if progress is not None:
+            search = self.search
+            report = lambda depth, code, score: progress(depth, search.action_from_code(code))
+        code, _ = self.search.search(boards[self.marker], boards[opponent], kaiju, eggs, report, cancel)
+        self.nodes = self.search.nodes
+        return self.search.action_from_code(code)
+
+    def multi_action(self, engine, progress=None, cancel=None):
+        # ... (3人対戦の手。局面は写さずに engine.game に指しては戻しながら読む(読み終えると元の局面に戻っている))
+        search = self.multi_search
+        if search.geometry is not engine.geometry:
+            search = self.multi_search = MaxNSearch(search.depth, search.time_limit, search.max_quiet_moves, search.tt_limit,
+                                                    engine.geometry, search.paranoid)
+        report = None
+        if progress is not None:
+            report = lambda depth, code, score: progress(depth, search.action_from_code(code))
+        code, _ = search.search(engine.game, self.marker, report, cancel)
+        self.nodes = search.nodes
+        return search.action_from_code(code)
+
+    def greedy_action(self, engine):
+        # ... (1手だけ読む従来のAI: 置いて勝つ → 回して勝つ → 防ぐ → ランダム)
+        game_logic = engine.game
+        g = engine.geometry
+        me = self.marker
+        opponent = 'O' if me != 'O' else 'X'
+
+        move = self.find_winning_or_blocking_move(me, game_logic.bitboards, g)
+        if move and engine.is_placeable(('F', move[0], move[1])): return ('place', ('F', move[0], move[1]))
+
+        # 回して勝てるかは、回転の後に F面へ来るマスの表で調べる(盤面は回さない)
+        projection, board = g.projection, game_logic.bitboards[me]
+        for rotation in g.moves:
+            if projection.completes(board, (rotation,)): return ('rotate', rotation)
+
+        move = self.find_winning_or_blocking_move(opponent, game_logic.bitboards, g)
+        if move and engine.is_placeable(('F', move[0], move[1])): return ('place', ('F', move[0], move[1]))
+
+        cell = game_logic.random_free_cell(self.rng)
+        if cell is not None:
+            return ('place', g.cells[cell])
+        return ('rotate', self.rng.choice(g.moves))
+
+    # 以下の g はキューブの表(cube_geometry.CubeGeometry)。省略すると 3×3×3
+    def find_winning_or_blocking_move(self, marker, bitboards, g=None):
+        # あと1つで揃うライン(3つ揃えならマーク2つ+空き1つ)を探し、空いているマスの (r, c) を返す
+        g = g or STANDARD_GEOMETRY
+        almost = g.win_length - 1
+        board, occupied = bitboards[marker], 0
+        for b in bitboards.values(): occupied |= b
+        for mask in g.line_masks:
+            if (board & mask).bit_count() == almost and (occupied & mask) == (board & mask):
+                return g.cells[(mask & ~occupied).bit_length() - 1][1:]
+        return None
+
+    def check_win_on_board(self, bitboards, marker, g=None):
+        return (g or STANDARD_GEOMETRY).has_line(bitboards[marker])
+
+    def simulate_rotation(self, bitboards, move, g=None):
+        # GameLogic.rotate と同じ参照表を使って、回転後の各プレイヤーの盤面を返す
+        rotate = (g or STANDARD_GEOMETRY).rotate_bits
+        return {player: rotate(board, move) for player, board in bitboards.items()}
+
+# --- ランダムに行動するプレイヤー(対局の自動実行や比較用) ---
+class RandomPlayer:
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random
+
+    def make_move(self, engine):
+        return engine.apply_action(self.choose_action(engine))
+
+    def choose_action(self, engine):
+        return self.rng.choice(engine.legal_actions())
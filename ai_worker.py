@@ -0,0 +1,90 @@
+# ai_worker.py
+
+# ===================================================================================
+# AI の思考を、画面の update / draw とは別のスレッドで行うためのファイルです。
+# - 考え始めるときに局面の写し(GameEngine.copy())を作り、AI はその写しだけを見て考える
+#   (考えている間に画面側で局面が変わっても、AI の探索は影響を受けない)
+# - 反復深化で深さを1つ読み終えるたびに、その時点の最善手を best に出す
+# - cancel() で探索を打ち切る(戻るボタンで対局をやめたときなど)
+# - 考え終わった手は、画面側が update() の中で poll() で受け取り、画面のスレッドで適用する
+#   (エンジンを書き換えるのは、いつも画面のスレッドだけ)
+# Pythonista では別のプロセスを使えないので、スレッドで考えます。Python のスレッドは同時には
+# 1つしか動かないが、数ミリ秒ごとに切り替わるので、AI が長く考えても画面のフレームは止まりません。
+#
+# 使い方の例:
+#   worker = AIWorker()
+#   worker.start(ai, engine)          (engine の今の局面で考え始める)
+#   action = worker.poll()            (毎フレーム呼ぶ。考え終わるまでは None)
+#   worker.cancel()                   (考えるのをやめさせる。結果は捨てる)
+# ===================================================================================
+
+import threading
+
+class _Job:
+    # ... (1回分の思考。別のスレッドで run() が動き、結果は属性に書くだけ)
+    def __init__(self, player, snapshot):
+        self.player, self.snapshot = player, snapshot
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self.best = None       # (深さ, 行動)。反復深化で読み終えた深さまでの最善手
+        self.action = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='ai-worker', daemon=True)
+
+    def run(self):
+        try:
+            self.action = self.player.choose_action(self.snapshot, self._progress, self.cancel)
+        except Exception as e:
+            # 画面のスレッドで poll() したときに投げ直す(エラーを握りつぶさない)
+            self.error = e
+        finally:
+            self.done.set()
+
+    def _progress(self, depth, action):
+        self.best = (depth, action)
+
+class AIWorker:
+    """
+    AI(AIPlayer / MCTSPlayer など、choose_action(engine, progress, cancel) を持つもの)に
+    別のスレッドで考えさせるクラス。同時に考えるのは1手だけです。
+    start() で考え始め、poll() で結果を受け取り、cancel() でやめさせます。
+    """
+    def __init__(self):
+        self._job = None
+        self._stopping = None   # cancel() した思考。同じ AI を2つのスレッドで同時に使わないよう、次の start() で終わりを待つ
+
+    @property
+    def thinking(self):
+        return self._job is not None
+
+    @property
+    def best(self):
+        # ... (考えている途中の最善手 (深さ, 行動)。まだ1つも読み終えていなければ None)
+        return self._job.best if self._job else None
+
+    def start(self, player, engine):
+        # ... (engine の今の局面の写しで、player に考えさせ始める。考えている途中の思考はやめさせる)
+        self.cancel()
+        if self._stopping is not None:
+            self._stopping.thread.join(); self._stopping = None
+        self._job = _Job(player, engine.copy())
+        self._job.thread.start()
+
+    def poll(self):
+        # ... (考え終わっていればその行動を返す(1回だけ)。まだなら None。AI の中で起きたエラーはここで投げる)
+        job = self._job
+        if job is None or not job.done.is_set(): return None
+        self._job = None
+        if job.error is not None: raise job.error
+        return job.action
+
+    def wait(self, timeout=None):
+        # ... (考え終わるまで待ってから poll() する。CLI や確認用)
+        if self._job is not None: self._job.done.wait(timeout)
+        return self.poll()
+
+    def cancel(self):
+        # ... (考えている途中なら打ち切らせ、その結果は捨てる。スレッドの終わりは待たない)
+        if self._job is not None:
+            self._job.cancel.set()
+            self._stopping, self._job = self._job, None
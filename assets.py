@@ -0,0 +1,154 @@
+# assets.py
+
+# ===================================================================================
+# 背景画像と効果音の読み込みをまとめたファイルです。
+# - 背景画像は、初めて使うときに一度だけ読み込み、画面の大きさに縮小して保存する
+#   (保存先は .asset_cache/。元画像の内容のハッシュと解像度をファイル名に含めるので、
+#    画像を差し替えたり画面の大きさが変わったりすると、自動で作り直される)
+# - まだ表示していない画面の背景は読み込まない。画面(フェーズ)ごとに1枚だけ覚えておく
+# - 効果音は、起動直後に別のスレッドで先読みしておく
+# 画像の縮小には PIL を使います。PIL がない環境では、元の画像をそのまま使います。
+#
+# 使い方の例(キャッシュの作成にかかる時間の確認):
+#   python assets.py --size 1024x768
+# ===================================================================================
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from constants import *
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ASSET_DIR, '.asset_cache')
+_INDEX_FILE = 'index.json'
+
+class AssetManager:
+    """
+    背景画像と効果音の管理。background(phase, size) で、その画面の背景として
+    image() に渡すファイルのパスを返します。縮小した画像はディスクに保存して使い回し、
+    画面ごとに「最後に使った大きさの1枚」だけをメモリ上に覚えておきます。
+    """
+    def __init__(self, cache_dir=CACHE_DIR, scale=BACKGROUND_SCALE, asset_dir=ASSET_DIR):
+        self.cache_dir = cache_dir
+        self.scale = scale
+        self.asset_dir = asset_dir
+        self._backgrounds = {}   # 画面 -> (大きさ, パス)
+        self._index = None       # 元画像 -> [更新時刻, ファイルサイズ, ハッシュ]
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'resized': 0, 'seconds': 0.0}
+
+    # --- 背景画像 ---
+    def background(self, phase, size):
+        # ... (画面 phase の背景画像のパス。大きさが前回と同じなら、何も読み込まずに返す)
+        entry = self._backgrounds.get(phase)
+        if entry is not None and entry[0] == size:
+            self.stats['memory_hits'] += 1
+            return entry[1]
+        path = self.prepare(BACKGROUND_IMAGES[phase], size)
+        self._backgrounds[phase] = (size, path)
+        return path
+
+    def prepare(self, name, size):
+        # ... (画像 name を size(画面の点の数)× scale の解像度にしたファイルのパスを返す。なければ作る)
+        start = time.perf_counter()
+        source = os.path.join(self.asset_dir, name)
+        try:
+            digest = self._source_hash(source)
+            width, height = (max(1, int(round(v * self.scale))) for v in size)
+            stem = os.path.splitext(name)[0]
+            path = os.path.join(self.cache_dir, f"{stem}-{digest[:16]}-{width}x{height}.jpg")
+            if os.path.exists(path):
+                self.stats['disk_hits'] += 1
+            else:
+                self._resize(source, path, width, height)
+                self.stats['resized'] += 1
+            return path
+        except (ImportError, OSError):
+            # PIL がない・書き込めないなどの場合は、元の画像をそのまま使う
+            return name
+        finally:
+            self.stats['seconds'] += time.perf_counter() - start
+
+    def _source_hash(self, source):
+        # ... (元画像の内容のハッシュ。更新時刻とファイルサイズが同じなら、前回計算した値を使う)
+        st = os.stat(source)
+        with self._lock:
+            if self._index is None: self._index = self._load_index()
+            entry = self._index.get(source)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size: return entry[2]
+        hasher = hashlib.sha1()
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''): hasher.update(block)
+        digest = hasher.hexdigest()
+        with self._lock:
+            self._index[source] = [st.st_mtime_ns, st.st_size, digest]
+            self._save_index()
+        return digest
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, _INDEX_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp = os.path.join(self.cache_dir, _INDEX_FILE + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f: json.dump(self._index, f)
+        os.replace(temp, os.path.join(self.cache_dir, _INDEX_FILE))
+
+    @staticmethod
+    def _resize(source, path, width, height):
+        # ... (画像を読み込んで縮小し、JPEG で保存する。元より大きくはしない)
+        from PIL import Image
+        with Image.open(source) as image:
+            width, height = min(width, image.width), min(height, image.height)
+            image.draft('RGB', (width, height))  # JPEG は読み込みの段階で粗く展開して速くする
+            resized = image.convert('RGB').resize((width, height), Image.BILINEAR, reducing_gap=2.0)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = path + '.tmp'
+        resized.save(temp, 'JPEG', quality=88)
+        os.replace(temp, path)
+
+    def clear_memory(self, keep=None):
+        # ... (覚えている背景を、keep の画面以外は手放す)
+        for phase in list(self._backgrounds):
+            if phase != keep: del self._backgrounds[phase]
+
+    # --- 効果音 ---
+    def preload_sounds(self, names=SOUND_EFFECTS, loader=None):
+        # ... (効果音を別のスレッドで先読みする。loader を省略すると sound.load_effect を使う)
+        if loader is None:
+            import sound
+            loader = sound.load_effect
+        def run():
+            for name in names:
+                try: loader(name)
+                except Exception: pass  # 先読みに失敗しても、鳴らすときに読み込まれる
+        thread = threading.Thread(target=run, name='preload_sounds', daemon=True)
+        thread.start()
+        return thread
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='背景画像のキャッシュを作り、かかった時間を表示します。')
+    parser.add_argument('--size', default='1024x768', help='画面の大きさ(点の数)。例: 1024x768')
+    parser.add_argument('--scale', type=float, default=BACKGROUND_SCALE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args(argv)
+    size = tuple(int(v) for v in args.size.split('x'))
+    for label in ('1回目', '2回目(ディスクのキャッシュ)'):
+        manager = AssetManager(args.cache_dir, args.scale)
+        start = time.perf_counter()
+        paths = {phase: manager.background(phase, size) for phase in BACKGROUND_IMAGES}
+        print(f"{label}: {(time.perf_counter() - start) * 1000:.1f}ms {manager.stats}")
+    for phase, path in paths.items():
+        print(f"  {phase}: {os.path.relpath(path, ASSET_DIR)} ({os.path.getsize(path) // 1024}KB)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
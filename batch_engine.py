@@ -0,0 +1,328 @@
+# batch_engine.py
+
+# ===================================================================================
+# ランダム同士の対局を、NumPy で何千局も「同時に」進めるためのファイルです。
+# MAX_KAIJU_ON_F_FACE や GOLDEN_EGG_INTERVAL などの値の調整(バランス調整)には
+# 大量の対局結果が必要なので、1局ずつ GameEngine で進める代わりに、
+# - マークは (対局数, 54) の int8 配列(0: なし, 1〜: プレイヤー番号 + 1)
+# - 回転は、手ごとの並べ替え表を使った一括の添字参照
+# - 勝利判定は、F面の9マスを1つの番号にして、勝敗の表をまとめて引く
+# - 置く場所・怪獣の動きは、配列で作った乱数で全対局分を一度に決める
+# という形で、全対局を1手ずつそろえて進めます。
+# ルールは GameEngine + RandomPlayer と同じです(同じ乱数列にはなりません)。
+#
+# NumPy が必要です(Pythonista には最初から入っています)。
+# ===================================================================================
+
+import numpy as np
+from constants import *
+from cube_moves import (NUM_CELLS, CELLS, F_FACE_CELLS, F_LINES, MOVE_SOURCES, MOVE_DESTINATIONS,
+                        KAIJU_NEXT_STEP, FACE_NEIGHBOURS)
+from zobrist import MARKER_KEYS, SIDE_KEYS
+
+# 結果の表し方: 0〜(プレイヤー数 - 1) は勝ったプレイヤーの番号
+DRAW = -1
+UNFINISHED = -2
+
+# 内部では1局分を56バイト(54マス + 使わない2マス)で持ち、8バイトずつの整数7個として
+# まとめて読めるようにする(局面のハッシュを安く作るため)。使わないマスには _PADDING を入れておく
+_WIDTH = 56
+_PADDING = -1
+
+_NUM_MOVES = len(ALL_MOVES)
+_SOURCES = np.array([list(MOVE_SOURCES[move]) + list(range(NUM_CELLS, _WIDTH)) for move in ALL_MOVES], dtype=np.intp)
+_DESTINATIONS = np.array([MOVE_DESTINATIONS[move] for move in ALL_MOVES], dtype=np.int16)
+_IS_F = np.array([face == 'F' for face, _, _ in CELLS])
+
+# F面の9マスは通し番号が連続しているので、スライスで取り出せる
+_F_SLICE = slice(F_FACE_CELLS[0], F_FACE_CELLS[-1] + 1)
+assert list(range(NUM_CELLS))[_F_SLICE] == list(F_FACE_CELLS)
+
+def _f_face_results():
+    # ... (F面の9マスの中身(0〜3)を4進数の番号にしたとき、その番号ごとの勝敗の表)
+    # 値は 0: 誰も揃っていない, p + 1: プレイヤー p だけが揃っている, DRAW: 2人以上が揃っている
+    digits = np.arange(4 ** 9)[:, None] // (4 ** np.arange(9)) % 4
+    lines = digits[:, np.array(F_LINES) - F_FACE_CELLS[0]]
+    results = np.zeros(4 ** 9, dtype=np.int8)
+    num_winners = np.zeros(4 ** 9, dtype=np.int8)
+    for p in range(len(PLAYER_MARKERS)):
+        won = (lines == p + 1).all(axis=2).any(axis=1)
+        results[won] = p + 1
+        num_winners += won
+    results[num_winners >= 2] = DRAW
+    return results
+
+_F_FACE_RESULTS = _f_face_results()
+_F_DIGIT_VALUES = (4 ** np.arange(9)).astype(np.int32)
+# 怪獣がF面へ向かうときの次のマス(F面のマスは自分自身)
+_NEXT_STEP = np.array(KAIJU_NEXT_STEP, dtype=np.intp)
+
+def _face_neighbours():
+    # ... (F面の各マスから、同じ面の上下左右斜めのマス(最大8つ)。足りない分は -1)
+    table = np.full((NUM_CELLS, 8), -1, dtype=np.intp)
+    for i in F_FACE_CELLS: table[i, :len(FACE_NEIGHBOURS[i])] = FACE_NEIGHBOURS[i]
+    return table
+
+_NEIGHBOURS = _face_neighbours()
+
+def _nth_true(mask, n):
+    # ... (各行で n 番目(0始まり)に True になっている列の番号)
+    return (np.cumsum(mask, axis=1, dtype=np.int8) > n[:, None]).argmax(axis=1)
+
+_BYTE_SUM = np.uint64(0x0101010101010101)
+_TOP_BYTE = np.uint64(56)
+
+def _count_true(mask):
+    # ... ((対局数, 56) の真偽値の配列で、各行の True の数を数える)
+    # 行が短いと sum(axis=1) は遅いので、8バイトずつの整数として足してからバイトごとの合計を取り出す
+    words = mask.view(np.uint64)
+    total = words[:, 0].copy()
+    for k in range(1, _WIDTH // 8): total += words[:, k]
+    return ((total * _BYTE_SUM) >> _TOP_BYTE).astype(np.intp)
+
+def _random_zero(values, rows, rng, tries=3):
+    # ... (values の各行 rows で、値が 0 のマスから1つを等確率で選ぶ)
+    # まずランダムに引き直し、何度か外れた行だけ累積和で選ぶ
+    chosen = rng.integers(0, NUM_CELLS, len(rows))
+    todo = np.flatnonzero(values[rows, chosen])
+    for _ in range(tries):
+        if not len(todo): return chosen
+        chosen[todo] = rng.integers(0, NUM_CELLS, len(todo))
+        todo = todo[values[rows[todo], chosen[todo]] != 0]
+    if len(todo):
+        free = values[rows[todo], :NUM_CELLS] == 0
+        chosen[todo] = _nth_true(free, (rng.random(len(todo)) * free.sum(axis=1)).astype(np.intp))
+    return chosen
+
+class BatchEngine:
+    """
+    ランダムに行動するプレイヤー同士の対局を num_games 局まとめて進めるクラス。
+    run() で全対局を最後まで進め、winners(各局の結果)と turns(各局の手数)を返します。
+    max_kaiju_on_f などの引数で constants.py の値を上書きして、ルールの調整を試せます。
+    """
+    def __init__(self, num_games, ruleset='normal', game_mode='2P', num_kaiju=1, seed=None, max_turns=1000,
+                 max_kaiju_on_f=MAX_KAIJU_ON_F_FACE, golden_egg_interval=GOLDEN_EGG_INTERVAL,
+                 normal_egg_markers=NORMAL_EGG_MARKERS, golden_egg_markers=GOLDEN_EGG_MARKERS):
+        self.num_games = num_games
+        self.ruleset = ruleset
+        self.num_players = 3 if game_mode == '3P' else 2
+        self.num_kaiju = num_kaiju if ruleset == 'custom' else 0
+        self.max_turns = max_turns
+        self.max_kaiju_on_f = max_kaiju_on_f
+        self.golden_egg_interval = golden_egg_interval
+        self.normal_egg_markers = normal_egg_markers
+        self.golden_egg_markers = golden_egg_markers
+        self.rng = np.random.default_rng(seed)
+        # 同一局面の判定用: 1局分の56バイトを8バイトずつ読んだ7個の整数にかける乱数と、手番の乱数
+        players = PLAYER_MARKERS[:self.num_players]
+        self._word_keys = np.array([key | 1 for key in MARKER_KEYS['O'][:_WIDTH // 8]], dtype=np.uint64)
+        self._side_keys = np.array([SIDE_KEYS[p] for p in players], dtype=np.uint64)
+        self.reset()
+
+    def reset(self):
+        # ... (全対局を初期状態に戻す)
+        n = self.num_games
+        self.winners = np.full(n, UNFINISHED, dtype=np.int8)
+        self.turns = np.zeros(n, dtype=np.int32)
+        self.turn = 0
+        # 以下は対局ごとの状態。終わった対局はときどき取り除いて詰め直す
+        # _ids は元の対局番号、_alive はまだ続いているかどうか
+        self._ids = np.arange(n)
+        self._alive = np.ones(n, dtype=bool)
+        self._markers = np.zeros((n, _WIDTH), dtype=np.int8)
+        self._markers[:, NUM_CELLS:] = _PADDING
+        self._eggs = np.zeros((n, _WIDTH), dtype=np.int8)  # 0: なし, 1: 普通の卵, 2: 金の卵
+        self._kaiju = self._place_kaiju(n)
+        self._kaiju_moves = np.zeros(n, dtype=np.int32)
+        self._empty = np.full(n, NUM_CELLS, dtype=np.intp)  # ノーマルモードでの空きマスの数
+        # ノーマルモードではマークが減らないので、同じ局面は最後にマークを置いてからの
+        # 回転の間にしか現れない。その間の局面のハッシュだけを _history に持つ
+        self._history = np.zeros((n, 16), dtype=np.uint64)
+        self._run = np.zeros(n, dtype=np.intp)
+        if self.ruleset == 'normal': self._record_positions(np.zeros(n, dtype=bool))
+
+    def _place_kaiju(self, n):
+        # ... (GameLogic.place_kaiju と同じく、まずF面に、あふれた分は他の面に置く)
+        on_f = min(self.num_kaiju, self.max_kaiju_on_f)
+        f_cells = np.array(F_FACE_CELLS, dtype=np.int16)
+        other_cells = np.array([i for i in range(NUM_CELLS) if not _IS_F[i]], dtype=np.int16)
+        f_pick = f_cells[np.argsort(self.rng.random((n, len(f_cells))), axis=1)[:, :on_f]]
+        other_pick = other_cells[np.argsort(self.rng.random((n, len(other_cells))), axis=1)[:, :self.num_kaiju - on_f]]
+        return np.concatenate([f_pick, other_pick], axis=1)
+
+    @property
+    def markers(self):
+        # ... (続いている対局(と、まだ詰め直していない終わった対局)のマークの (対局数, 54) 配列)
+        return self._markers[:, :NUM_CELLS]
+
+    # --- 対局の進行 ---
+    def run(self):
+        # ... (全対局が終わるまで進め、(winners, turns) を返す)
+        while self.step(): pass
+        return self.winners, self.turns
+
+    def step(self):
+        # ... (続いている全対局で1手(怪獣の番を含む)進め、続いている対局の数を返す)
+        if not len(self._ids): return 0
+        if self.turn >= self.max_turns:
+            self._finish(self._alive.copy(), np.full(len(self._ids), UNFINISHED, dtype=np.int8))
+            return 0
+        # 全対局が同じ手数だけ進んでいるので、手番のプレイヤーも全対局で同じになる
+        player = self.turn % self.num_players
+        rotated = self._play_random_actions(player)
+        self.turn += 1
+        finished, winner = self._check_win()
+        if self.num_kaiju:
+            self._kaiju_step(~finished)
+        elif self.ruleset == 'normal':
+            # 手番を渡した後の局面が3回目なら引き分け
+            repeated = (self._record_positions(rotated) >= 3) & ~finished
+            winner[repeated] = DRAW; finished |= repeated
+        self._finish(finished & self._alive, winner)
+        return len(self._ids)
+
+    def _play_random_actions(self, player):
+        # ... (各対局で、選べる行動(置く・卵・16通りの回転)から1つを等確率で選んで適用する)
+        markers, eggs = self._markers, self._eggs
+        n = len(markers)
+        rows = np.arange(n)
+        # 置ける(または使える卵がある)マスの数。ノーマルモードでは置いた数から分かる
+        if self.num_kaiju:
+            kaiju_mask = self._kaiju_mask()
+            cells = ((markers == 0) & ~kaiju_mask) | (eggs > 0)
+            num_cells = _count_true(cells)
+        else:
+            num_cells = self._empty
+        pick = (self.rng.random(n) * (num_cells + _NUM_MOVES)).astype(np.intp)
+
+        # 回転は、同じ回転をする対局ごとにまとめて並べ替える
+        rotating = pick >= num_cells
+        r = rows[rotating]
+        moves = pick[rotating] - num_cells[rotating]
+        for m in range(_NUM_MOVES):
+            g = r[moves == m]
+            if not len(g): continue
+            markers[g] = markers[g][:, _SOURCES[m]]
+            if self.num_kaiju: self._kaiju[g] = _DESTINATIONS[m][self._kaiju[g]]
+
+        r = rows[~rotating]
+        if not self.num_kaiju:
+            markers[r, _random_zero(markers, r, self.rng)] = player + 1
+            self._empty[r] -= 1
+            return rotating
+        chosen = _random_zero(~cells, r, self.rng)
+        egg_type = eggs[r, chosen]
+        placing = egg_type == 0
+        markers[r[placing], chosen[placing]] = player + 1
+        if not placing.all():
+            cracking = ~placing
+            self._crack_eggs(player, r[cracking], chosen[cracking], egg_type[cracking], kaiju_mask[r[cracking]])
+        return rotating
+
+    def _crack_eggs(self, player, r, egg_cells, egg_types, kaiju_mask):
+        # ... (卵を使い、空いているマス(使った卵のマスを含む)からランダムに選んだ所にマークを出す)
+        markers, eggs = self._markers, self._eggs
+        eggs[r, egg_cells] = 0
+        spots = (markers[r] == 0) & ~kaiju_mask & (eggs[r] == 0)
+        wanted = np.where(egg_types == 2, self.golden_egg_markers, self.normal_egg_markers)
+        count = np.minimum(wanted, _count_true(spots))
+        keys = np.where(spots, self.rng.random(spots.shape), 2.0)
+        threshold = np.sort(keys, axis=1)[np.arange(len(r)), np.maximum(count - 1, 0)]
+        chosen = spots & (keys <= threshold[:, None]) & (count > 0)[:, None]
+        markers[r] = np.where(chosen, player + 1, markers[r])
+
+    def _kaiju_step(self, active):
+        # ... (続いている対局の怪獣をランダムに1〜全体動かす。動いた怪獣の元の位置には卵が残る)
+        markers, eggs, kaiju = self._markers, self._eggs, self._kaiju
+        r = np.flatnonzero(active)
+        m, k = len(r), self.num_kaiju
+        if not m: return
+        num_to_move = self.rng.integers(1, k + 1, size=m)
+        order = np.argsort(self.rng.random((m, k)), axis=1)
+        for j in range(k):
+            # j 番目に動く怪獣がいる対局だけを調べる。移動先は、その時点の他の怪獣の位置と比べる
+            # (動く怪獣自身の位置が移動先になることはないので、自分と比べても問題ない)
+            moving = j < num_to_move
+            g, index = r[moving], order[moving, j]
+            positions = kaiju[g]
+            start = positions[np.arange(len(g)), index].astype(np.intp)
+
+            # F面の外ではF面へ向かって1マス、F面では空いている隣のマスへランダムに1マス
+            target = _NEXT_STEP[start]
+            on_f = _IS_F[start]
+            if on_f.any():
+                neighbours = _NEIGHBOURS[start[on_f]]
+                free = neighbours >= 0
+                for other in positions[on_f].T: free &= neighbours != other[:, None]
+                choice = (self.rng.random(len(neighbours)) * np.count_nonzero(free, axis=1)).astype(np.intp)
+                # 空きがなければ _nth_true は埋まっている先頭のマスを返すので、下の判定で動かないことになる
+                target[on_f] = neighbours[np.arange(len(neighbours)), _nth_true(free, choice)]
+            moved = np.ones(len(g), dtype=bool)
+            for other in positions.T: moved &= other != target
+
+            g, new, old, index = g[moved], target[moved], start[moved], index[moved]
+            kaiju[g, index] = new
+            markers[g, new] = 0
+            self._kaiju_moves[g] += 1
+            eggs[g, old] = np.where(self._kaiju_moves[g] % self.golden_egg_interval == 0, 2, 1)
+            eggs[g, new] = 0
+        # 怪獣はマークを消すだけなので、ここで新しくラインが揃うことはない
+
+    # --- 判定 ---
+    def _kaiju_mask(self):
+        mask = np.zeros(self._markers.shape, dtype=bool)
+        if self.num_kaiju: mask[np.arange(len(mask))[:, None], self._kaiju] = True
+        return mask
+
+    def _check_win(self):
+        # ... (全対局のF面を一度に判定する。同時に2人以上揃ったら引き分け)
+        result = _F_FACE_RESULTS[self._markers[:, _F_SLICE] @ _F_DIGIT_VALUES]
+        return result != 0, np.where(result > 0, result - 1, result).astype(np.int8)
+
+    def _record_positions(self, rotated):
+        # ... (手番を含めた局面のハッシュを履歴に加え、これまでに現れた回数を返す)
+        # rotated: この手で回転した対局。それ以外(マークを置いた対局)は履歴を空にしてから加える
+        words = self._markers.view(np.uint64)
+        hashes = np.full(len(words), self._side_keys[self.turn % self.num_players], dtype=np.uint64)
+        for k, key in enumerate(self._word_keys): hashes += words[:, k] * key
+        run = self._run
+        run[~rotated] = 0
+        if run.max() >= self._history.shape[1]:
+            self._history = np.concatenate([self._history, np.zeros_like(self._history)], axis=1)
+        self._history[np.arange(len(run)), run] = hashes
+        # マークを置いた対局は新しい局面なので1回目。回転した対局だけ履歴と比べる
+        seen = np.ones(len(run), dtype=np.intp)
+        r = np.flatnonzero(rotated)
+        if len(r):
+            history, h, length = self._history[r], hashes[r], run[r]
+            count = seen[r]
+            for j in range(length.max()): count += (history[:, j] == h) & (j < length)
+            seen[r] = count
+        run += 1
+        return seen
+
+    def _finish(self, finished, winner):
+        # ... (終わった対局の結果を書き込む。終わった対局が増えたら、続いている対局だけを詰め直す)
+        if not finished.any(): return
+        ids = self._ids[finished]
+        self.winners[ids] = winner[finished]
+        self.turns[ids] = self.turn
+        self._alive &= ~finished
+        num_alive = np.count_nonzero(self._alive)
+        if num_alive * 4 > len(self._alive) * 3 and num_alive: return
+        keep = self._alive
+        self._ids = self._ids[keep]
+        self._alive = self._alive[keep]
+        self._markers = self._markers[keep]
+        self._eggs = self._eggs[keep]
+        self._kaiju = self._kaiju[keep]
+        self._kaiju_moves = self._kaiju_moves[keep]
+        self._empty = self._empty[keep]
+        if self.ruleset == 'normal': self._history, self._run = self._history[keep], self._run[keep]
+
+    def tally(self):
+        # ... (結果を {プレイヤーのマーク / None(引き分け) / 'unfinished': 局数} にまとめる)
+        labels = {DRAW: None, UNFINISHED: 'unfinished'}
+        labels.update(enumerate(PLAYER_MARKERS[:self.num_players]))
+        values, counts = np.unique(self.winners, return_counts=True)
+        return {labels[int(v)]: int(c) for v, c in zip(values, counts)}
@@ -0,0 +1,534 @@
+# benchmark.py
+
+# ===================================================================================
+# エンジンと AI の「よく呼ばれる処理」の速さを測るためのファイルです。
+# - 16種類の回転(GameLogic.rotate)、AIPlayer.simulate_rotation
+# - check_win_on_board / find_winning_or_blocking_move
+# - 1手の回転で F面が揃うかの全回転の調べ方(回して調べる / F面への写り方の表を引く)
+# - 対局途中の局面での AIPlayer.make_move(2人対戦)と、怪獣モードの ExpectimaxPlayer.make_move
+#   (記録した怪獣モードの局面はどれも1手で勝てるので、ランダム同士で進めた局面を別に作って測る。
+#    AIPlayer は卵が残っていると探索せずに卵を選ぶので卵を取り除き、ExpectimaxPlayer は卵を残す)
+# - 3人対戦の max-n / paranoid 探索の1秒あたりの局面数(maxn.MaxNSearch。1回 = 1局面)
+# - 怪獣が MAX_KAIJU_TOTAL 体いるときの怪獣の番(GameEngine.kaiju_step)
+# - 怪獣の番の結果と確率の一覧を作る速さ(chance.ChanceModel。3体は数え上げ、MAX_KAIJU_TOTAL 体は探索用の見積もり)
+# - 1局まるごとの速さ(記録した対局の再生と、ランダム同士の対局)
+# 局面は benchmark_corpus/ に保存した対局の記録から作るので、コミットが変わっても
+# 同じ局面で比べられます。画面やiPadには依存しないので、Linux のコマンドラインで動きます。
+#
+# 結果は JSON で書き出せます。--baseline に以前の結果を渡すと、それより一定以上
+# 遅くなった項目を「悪化」として表示し、終了コード 1 を返します。
+# - 比べる前に、calibration の比でマシンの速さの揺れを補正する(--no-normalize で補正しない)
+# - 1回ごとの時間の揺れ(中央値が最小値より何割遅いか)が大きい項目は、その揺れの3倍までは悪化とみなさない
+#   (揺れの小さいマシンでは --threshold の割合で、揺れの大きいマシンでは大きな悪化だけを見つける)
+#
+# 使い方の例:
+#   python benchmark.py --json before.json
+#   python benchmark.py --baseline before.json --threshold 0.1
+#   python benchmark.py --baseline before.json --no-normalize   (マシンの速さの補正をしない)
+#   python benchmark.py --filter rotate --repeat 10
+#   python benchmark.py --record-corpus     (対局の記録を作り直す。普段は使わない)
+#   python benchmark.py --sizes 3-7         (キューブの大きさ N=3〜7 での速さの伸び方を測る)
+# ===================================================================================
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from constants import *
+from game_engine import GameEngine
+from ai_player import AIPlayer
+from expectimax import ExpectimaxPlayer
+from chance import ChanceModel
+from maxn import MaxNSearch
+from cli import parse_action, format_action, make_players, play_game
+from cube_geometry import CubeGeometry, geometry
+from board_view import BoardLayout, paint_board
+from render import RecordingBackend
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_corpus')
+
+# 記録する対局: (名前, ルール, モード, 怪獣の数, シード, 各プレイヤーの担当)
+CORPUS_GAMES = [
+    ('normal-2p-ai', 'normal', '2P', 1, 11, 'ai,ai'),
+    ('normal-2p-random', 'normal', '2P', 1, 12, 'random,random'),
+    ('normal-3p-greedy', 'normal', '3P', 1, 32, 'greedy,greedy,random'),
+    ('custom-2p-k3', 'custom', '2P', 3, 18, 'greedy,ai'),
+    ('custom-3p-k10', 'custom', '3P', MAX_KAIJU_TOTAL, 17, 'random,greedy,random'),
+]
+
+# --- 対局の記録 ---
+# 記録は cli.py --script と同じ形式で、先頭のコメント行に対局の設定を書きます:
+#   # ruleset=custom mode=2P kaiju=3 seed=18 players=greedy,ai
+def record_corpus(directory=CORPUS_DIR, max_turns=200):
+    # ... (CORPUS_GAMES の対局を実行して、行動の記録をファイルに書き出す)
+    os.makedirs(directory, exist_ok=True)
+    for name, ruleset, mode, kaiju, seed, spec in CORPUS_GAMES:
+        engine = GameEngine(ruleset, mode, kaiju, seed)
+        players = make_players(spec, mode, random.Random(seed), time_limit=None)
+        lines = [f"# ruleset={ruleset} mode={mode} kaiju={kaiju} seed={seed} players={spec}"]
+        while not engine.game_over and engine.turn_count < max_turns:
+            action = players[engine.current_player].choose_action(engine)
+            if not engine.play(action): raise RuntimeError(f"{name}: 受け付けられない行動です: {action!r}")
+            engine.pop_events()
+            lines.append(format_action(action))
+        lines.append(f"# 結果: {engine.winner if engine.game_over else '未決着'} ({engine.turn_count}手)")
+        with open(os.path.join(directory, name + '.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+def load_corpus(directory=CORPUS_DIR):
+    # ... (記録を読み込み、{'name', 'ruleset', 'mode', 'kaiju', 'seed', 'actions'} の一覧を返す)
+    games = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.txt'): continue
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        settings = dict(token.split('=', 1) for token in lines[0].lstrip('# ').split())
+        actions = [action for action in map(parse_action, lines[1:]) if action is not None]
+        games.append({'name': filename[:-4], 'ruleset': settings['ruleset'], 'mode': settings['mode'],
+                      'kaiju': int(settings['kaiju']), 'seed': int(settings['seed']), 'actions': actions})
+    if not games: raise FileNotFoundError(f"対局の記録がありません: {directory}")
+    return games
+
+def replay(game, plies=None):
+    # ... (記録の最初の plies 手(省略時は全て)を再生したエンジンを返す)
+    engine = GameEngine(game['ruleset'], game['mode'], game['kaiju'], game['seed'])
+    for action in game['actions'][:plies]:
+        if not engine.play(action):
+            raise RuntimeError(f"{game['name']}: 記録の行動 {action!r} が受け付けられません(記録を作り直してください)")
+        engine.pop_events()
+    return engine
+
+def midgame_positions(corpus, fractions=(0.25, 0.5, 0.75)):
+    # ... (各対局の途中(手数の割合で指定)の局面を、再生したエンジンの一覧として返す)
+    return [replay(game, max(1, int(len(game['actions']) * fraction)))
+            for game in corpus for fraction in fractions]
+
+# --- 測定する項目 ---
+# 各項目は「準備をして (実行する関数, 1回の実行で行う操作の数) を返す関数」です。
+# 準備は試行ごとにやり直し、時間には含めません。
+
+def _bench_rotate(move, loops):
+    def setup(corpus):
+        logics = [engine.game for engine in midgame_positions(corpus)]
+        def run():
+            for _ in range(loops):
+                for logic in logics: logic.rotate(move)
+        return run, loops * len(logics)
+    return setup
+
+def _bench_simulate_rotation(loops):
+    def setup(corpus):
+        ai = AIPlayer('X')
+        boards = [dict(engine.game.bitboards) for engine in midgame_positions(corpus)]
+        def run():
+            for _ in range(loops):
+                for bitboards in boards:
+                    for move in ALL_MOVES: ai.simulate_rotation(bitboards, move)
+        return run, loops * len(boards) * len(ALL_MOVES)
+    return setup
+
+def _bench_rotation_scan(loops, use_projection):
+    # 「1手の回転で F面が揃うか」を全部の回転について調べる。回して調べる従来の方法と、F面への写り方の表を引く方法
+    def setup(corpus):
+        ai = AIPlayer('X')
+        projection = geometry().projection
+        boards = [dict(engine.game.bitboards) for engine in midgame_positions(corpus)]
+        def run():
+            for _ in range(loops):
+                for bitboards in boards:
+                    for move in ALL_MOVES:
+                        if use_projection: projection.completes(bitboards['X'], (move,))
+                        else: ai.check_win_on_board(ai.simulate_rotation(bitboards, move), 'X')
+        return run, loops * len(boards) * len(ALL_MOVES)
+    return setup
+
+def _bench_check_win(loops):
+    def setup(corpus):
+        ai = AIPlayer('X')
+        boards = [dict(engine.game.bitboards) for engine in midgame_positions(corpus)]
+        def run():
+            for _ in range(loops):
+                for bitboards in boards:
+                    for marker in PLAYER_MARKERS: ai.check_win_on_board(bitboards, marker)
+        return run, loops * len(boards) * len(PLAYER_MARKERS)
+    return setup
+
+def _bench_winning_or_blocking(loops):
+    def setup(corpus):
+        ai = AIPlayer('X')
+        boards = [dict(engine.game.bitboards) for engine in midgame_positions(corpus)]
+        def run():
+            for _ in range(loops):
+                for bitboards in boards:
+                    for marker in PLAYER_MARKERS: ai.find_winning_or_blocking_move(marker, bitboards)
+        return run, loops * len(boards) * len(PLAYER_MARKERS)
+    return setup
+
+def _searchable_custom_positions(count=6, plies=6, keep_eggs=False):
+    # 怪獣モードで、卵を使わないランダム同士で plies 手進めてから卵を取り除いた局面(シードは固定)
+    # 記録した怪獣モードの対局は卵の使い合いで盤面が埋まり、どの局面も1手で勝てるので探索の速さを測れない
+    # keep_eggs なら卵は残す(ExpectimaxPlayer は卵も偶然の局面として読むので、卵のある局面で測る)
+    engines = []
+    for seed in range(count):
+        engine = GameEngine('custom', '2P', 3, seed)
+        rng = random.Random(seed)
+        while not engine.game_over and engine.turn_count < plies:
+            engine.play(rng.choice([action for action in engine.legal_actions() if action[0] != 'egg']))
+            engine.pop_events()
+        if not keep_eggs:
+            for pos in list(engine.game.egg_positions): engine.game.remove_egg(pos)
+        if not engine.game_over: engines.append(engine)
+    return engines
+
+def _bench_make_move(ruleset, depth, player=AIPlayer, positions=None):
+    # 置換表は局面ごとに空にして、毎回同じ量の探索をさせる(3人対戦は _bench_multi で測る)
+    # positions を渡すと、記録の途中の局面の代わりにそれが返す局面を使う
+    # プレイヤーは局面ごとに、その局面の手番の担当として作る
+    def setup(corpus):
+        if positions is not None:
+            engines = positions()
+        else:
+            engines = [engine for engine in midgame_positions([g for g in corpus if g['ruleset'] == ruleset])
+                       if not engine.game_over and engine.game_mode != '3P']
+        players = [player(engine.current_player, random.Random(0), depth=depth, time_limit=None) for engine in engines]
+        def run():
+            for engine, ai in zip(engines, players):
+                ai.make_move(engine)
+                engine.undo_turn()
+        return run, len(engines)
+    return setup
+
+def _bench_multi(depth, paranoid):
+    # 3人対戦の記録の途中の局面を、決まった深さまで読む。1回 = 1局面なので、結果がそのまま局面あたりの時間になる
+    def setup(corpus):
+        engines = [engine for engine in midgame_positions([g for g in corpus if g['mode'] == '3P'])
+                   if not engine.game_over]
+        def search_all():
+            nodes = 0
+            for engine in engines:
+                search = MaxNSearch(depth, None, geometry=engine.geometry, paranoid=paranoid)
+                search.search(engine.game, engine.current_player)
+                nodes += search.nodes
+            return nodes
+        return search_all, search_all()
+    return setup
+
+def _bench_kaiju_step(steps):
+    # 怪獣が MAX_KAIJU_TOTAL 体いる記録の途中の局面で、怪獣の番を進めては取り消す
+    # (進めたままにすると、怪獣がF面に詰まって動けない局面ばかりを測ることになる)
+    def setup(corpus):
+        game = next(g for g in corpus if g['kaiju'] == MAX_KAIJU_TOTAL)
+        engine = replay(game, len(game['actions']) // 2)
+        records = engine.undo_stack[-1][1]
+        def run():
+            for _ in range(steps):
+                engine.kaiju_step()
+                engine.pop_events()
+                if len(records) > 1: engine.game.undo(records.pop())
+        return run, steps
+    return setup
+
+def _bench_kaiju_outcomes(kaiju, limit):
+    # 記録の途中の局面の怪獣の配置で、怪獣の番の結果の一覧を作る。覚えた結果を使わないよう、毎回作り直す
+    def setup(corpus):
+        engines = midgame_positions([g for g in corpus if g['kaiju'] == kaiju])
+        positions = [(engine.game.kaiju_mask, engine.game.total_kaiju_moves) for engine in engines]
+        g = engines[0].geometry
+        def run():
+            model = ChanceModel(g)
+            for mask, moves in positions: model.kaiju_outcomes(mask, moves, limit)
+        return run, len(positions)
+    return setup
+
+def _bench_replay(corpus):
+    def run():
+        for game in corpus: replay(game)
+    return run, sum(len(game['actions']) for game in corpus)
+
+def _bench_random_games(ruleset, mode, kaiju, games):
+    # 1局まるごと(ランダム同士)。シードは固定なので、毎回同じ対局になる
+    def setup(corpus):
+        def run():
+            for seed in range(games):
+                engine = GameEngine(ruleset, mode, kaiju, seed)
+                play_game(engine, make_players(None, mode, random.Random(seed)), 1000)
+        return run, games
+    return setup
+
+def _bench_calibration(loops):
+    # 盤面とは関係のない、決まった量の Python の処理。マシン自体の速さの目安にする
+    def setup(corpus):
+        def run():
+            table = {}
+            for i in range(loops):
+                table[i & 1023] = (i * i) ^ (i >> 3)
+        return run, loops
+    return setup
+
+def benchmarks(scale=1.0):
+    # ... (項目名 -> 準備の関数 の辞書。scale で1回の実行の量を増減する)
+    n = lambda count: max(1, int(count * scale))
+    items = {'calibration': _bench_calibration(n(200000))}
+    items.update({f"rotate/{move}": _bench_rotate(move, n(200)) for move in ALL_MOVES})
+    items['simulate_rotation'] = _bench_simulate_rotation(n(50))
+    items['check_win_on_board'] = _bench_check_win(n(500))
+    items['rotation_scan/simulate'] = _bench_rotation_scan(n(50), False)
+    items['rotation_scan/projection'] = _bench_rotation_scan(n(50), True)
+    items['find_winning_or_blocking_move'] = _bench_winning_or_blocking(n(200))
+    items['make_move/normal'] = _bench_make_move('normal', 4)
+    items['make_move/custom'] = _bench_make_move('custom', 4, positions=_searchable_custom_positions)
+    items['make_move/expectimax'] = _bench_make_move('custom', 2, ExpectimaxPlayer,
+                                                     positions=lambda: _searchable_custom_positions(keep_eggs=True))
+    items['maxn/node_rate_3p'] = _bench_multi(3, False)
+    items['paranoid/node_rate_3p'] = _bench_multi(4, True)
+    items['kaiju_step/max_kaiju'] = _bench_kaiju_step(n(2000))
+    items['kaiju_outcomes/k3_exact'] = _bench_kaiju_outcomes(3, None)
+    items['kaiju_outcomes/max_kaiju_search'] = _bench_kaiju_outcomes(MAX_KAIJU_TOTAL, 16)
+    items['game/replay_corpus'] = _bench_replay
+    items['game/random_normal_2p'] = _bench_random_games('normal', '2P', 1, n(20))
+    items['game/random_custom_3p_k3'] = _bench_random_games('custom', '3P', 3, n(20))
+    return items
+
+# --- キューブの大きさごとの速さ ---
+# 大きさ n のキューブで、ランダム同士の対局の途中(seed ごとに30手目)の局面を使って測ります。
+
+def _sized_positions(n, count=8, plies=30):
+    engines = []
+    for seed in range(count):
+        engine = GameEngine('normal', '2P', 1, seed, n)
+        rng = random.Random(seed)
+        while not engine.game_over and engine.turn_count < plies:
+            engine.play(rng.choice(engine.legal_actions()))
+        engine.pop_events()
+        engines.append(engine)
+    return engines
+
+def _scaling_items(n, scale=1.0):
+    # ... (大きさ n のキューブで測る項目。項目名 -> 準備の関数)
+    count = lambda c: max(1, int(c * scale))
+    def build(corpus):
+        # 表を一から作る時間(回転のビットの参照表も全部作る)
+        def run():
+            g = CubeGeometry(n)
+            for move in g.moves: g.rotation_tables(move)
+        return run, 1
+    def rotate(corpus):
+        logics = [engine.game for engine in _sized_positions(n)]
+        moves = logics[0].geometry.moves
+        def run():
+            for logic in logics:
+                for move in moves: logic.rotate(move)
+        return run, len(logics) * len(moves)
+    def has_line(corpus):
+        engines = _sized_positions(n)
+        boards = [board for engine in engines for board in engine.game.bitboards.values()]
+        check = engines[0].geometry.has_line
+        loops = count(500)
+        def run():
+            for _ in range(loops):
+                for board in boards: check(board)
+        return run, loops * len(boards)
+    def random_game(corpus):
+        games = count(5)
+        def run():
+            for seed in range(games):
+                engine = GameEngine('normal', '2P', 1, seed, n)
+                play_game(engine, make_players(None, '2P', random.Random(seed)), 1000)
+        return run, games
+    def ai_move(corpus):
+        engines = [engine for engine in _sized_positions(n, 4) if not engine.game_over]
+        ai = AIPlayer('X', random.Random(0), depth=3, time_limit=None)
+        def run():
+            for engine in engines:
+                ai.marker = engine.current_player
+                ai.search.tt.clear()
+                ai.make_move(engine)
+                engine.undo_turn()
+        return run, len(engines)
+    def paint(corpus):
+        engines = _sized_positions(n, 4)
+        layout = BoardLayout(1024, 768, n)
+        def run():
+            for engine in engines: paint_board(RecordingBackend(), layout, engine.game)
+        return run, len(engines)
+    return {'build_tables': build, 'rotate': rotate, 'has_line': has_line, 'random_game': random_game,
+            'ai_move_depth3': ai_move, 'paint_board': paint}
+
+def run_scaling(sizes, repeat=3, scale=1.0):
+    # ... (大きさごとに各項目を repeat 回測り、大きさ -> {項目名 -> 1操作あたりの時間(ナノ秒)の最小値})
+    results = {}
+    for n in sizes:
+        items = _scaling_items(n, scale)
+        results[n] = {name: min(measure_once(setup, None)[0] for _ in range(repeat)) for name, setup in items.items()}
+    return results
+
+def measure_once(setup, corpus):
+    # ... (準備をして1回だけ実行し、(1操作あたりの時間(ナノ秒), 操作の数) を返す)
+    # timeit と同じく、測っている間はガベージコレクションを止める
+    run, ops = setup(corpus)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        run()
+        return (time.perf_counter() - start) * 1e9 / ops, ops
+    finally:
+        if gc_was_enabled: gc.enable()
+
+def run_benchmarks(corpus, repeat=10, scale=1.0, name_filter=None, progress=None):
+    """
+    全ての項目(name_filter を含む名前だけ)を repeat 回ずつ測り、項目名 -> 結果 の辞書を返します。
+    結果は1操作あたりの時間(ナノ秒)の最小値と中央値と、その揺れ(中央値 / 最小値 - 1)です。
+    マシンの速さが一時的に揺れても特定の項目だけが遅く見えないよう、
+    1項目ずつまとめて測らずに「全項目を1回ずつ」を repeat 周繰り返します。
+    calibration は name_filter に関係なく、ほかの項目を1つ測るたびにその直前に測ります。
+    比べるときの補正はこの1つの値で全項目を割るので、ほかの項目よりずっと多く測って最小値を確かにします。
+    """
+    items = benchmarks(scale)
+    calibration = items.pop('calibration')
+    items = {name: setup for name, setup in items.items() if not name_filter or name_filter in name}
+    samples = {name: [] for name in ['calibration', *items]}
+    ops = {}
+    for round in range(repeat):
+        for name, setup in items.items():
+            ns, ops['calibration'] = measure_once(calibration, corpus)
+            samples['calibration'].append(ns)
+            ns, ops[name] = measure_once(setup, corpus)
+            samples[name].append(ns)
+        if progress: progress(round + 1, repeat)
+    results = {}
+    for name in samples:
+        best, median = min(samples[name]), statistics.median(samples[name])
+        results[name] = {'ns_per_op': best, 'median_ns_per_op': median, 'spread': median / best - 1 if best else 0.0,
+                         'ops': ops[name], 'repeat': repeat}
+    return results
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment():
+    # ... (結果を比べるときに確認したい、実行環境の情報)
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'platform': platform.platform(), 'machine': platform.machine(), 'commit': _git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+# 悪化とみなす比の下限は、項目ごとに「揺れ × NOISE_FACTOR」と threshold の大きい方
+# (揺れの大きいマシンで同じコミットどうしを比べたとき、比の伸びは最大で揺れの 2.2 倍だったので、余裕を見て 3 倍)
+# 項目の揺れは、その回の全項目の揺れの中央値(マシンの揺れ)を下回らないものとする
+NOISE_FACTOR = 3.0
+# 基準と比べるときと、基準にする結果を書き出すときの、各項目を測る回数の下限
+# (2〜3回では揺れが見積もれず、最小値も偶然に左右される)
+MIN_COMPARE_REPEAT = 5
+
+def _machine_spread(results):
+    spreads = [r.get('spread', 0.0) for name, r in results.items() if name != 'calibration']
+    return statistics.median(spreads) if spreads else 0.0
+
+def compare(results, baseline, threshold, normalize=True):
+    # ... (基準の結果と比べ、(項目名, 基準, 今回, 比, 許す遅れの割合) の一覧と、悪化した項目名の一覧を返す)
+    # normalize なら、calibration の比(マシンの速さの違い)で割ってから比べる
+    # 揺れを記録していない古い結果は、揺れ 0 として扱う
+    scale = 1.0
+    if normalize and 'calibration' in results and 'calibration' in baseline:
+        scale = results['calibration']['ns_per_op'] / baseline['calibration']['ns_per_op']
+    rows, regressions = [], []
+    floor = max(_machine_spread(results), _machine_spread(baseline))
+    for name, result in results.items():
+        if name not in baseline or (normalize and name == 'calibration'): continue
+        before, after = baseline[name]['ns_per_op'], result['ns_per_op']
+        ratio = after / before / scale if before else float('inf')
+        noise = max(baseline[name].get('spread', 0.0), result.get('spread', 0.0), floor)
+        limit = max(threshold, noise * NOISE_FACTOR)
+        rows.append((name, before, after, ratio, limit))
+        if ratio > 1 + limit: regressions.append(name)
+    return rows, regressions
+
+def format_ns(ns):
+    # ... (時間を読みやすい単位にする)
+    if ns >= 1e6: return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3: return f"{ns / 1e3:.2f} µs"
+    return f"{ns:.0f} ns"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='エンジンと AI の速さを、記録した対局の局面で測ります。')
+    parser.add_argument('--repeat', type=int, default=10, help='各項目を測る回数(最小値を結果にする)')
+    parser.add_argument('--scale', type=float, default=1.0, help='1回の測定で行う操作の量の倍率')
+    parser.add_argument('--filter', default=None, help='この文字列を含む項目だけを測る')
+    parser.add_argument('--json', default=None, help='結果を JSON で書き出すファイル')
+    parser.add_argument('--baseline', default=None, help='比べる基準の結果(以前に --json で書き出したもの)')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='基準よりこの割合以上遅ければ悪化とみなす(時間の揺れが大きい項目は、揺れの3倍まで許す)')
+    parser.add_argument('--normalize', action=argparse.BooleanOptionalAction, default=True,
+                        help='calibration の結果でマシンの速さの違いを補正して比べる(既定。--no-normalize で補正しない)')
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='対局の記録のディレクトリ')
+    parser.add_argument('--record-corpus', action='store_true', help='対局の記録を作り直して終了する')
+    parser.add_argument('--sizes', default=None, help='キューブの大きさごとの速さを測る。例: 3-7')
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        low, _, high = args.sizes.partition('-')
+        sizes = range(int(low), int(high or low) + 1)
+        results = run_scaling(sizes, args.repeat, args.scale)
+        names = list(next(iter(results.values())))
+        print(f"{'N':>2} " + ' '.join(f"{name:>15}" for name in names))
+        for n, row in results.items():
+            print(f"{n:>2} " + ' '.join(f"{format_ns(row[name]):>15}" for name in names))
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'environment': environment(), 'repeat': args.repeat, 'scale': args.scale,
+                           'scaling': {str(n): row for n, row in results.items()}}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.record_corpus:
+        record_corpus(args.corpus)
+        print(f"対局の記録を書き出しました: {args.corpus}")
+        return 0
+
+    if (args.baseline or args.json) and args.repeat < MIN_COMPARE_REPEAT:
+        print(f"基準と比べる(または基準にする)ので、各項目を {MIN_COMPARE_REPEAT} 回測ります"
+              f"(--repeat {args.repeat} では揺れが見積もれません)", file=sys.stderr)
+        args.repeat = MIN_COMPARE_REPEAT
+    corpus = load_corpus(args.corpus)
+    progress = lambda done, total: print(f"\r{done}/{total}周", end='', file=sys.stderr, flush=True)
+    results = run_benchmarks(corpus, args.repeat, args.scale, args.filter, progress)
+    print(file=sys.stderr)
+    for name, r in results.items():
+        print(f"{name:<32} {format_ns(r['ns_per_op']):>12} (中央値 {format_ns(r['median_ns_per_op'])}, {r['ops']}操作)")
+    report = {'environment': environment(), 'corpus': [game['name'] for game in corpus],
+              'repeat': args.repeat, 'scale': args.scale, 'results': results}
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline['results'], args.threshold, args.normalize)
+        print(f"\n基準との比較 ({args.baseline}, コミット {baseline['environment'].get('commit')}, "
+              f"時間の揺れ 基準 {_machine_spread(baseline['results']):.0%} / 今回 {_machine_spread(results):.0%}):")
+        for name, before, after, ratio, limit in rows:
+            mark = '  悪化' if name in regressions else ('  改善' if ratio * (1 + limit) < 1 else '')
+            print(f"{name:<32} {format_ns(before):>12} -> {format_ns(after):>12} ({ratio:5.2f}倍 / 許容 {1 + limit:4.2f}倍){mark}")
+        report['baseline'] = {'file': args.baseline, 'commit': baseline['environment'].get('commit'),
+                              'threshold': args.threshold, 'normalized': args.normalize, 'regressions': regressions,
+                              'ratios': {name: ratio for name, _, _, ratio, _ in rows},
+                              'limits': {name: 1 + limit for name, _, _, _, limit in rows}}
+        if regressions:
+            print(f"\n{len(regressions)}項目が許容を超えて遅くなりました: {', '.join(regressions)}")
+            status = 1
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
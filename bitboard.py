@@ -0,0 +1,84 @@
+# bitboard.py
+
+# ===================================================================================
+# マークの配置を「プレイヤーごとの54ビット整数」で表すためのファイルです。
+# - ビット i が立っていれば、通し番号 i のマスにそのプレイヤーのマークがある
+# - F面の8本のラインはビットマスクとして事前計算
+# - 回転は、8ビットずつの参照表を引いて OR するだけのビット並べ替え
+# 勝利判定や回転の先読みを、リストを作らずに整数演算だけで行えます。
+# ===================================================================================
+
+from constants import ALL_MOVES
+from cube_moves import NUM_CELLS, F_LINES, F_FACE_CELLS, MOVE_DESTINATIONS
+
+FULL_MASK = (1 << NUM_CELLS) - 1
+F_FACE_MASK = sum(1 << i for i in F_FACE_CELLS)
+LINE_MASKS = [sum(1 << i for i in line) for line in F_LINES]
+
+_CHUNK_BITS = 8
+
+def build_permutation_tables(destinations):
+    # ... (8ビット分の値 -> 並べ替え後のビット列、という参照表を作る。54マスなら7個)
+    num_cells = len(destinations)
+    tables = []
+    for chunk in range((num_cells + _CHUNK_BITS - 1) // _CHUNK_BITS):
+        table = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            bit = chunk * _CHUNK_BITS + low.bit_length() - 1
+            moved = 1 << destinations[bit] if bit < num_cells else 0
+            table[value] = table[value ^ low] | moved
+        tables.append(table)
+    return tuple(tables)
+
+# ROTATION_TABLES[move][k][v]: ビット 8k〜8k+7 が v のとき、回転後に立つビット
+ROTATION_TABLES = {move: build_permutation_tables(MOVE_DESTINATIONS[move]) for move in ALL_MOVES}
+
+def rotate_bits(board, move):
+    # ... (54ビットの盤面に回転を適用する)
+    t0, t1, t2, t3, t4, t5, t6 = ROTATION_TABLES[move]
+    return (t0[board & 255] | t1[(board >> 8) & 255] | t2[(board >> 16) & 255] | t3[(board >> 24) & 255]
+            | t4[(board >> 32) & 255] | t5[(board >> 40) & 255] | t6[board >> 48])
+
+def permute_bits(board, tables):
+    # ... (build_permutation_tables() で作った表で、任意の並べ替えをビット列に適用する)
+    t0, t1, t2, t3, t4, t5, t6 = tables
+    return (t0[board & 255] | t1[(board >> 8) & 255] | t2[(board >> 16) & 255] | t3[(board >> 24) & 255]
+            | t4[(board >> 32) & 255] | t5[(board >> 40) & 255] | t6[board >> 48])
+
+def permute_wide_bits(board, tables):
+    # ... (マスの数によらず使える permute_bits。8ビットずつ表を引き、残りのビットがなくなったら終える)
+    result = 0
+    for table in tables:
+        chunk = board & 255
+        if chunk: result |= table[chunk]
+        board >>= _CHUNK_BITS
+        if not board: break
+    return result
+
+def has_line(board):
+    # ... (F面に3つ揃ったラインがあるか)
+    for mask in LINE_MASKS:
+        if board & mask == mask: return True
+    return False
+
+def iter_bits(mask):
+    # ... (立っているビットの番号を小さい順に返す)
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+# _SELECT_TABLE[v][n]: 8ビットの値 v で、小さい方から n 番目(0始まり)に立っているビットの位置
+_SELECT_TABLE = [tuple(i for i in range(_CHUNK_BITS) if value >> i & 1) for value in range(256)]
+
+def select_bit(mask, n):
+    # ... (小さい方から n 番目(0始まり)に立っているビットの番号。8ビットずつ数えるので最大7回で見つかる)
+    # n は mask.bit_count() 未満であること
+    shift = 0
+    while True:
+        chunk = _SELECT_TABLE[mask & 255]
+        if n < len(chunk): return shift + chunk[n]
+        n -= len(chunk)
+        mask >>= _CHUNK_BITS
+        shift += _CHUNK_BITS
@@ -0,0 +1,242 @@
+# board_view.py
+
+# ===================================================================================
+# プレイ画面(背景・見出し・盤面・回転ボタン・怪獣)の「配置」と「描き方」をまとめたファイルです。
+# - 配置(各面の位置・ボタンの位置)は画面の大きさが変わったときだけ計算し直す
+# - 背景・見出し・マス・マーク・ボタンは render.Layer にして、元になる状態が変わったときだけ描き直す
+#   (マスの色の層とマーク・卵の層を分けてあるので、マークを置いただけならマークの層だけを描き直す)
+# - 怪獣はアニメーションで毎フレーム動くので、その都度描く
+# - 背景画像は assets.AssetManager があれば、画面の大きさに縮小したものを使う
+# scene モジュールには依存しないので、RecordingBackend を使えば iPad の外でも描画を確かめられます。
+#
+# キューブが大きい(N×N×N)ときは、面の大きさを変えずにマスとボタンを小さくして並べます。
+#
+# 使い方の例(毎フレーム全部を描き直していた頃との比較):
+#   python board_view.py --ruleset custom --kaiju 3 --frames 30
+#   python board_view.py --size 7
+# ===================================================================================
+
+import argparse
+import random
+import sys
+from constants import *
+from game_engine import GameEngine
+from render import Layer, RecordingBackend, FrameStats, draw_stylish_text
+
+HEADER_HEIGHT = 60
+FACE_SIZE = TILE_SIZE * 3 + GAP * 2
+FACE_OFFSETS = {'U': (0, 1), 'L': (-1, 0), 'F': (0, 0), 'R': (1, 0), 'B': (2, 0), 'D': (0, -1)}
+MARKER_COLORS = {'O': '#FF0000', 'X': '#0000FF', '△': '#2ECC71'}
+BUTTON_COLORS = {'O': '#C0392B', 'X': '#2980B9', '△': '#27AE60'}
+ARROWS = {'top': '↓', 'bottom': '↑', 'left': '→', 'right': '←'}
+
+class BoardLayout:
+    """
+    画面の大きさとキューブの大きさ(1面のマスの数 n)から決まる、プレイ画面の各部品の位置。
+    矩形はすべて (x, y, w, h) のタプルです。
+    face_origins: 面 -> 左下の座標、buttons: (並び, 番号) -> 回転ボタンの矩形
+    n が3より大きいときは、面の大きさ(FACE_SIZE)はそのままに、マス(tile)と隙間(gap)を小さくします。
+    """
+    def __init__(self, width, height, n=3):
+        self.size = (width, height)
+        self.n = n
+        self.tile, self.gap = TILE_SIZE * 3 / n, GAP * 3 / n
+        self.button_size = min(BUTTON_SIZE, self.tile + self.gap - 2)
+        self.center = (width / 2, height / 2)
+        center_x, center_y = self.center
+        self.face_origins = {}
+        for face_key, (offset_x, offset_y) in FACE_OFFSETS.items():
+            self.face_origins[face_key] = (center_x + offset_x * (FACE_SIZE + FACE_GAP) - FACE_SIZE / 2,
+                                           center_y + offset_y * (FACE_SIZE + FACE_GAP) - FACE_SIZE / 2 - 30)
+        back_w, back_h = 120, 40
+        self.back_button = (10, height - HEADER_HEIGHT + (HEADER_HEIGHT - back_h) / 2, back_w, back_h)
+        self.buttons = self._button_rects()
+
+    def _button_rects(self):
+        # ... (U/D面の上下と L/B面の左右に並ぶ回転ボタンの矩形。1列に n 個ずつ、全部で 4n 個)
+        n, tile, step, size = self.n, self.tile, self.tile + self.gap, self.button_size
+        buttons = {}; padding = size / 2 + 10; half = size / 2
+        u_x, u_y = self.face_origins['U']; d_x, d_y = self.face_origins['D']
+        for i in range(n):
+            px = u_x + i * step + tile / 2
+            buttons[('top', i)] = (px - half, u_y + FACE_SIZE + padding - half, size, size)
+            buttons[('bottom', i)] = (px - half, d_y - padding - half, size, size)
+        l_x, l_y = self.face_origins['L']; b_x, b_y = self.face_origins['B']
+        for i in range(n):
+            py = l_y + i * step + tile / 2
+            buttons[('left', n - 1 - i)] = (l_x - padding - half, py - half, size, size)
+            buttons[('right', n - 1 - i)] = (b_x + FACE_SIZE + padding - half, py - half, size, size)
+        return buttons
+
+    def tile_rect(self, face, row, col):
+        # ... (面の左下から数えて row 行・col 列目のマスの矩形)
+        origin_x, origin_y = self.face_origins[face]
+        step = self.tile + self.gap
+        return (origin_x + col * step, origin_y + row * step, self.tile, self.tile)
+
+    def tile_center(self, pos):
+        # ... (マス (face, r, c) の中心の座標)
+        face, r, c = pos
+        x, y, w, h = self.tile_rect(face, self.n - 1 - r, c)
+        return (x + w / 2, y + h / 2)
+
+    def tile_at(self, x, y):
+        # ... (座標にあるマス (face, r, c)。どのマスの上でもなければ None)
+        step = self.tile + self.gap
+        for face_key, (origin_x, origin_y) in self.face_origins.items():
+            if origin_x <= x < origin_x + FACE_SIZE and origin_y <= y < origin_y + FACE_SIZE:
+                col = min(self.n - 1, int((x - origin_x) / step)); row = min(self.n - 1, int((y - origin_y) / step))
+                return (face_key, self.n - 1 - row, col)
+        return None
+
+# --- 各レイヤーの描き方 ---
+def paint_background(b, layout, image_name):
+    width, height = layout.size
+    b.tint(1, 1, 1, 1); b.image(image_name, 0, 0, width, height)
+    b.fill(0, 0, 0, 0.5); b.rect(0, 0, width, height)
+    b.fill(0, 0, 0, 0.7); b.rect(0, height - HEADER_HEIGHT, width, HEADER_HEIGHT)
+
+def paint_header(b, layout, status_message, game_mode):
+    width, height = layout.size
+    back_x, back_y, back_w, back_h = layout.back_button
+    b.fill(0.3, 0.3, 0.3, 0.8); b.rect(*layout.back_button)
+    draw_stylish_text(b, '↩︎ モード選択へ', 'Futura-CondensedMedium', 18, back_x + back_w / 2, back_y + back_h / 2, 'white')
+    draw_stylish_text(b, status_message, 'Futura-CondensedMedium', 70, layout.center[0], height - 30 - HEADER_HEIGHT / 2, 'white')
+    mode_text = 'vs AI' if game_mode == 'AI' else ('vs Player' if game_mode == '2P' else '3 Players')
+    draw_stylish_text(b, mode_text, 'Futura-CondensedMedium', 18, width - 60, height - HEADER_HEIGHT / 2, (0.8, 0.8, 0.8, 1.0))
+
+def paint_tiles(b, layout, game):
+    # ... (全マスの色。F面は光る縁取りを付ける)
+    n = layout.n
+    stroke = 2 if n <= 4 else 1
+    for face_key, (origin_x, origin_y) in layout.face_origins.items():
+        if face_key == 'F':
+            glow_padding = 5; b.fill('#00A0FF'); b.stroke_weight(0)
+            b.rect(origin_x - glow_padding, origin_y - glow_padding, FACE_SIZE + glow_padding * 2, FACE_SIZE + glow_padding * 2)
+        face_colors = game.cube_state[face_key]
+        for row in range(n):
+            r = n - 1 - row
+            for col in range(n):
+                b.fill(face_colors[r][col]); b.stroke('#00FFFF'); b.stroke_weight(stroke)
+                b.rect(*layout.tile_rect(face_key, row, col))
+
+def paint_markers(b, layout, game):
+    # ... (卵とマーク。文字の大きさはマスの大きさに合わせる)
+    n, tile = layout.n, layout.tile
+    egg_size, marker_size = 40 * tile / TILE_SIZE, 36 * tile / TILE_SIZE
+    for face_key in layout.face_origins:
+        face_markers = game.marker_state[face_key]
+        for row in range(n):
+            r = n - 1 - row
+            for col in range(n):
+                px, py, _, _ = layout.tile_rect(face_key, row, col)
+                egg_type = game.egg_positions.get((face_key, r, col))
+                if egg_type:
+                    b.text('🌟' if egg_type == 'golden' else '🥚', 'AppleColorEmoji', egg_size, px + tile / 2, py + tile / 2)
+                marker = face_markers[r][col]
+                if marker:
+                    draw_stylish_text(b, marker, 'Helvetica-Bold', marker_size, px + tile / 2, py + tile / 2, MARKER_COLORS.get(marker, 'black'))
+
+def paint_board(b, layout, game):
+    # ... (盤面をまるごと(マスの色の上に卵とマーク)。1回だけ描くとき用)
+    paint_tiles(b, layout, game)
+    paint_markers(b, layout, game)
+
+def paint_buttons(b, layout, current_player):
+    button_color = BUTTON_COLORS.get(current_player, '#808080')
+    arrow_size = 28 * layout.button_size / BUTTON_SIZE
+    for (bank, _), (x, y, w, h) in layout.buttons.items():
+        b.stroke_weight(0); b.fill(button_color); b.ellipse(x, y, w, h)
+        b.tint('white'); b.text(ARROWS[bank], 'Helvetica-Bold', arrow_size, x + w / 2, y + h / 2)
+    b.tint(1, 1, 1, 1)
+
+def tiles_key(game):
+    # ... (マスの層の見た目を決める状態。マスの色が同じなら描き直さない)
+    return tuple(game.colors)
+
+def markers_key(game):
+    # ... (マークの層の見た目を決める状態。マークと卵が同じなら描き直さない)
+    return (tuple(game.bitboards.values()), tuple(sorted(game.egg_positions.items())))
+
+class BoardView:
+    """
+    プレイ画面の描画。draw() は毎フレーム呼ばれますが、配置は画面の大きさが変わったときだけ、
+    各レイヤーは元になる状態が変わったときだけ作り直します。
+    retained=False にすると、毎フレーム全てを描き直す従来の動きになります(比較用)。
+    assets を渡すと、背景は画面の大きさに縮小した画像を使います。
+    """
+    def __init__(self, retained=True, assets=None):
+        self.retained = retained
+        self.assets = assets
+        self.layout = None
+        self.background = Layer('background', paint_background)
+        self.header = Layer('header', paint_header)
+        self.tiles = Layer('tiles', paint_tiles)
+        self.markers = Layer('markers', paint_markers)
+        self.buttons = Layer('buttons', paint_buttons)
+        self.layers = (self.background, self.header, self.tiles, self.markers, self.buttons)
+
+    def update_layout(self, width, height, n=3):
+        # ... (画面やキューブの大きさが変わっていれば配置を計算し直し、True を返す)
+        if self.layout is not None and self.layout.size == (width, height) and self.layout.n == n: return False
+        self.layout = BoardLayout(width, height, n)
+        return True
+
+    def draw(self, b, engine, game_mode):
+        layout = self.layout
+        if not self.retained:
+            for layer in self.layers: layer.invalidate()
+        image_name = self.assets.background('playing', layout.size) if self.assets else BACKGROUND_IMAGES['playing']
+        self.background.draw(b, (layout.size, image_name), layout, image_name)
+        self.header.draw(b, (layout.size, engine.status_message, game_mode), layout, engine.status_message, game_mode)
+        self.tiles.draw(b, (layout.size, layout.n, tiles_key(engine.game)), layout, engine.game)
+        self.markers.draw(b, (layout.size, layout.n, markers_key(engine.game)), layout, engine.game)
+        self.buttons.draw(b, (layout.size, layout.n, engine.current_player), layout, engine.current_player)
+
+    def draw_kaiju(self, b, draw_positions):
+        # ... (怪獣の描画。位置はアニメーション中の座標で受け取る)
+        size = self.layout.tile * 1.1
+        for px, py in draw_positions:
+            if px == 0 and py == 0: continue
+            shadow_offset = 4
+            b.tint(0, 0, 0, 0.4); b.text('🦖', 'AppleColorEmoji', size, px + shadow_offset, py - shadow_offset)
+            b.tint(1, 1, 1, 1); b.text('🦖', 'AppleColorEmoji', size, px, py)
+
+def simulate(retained, ruleset='custom', mode='2P', num_kaiju=3, seed=0, frames_per_turn=30, size=(1024, 768), n=3):
+    # ... (ランダム同士の1局を、1手ごとに frames_per_turn フレームずつ描いたときの記録を返す)
+    engine = GameEngine(ruleset, mode, num_kaiju, seed, n)
+    rng = random.Random(seed)
+    view = BoardView(retained)
+    backend = RecordingBackend(bake=retained)
+    stats = FrameStats(window=None)
+    while True:
+        for _ in range(frames_per_turn):
+            stats.begin(); backend.begin_frame()
+            view.update_layout(*size, n)
+            view.draw(backend, engine, mode)
+            view.draw_kaiju(backend, [view.layout.tile_center(pos) for pos in engine.game.kaiju_positions])
+            stats.end(backend.draw_calls(backend.end_frame()))
+        if engine.game_over or engine.turn_count >= 200: break
+        engine.play(rng.choice(engine.legal_actions())); engine.pop_events()
+    return stats, backend, view
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='プレイ画面の描画を記録し、描画命令の数とかかった時間を比べます。')
+    parser.add_argument('--ruleset', choices=['normal', 'custom'], default='custom')
+    parser.add_argument('--mode', choices=['2P', '3P'], default='2P')
+    parser.add_argument('--kaiju', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--frames', type=int, default=30, help='1手あたりに描くフレーム数')
+    parser.add_argument('--size', type=int, default=3, help='キューブの1面のマスの数')
+    args = parser.parse_args(argv)
+    for label, retained in (('毎フレーム全て描き直す', False), ('変わったレイヤーだけ描き直す', True)):
+        stats, backend, view = simulate(retained, args.ruleset, args.mode, args.kaiju, args.seed, args.frames, n=args.size)
+        s = stats.summary()
+        renders = ', '.join(f"{layer.name} {layer.renders}回" for layer in view.layers)
+        print(f"{label}: {s['frames']}フレーム, 描画命令 平均 {s['mean_draw_calls']:.1f}/フレーム, "
+              f"時間 平均 {s['mean_ms'] * 1000:.0f}µs (p95 {s['p95_ms'] * 1000:.0f}µs)")
+        print(f"  レイヤーを作り直した回数: {renders}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+# chance.py
+
+# ===================================================================================
+# 怪獣モードの「偶然で決まる出来事」を、起こりうる結果とその確率の一覧にするファイルです。
+# - 怪獣の番(GameEngine.kaiju_step): 動く数は 1〜k から等確率、動く怪獣はその数だけ等確率に選ばれ、
+#   選ばれた順に1体ずつ動く。F面の外の怪獣は決まったマスへ、F面の怪獣は空いている隣のマスへ等確率で動く
+#   (行き先に別の怪獣がいれば動かない)。動いた怪獣の元のマスには卵が残り、何回目の移動かで金の卵になる
+# - 卵(GameEngine._handle_egg_effect): 空いているマスから、出るマークの数だけ等確率に選ばれる
+# 怪獣の番は「まだ選ばれていない怪獣のマス・動き終えた怪獣のマス・残りの数・卵とマークの増減」を状態にして
+# 1体ずつ進め、同じ状態の確率は足し合わせます。動く順番が違っても結果が同じものは、ここで1つにまとまります。
+# 状態の数が max_states を超えたとき(怪獣が多く、F面の怪獣が何体もいるときなど)は、同じ手順を
+# samples 回ランダムに試して、出た回数の割合を確率の見積もりにします(exact が False になります)。
+# 結果は怪獣のいるマスと「金の卵まであと何回か」ごとに覚えておくので、同じ配置では計算し直しません。
+# 怪獣の動き方は怪獣どうしの位置だけで決まり、マークや卵には左右されないので、覚えた結果は
+# 盤面のほかの部分が違う局面でもそのまま使えます。
+#
+# 使い方の例:
+#   outcomes, exact = engine.kaiju_outcomes()        ([(確率, KaijuOutcome), ...], 確率が正確か)
+#   for p, o in outcomes: board & ~o.arrived, o.eggs(normal, golden) ...
+#   outcomes, exact = engine.egg_outcomes(('F', 1, 1)) ([(確率, マークが出るマスのビットマスク), ...], ...)
+#   python chance.py --kaiju 3 --trials 20000        (数え上げた確率と、実際に kaiju_step を繰り返した割合を比べる)
+# ===================================================================================
+
+import argparse
+import random
+import sys
+import time
+from collections import namedtuple
+from itertools import combinations
+from math import comb
+from constants import GOLDEN_EGG_INTERVAL
+from bitboard import iter_bits
+from cube_geometry import geometry
+
+class KaijuOutcome(namedtuple('KaijuOutcome', 'kaiju arrived laid_normal laid_golden removed moved')):
+    """
+    怪獣の番の1つの結果。どれもマスのビットマスクです。
+    kaiju: 怪獣のいるマス / arrived: 怪獣が来た(マークが消える)マス /
+    laid_normal・laid_golden: 新しく卵が残ったマス / removed: 怪獣が来て卵が消えたマス /
+    moved: 動いた怪獣の数(GameLogic.total_kaiju_moves の増え方)
+    """
+    __slots__ = ()
+
+    def eggs(self, normal, golden):
+        # ... (怪獣の番の前の卵のマスク (普通, 金) から、後の卵のマスクを作る)
+        return ((normal & ~self.removed & ~self.laid_golden) | self.laid_normal,
+                (golden & ~self.removed & ~self.laid_normal) | self.laid_golden)
+
+class ChanceModel:
+    """
+    1つのキューブの大きさ(cube_geometry.CubeGeometry)の、怪獣の番と卵の結果の一覧を作るクラス。
+    kaiju_outcomes() / egg_outcomes() は (結果と確率の一覧, 確率が正確か) を返し、結果は覚えておきます。
+    samples は見積もりのときに試す回数、max_states は数え上げをあきらめる状態の数です。
+    """
+    def __init__(self, g, samples=64, max_states=2000, cache_limit=50000, seed=0):
+        self.geometry = g
+        self.samples = samples
+        self.max_states = max_states
+        self.cache_limit = cache_limit
+        self.seed = seed   # 見積もりは、同じ配置ならいつ・どの順に聞かれても同じ結果になるよう、配置から決めた種の乱数で試す
+        self._kaiju = {}   # (怪獣のマスク, 金の卵まで, limit) -> (結果の一覧, 正確か)
+        self._eggs = {}    # (マークが出られるマスのマスク, マークの数, samples) -> (結果の一覧, 正確か)
+        self._arrivals = {}   # (怪獣のマスク, 金の卵まで, limit) -> (怪獣が来るマスごとの確率の一覧, 来うるマス全部)
+        self.exact_count = self.sampled_count = 0   # 数え上げた・試して見積もった回数(覚えた結果を使った回は数えない)
+
+    # --- 怪獣の番 ---
+    def kaiju_outcomes(self, kaiju, total_moves=0, limit=None):
+        """
+        怪獣のいるマスのマスク kaiju と、それまでに怪獣が動いた回数 total_moves から、
+        怪獣の番の結果 [(確率, KaijuOutcome), ...] と、確率が正確か(見積もりなら False)を返します。
+        limit を渡すと、結果が limit 通りより多いときは、正確な確率から limit 回引いた割合で見積もります
+        (探索で1つの偶然の局面から調べる結果の数を抑えるため)。
+        """
+        phase = total_moves % GOLDEN_EGG_INTERVAL
+        key = (kaiju, phase, limit)
+        entry = self._kaiju.get(key)
+        if entry is None:
+            if len(self._kaiju) > self.cache_limit: self._kaiju.clear()
+            # limit があるときは、結果の数の上限(怪獣ごとの行き先の数の積)が limit を超えるか、数え上げの途中の
+            # 状態が limit の4倍を超えたら、数え上げをやめて limit 回試す
+            outcomes = None
+            if limit is None: outcomes = self._enumerate(kaiju, phase, self.max_states)
+            elif self._spread(kaiju) <= limit: outcomes = self._enumerate(kaiju, phase, limit * 4)
+            if outcomes is None:
+                entry = (self._sample(kaiju, phase, limit or self.samples), False)
+                self.sampled_count += 1
+            else:
+                entry = (outcomes, True) if limit is None or len(outcomes) <= limit else (self._draw(outcomes, limit), False)
+                self.exact_count += 1
+            self._kaiju[key] = entry
+        return entry
+
+    def kaiju_arrivals(self, kaiju, total_moves=0, limit=None):
+        """
+        kaiju_outcomes() の結果を「怪獣が来る(マークが消える)マス」が同じものでまとめた [(確率, arrived), ...] と、
+        どれかの結果で怪獣が来るマスを合わせたマスクを返します。読みの最後の局面のように、
+        マークが消えるかどうかしか使わないときはこちらの方が短く、来うるマスにマークがなければ1回の評価で済みます。
+        """
+        key = (kaiju, total_moves % GOLDEN_EGG_INTERVAL, limit)
+        entry = self._arrivals.get(key)
+        if entry is None:
+            if len(self._arrivals) > self.cache_limit: self._arrivals.clear()
+            merged = {}
+            for p, o in self.kaiju_outcomes(kaiju, total_moves, limit)[0]: merged[o.arrived] = merged.get(o.arrived, 0.0) + p
+            reach = 0
+            for arrived in merged: reach |= arrived
+            entry = self._arrivals[key] = ([(p, arrived) for arrived, p in merged.items()], reach)
+        return entry
+
+    def _spread(self, kaiju):
+        # ... (結果の数の上限。怪獣ごとの「動かない + 行き先の数」の積)
+        g, spread = self.geometry, 1
+        for cell in iter_bits(kaiju):
+            spread *= 1 + (len(g.face_neighbours[cell]) if g.kaiju_next_step[cell] == cell else 1)
+        return spread
+
+    def _moves(self, start, others):
+        # ... (start の怪獣の行き先と、その確率の一覧。others はほかの怪獣のいるマス)
+        g = self.geometry
+        target = g.kaiju_next_step[start]
+        if target == start:
+            free = [cell for cell in g.face_neighbours[start] if not others >> cell & 1]
+            if free: return [(cell, 1 / len(free)) for cell in free]
+            return [(start, 1.0)]
+        if others >> target & 1: return [(start, 1.0)]
+        return [(target, 1.0)]
+
+    @staticmethod
+    def _advance(state, start, target, phase):
+        # ... (状態 (待っている怪獣, 動き終えた怪獣, 来たマス, 普通の卵, 金の卵, 消えた卵, 動いた数) で、start の怪獣を target へ進める)
+        waiting, done, arrived, laid_n, laid_g, removed, moved = state
+        waiting &= ~(1 << start)
+        done |= 1 << target
+        if target != start:
+            # GameLogic.apply(('kaiju', ...)) と同じ順に、元のマスに卵を残してから、行き先の卵を消す
+            moved += 1
+            bit, to = 1 << start, 1 << target
+            if (phase + moved) % GOLDEN_EGG_INTERVAL == 0: laid_g |= bit; laid_n &= ~bit
+            else: laid_n |= bit; laid_g &= ~bit
+            removed &= ~bit
+            laid_n &= ~to; laid_g &= ~to
+            removed |= to; arrived |= to
+        return waiting, done, arrived, laid_n, laid_g, removed, moved
+
+    def _enumerate(self, kaiju, phase, max_states):
+        # ... (1体ずつ進めて同じ状態をまとめる数え上げ。状態が max_states を超えたら None)
+        k = kaiju.bit_count()
+        states = {(m, (kaiju, 0, 0, 0, 0, 0, 0)): 1 / k for m in range(1, k + 1)}
+        finished = {}
+        while states:
+            following = {}
+            for (remaining, state), p in states.items():
+                if not remaining:
+                    result = KaijuOutcome(state[1] | state[0], *state[2:])
+                    finished[result] = finished.get(result, 0.0) + p
+                    continue
+                waiting = state[0]
+                occupied = waiting | state[1]
+                share = p / waiting.bit_count()
+                for start in iter_bits(waiting):
+                    for target, q in self._moves(start, occupied & ~(1 << start)):
+                        key = (remaining - 1, self._advance(state, start, target, phase))
+                        following[key] = following.get(key, 0.0) + share * q
+            if len(following) > max_states: return None
+            states = following
+        return sorted(((p, o) for o, p in finished.items()), reverse=True)
+
+    def _sample(self, kaiju, phase, samples):
+        # ... (kaiju_step と同じ手順を samples 回試して、出た回数の割合を確率にする)
+        rng, cells = self._rng(kaiju, phase, samples), list(iter_bits(kaiju))
+        counts = {}
+        for _ in range(samples):
+            state = (kaiju, 0, 0, 0, 0, 0, 0)
+            for start in rng.sample(cells, rng.randint(1, len(cells))):
+                occupied = state[0] | state[1]
+                moves = self._moves(start, occupied & ~(1 << start))
+                target = moves[0][0] if len(moves) == 1 else rng.choice(moves)[0]
+                state = self._advance(state, start, target, phase)
+            result = KaijuOutcome(state[1] | state[0], *state[2:])
+            counts[result] = counts.get(result, 0) + 1
+        return sorted(((n / samples, o) for o, n in counts.items()), reverse=True)
+
+    def _rng(self, *key):
+        return random.Random(hash(key) ^ self.seed)
+
+    def _draw(self, outcomes, count):
+        # ... (確率つきの結果の一覧から count 回引いて、出た回数の割合を確率にする)
+        counts, rng = {}, self._rng(outcomes[0][1], len(outcomes), count)
+        for o in rng.choices([o for _, o in outcomes], [p for p, _ in outcomes], k=count):
+            counts[o] = counts.get(o, 0) + 1
+        return sorted(((n / count, o) for o, n in counts.items()), reverse=True)
+
+    # --- 卵 ---
+    def egg_outcomes(self, spots, num_marks, samples=None):
+        """
+        マークが出られるマスのマスク spots から num_marks 個(足りなければ全部)が等確率に選ばれるときの、
+        [(確率, マークが出るマスのマスク), ...] と、確率が正確か を返します。
+        選び方が samples 通り以下なら全部を数え上げ、それより多ければ samples 回試した割合で見積もります。
+        """
+        samples = samples or self.samples
+        cells = list(iter_bits(spots))
+        count = min(num_marks, len(cells))
+        key = (spots, count, samples)
+        entry = self._eggs.get(key)
+        if entry is None:
+            if len(self._eggs) > self.cache_limit: self._eggs.clear()
+            total = comb(len(cells), count)
+            if total <= samples:
+                entry = ([(1 / total, sum(1 << i for i in chosen)) for chosen in combinations(cells, count)], True)
+            else:
+                counts, rng = {}, self._rng(spots, count, samples)
+                for _ in range(samples):
+                    marks = sum(1 << i for i in rng.sample(cells, count))
+                    counts[marks] = counts.get(marks, 0) + 1
+                entry = (sorted(((n / samples, marks) for marks, n in counts.items()), reverse=True), False)
+            self._eggs[key] = entry
+        return entry
+
+_CACHE = {}
+
+def chance_model(n=3, win_length=None):
+    # ... (大きさ n のキューブの ChanceModel。同じ大きさでは前に作ったもの(覚えた結果ごと)を返す)
+    g = geometry(n, win_length)
+    model = _CACHE.get(g)
+    if model is None: model = _CACHE[g] = ChanceModel(g)
+    return model
+
+def main(argv=None):
+    from game_engine import GameEngine
+    parser = argparse.ArgumentParser(description='怪獣の番の結果を数え上げ、実際に kaiju_step を繰り返した割合と比べます。')
+    parser.add_argument('--size', type=int, default=3, help='キューブの1面のマスの数(3〜7)')
+    parser.add_argument('--kaiju', type=int, default=3)
+    parser.add_argument('--trials', type=int, default=20000, help='kaiju_step を繰り返す回数')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    engine = GameEngine('custom', '2P', args.kaiju, seed=args.seed, size=args.size)
+    game = engine.game
+    model = ChanceModel(engine.geometry)
+    start = time.perf_counter()
+    outcomes, exact = model.kaiju_outcomes(game.kaiju_mask, game.total_kaiju_moves)
+    elapsed = time.perf_counter() - start
+    print(f"怪獣 {args.kaiju} 体: 結果 {len(outcomes)} 通り({'正確' if exact else '見積もり'}), {elapsed * 1000:.1f}ms")
+
+    # 同じ局面から kaiju_step を何度も進め、出た結果の割合を数える
+    seen = {}
+    before = (game.kaiju_mask, game.total_kaiju_moves, dict(game.egg_positions), game.bitboards)
+    for _ in range(args.trials):
+        copy = engine.copy()
+        copy.rng.seed(engine.rng.random())
+        copy.kaiju_step()
+        key = (copy.game.kaiju_mask, copy.game.egg_mask)
+        seen[key] = seen.get(key, 0) + 1
+    assert (game.kaiju_mask, game.total_kaiju_moves, dict(game.egg_positions), game.bitboards) == before
+    index = engine.geometry.cell_index
+    normal0 = sum(1 << index[pos] for pos, kind in game.egg_positions.items() if kind == 'normal')
+    golden0 = sum(1 << index[pos] for pos, kind in game.egg_positions.items() if kind == 'golden')
+    expected = {}
+    for p, o in outcomes:
+        normal, golden = o.eggs(normal0, golden0)
+        key = (o.kaiju, normal | golden)
+        expected[key] = expected.get(key, 0.0) + p
+    worst = max(abs(seen.get(key, 0) / args.trials - expected.get(key, 0.0)) for key in set(seen) | set(expected))
+    print(f"kaiju_step {args.trials} 回: 結果 {len(seen)} 通り, 確率との差の最大 {worst:.4f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
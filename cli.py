@@ -0,0 +1,222 @@
+# cli.py
+
+# ===================================================================================
+# iPad(Pythonista)を使わずに、コマンドラインでゲームを進めるためのファイルです。
+# - ランダム / AI 同士の対局をまとめて実行し、勝敗を集計する
+# - 行動を書いたスクリプトファイルの通りに1局を再現する
+# 画面の待ち時間(delay)やアニメーションがないため、CPUの速度そのままで動きます。
+#
+# 使い方の例:
+#   python cli.py --games 1000 --ruleset custom --mode 3P --kaiju 3 --seed 1
+#   python cli.py --mode AI --players random,ai --games 200
+#   python cli.py --script game.txt --verbose
+#   python cli.py --games 500 --seed 1 --symmetry-stats
+#   python cli.py --games 100000 --ruleset custom --kaiju 3 --batch   (NumPy でまとめて実行)
+#   python cli.py --games 1000 --ruleset custom --kaiju 3 --seed 1 --record games.rec  (対局を記録する)
+#   python cli.py --games 20 --size 5 --players greedy,ai   (5×5×5 のキューブで4つ揃え)
+#   python cli.py --games 5 --players ai,mcts --telemetry session.trace.json   (時間を計測して書き出す)
+#   python cli.py --games 20 --ruleset custom --kaiju 3 --players mcts,expecti   (怪獣と卵の確率を読む AI)
+#   python cli.py --games 20 --mode 3P --players maxn,paranoid,greedy   (3人対戦の AI)
+#
+# スクリプトファイルは1行に1つの行動を書きます(# 以降はコメント):
+#   place F 1 1
+#   rotate R'
+#   egg U 0 2
+# ===================================================================================
+
+import argparse
+import random
+import sys
+import time
+from constants import *
+from game_engine import GameEngine
+from ai_player import AIPlayer, RandomPlayer
+from mcts import MCTSPlayer
+from expectimax import ExpectimaxPlayer
+from symmetry import canonical_position, position_boards
+from game_record import GameRecorder
+from tablebase import Tablebase
+from cube_geometry import geometry
+from telemetry import Telemetry
+
+def parse_action(line):
+    # ... (スクリプトの1行を行動に変換する。空行やコメントは None)
+    line = line.split('#', 1)[0].strip()
+    if not line: return None
+    parts = line.split()
+    if parts[0] == 'rotate' and len(parts) == 2:
+        return ('rotate', parts[1])
+    if parts[0] in ('place', 'egg') and len(parts) == 4:
+        return (parts[0], (parts[1], int(parts[2]), int(parts[3])))
+    raise ValueError(f"行動として読めません: {line!r}")
+
+def format_action(action):
+    # ... (行動をスクリプトの1行の形にする。parse_action() の逆)
+    kind, arg = action
+    if kind == 'rotate': return f"rotate {arg}"
+    return f"{kind} {arg[0]} {arg[1]} {arg[2]}"
+
+def format_board(engine):
+    # ... (キューブの展開図を文字で表す)
+    n = engine.geometry.n
+    marks = lambda face, r: ' '.join(_cell_char(engine, (face, r, c)) for c in range(n))
+    pad = ' ' * (2 * n + 1)
+    lines = [pad + marks('U', r) for r in range(n)]
+    lines += ['  '.join(marks(face, r) for face in ('L', 'F', 'R', 'B')) for r in range(n)]
+    lines += [pad + marks('D', r) for r in range(n)]
+    return '\n'.join(lines)
+
+def _cell_char(engine, pos):
+    if pos in engine.game.kaiju_positions: return 'K'
+    marker = engine.game.marker_state[pos[0]][pos[1]][pos[2]]
+    if marker: return marker
+    egg = engine.game.egg_positions.get(pos)
+    return {'golden': '*', 'normal': 'e'}.get(egg, '.')
+
+def make_players(spec, engine_mode, rng, depth=4, time_limit=0.4, tablebase=None):
+    # ... ("random,ai" のような指定から、各プレイヤーの担当を作る)
+    # "ai:6" で探索の深さ、"mcts:500" で MCTS の1手あたりの時間(ミリ秒)、"expecti:3" で期待値探索の深さも指定できる
+    # 3人対戦の "ai" は paranoid 探索。"maxn:4" / "paranoid:4" で読み方と深さを選べる
+    markers = PLAYER_MARKERS if engine_mode == '3P' else PLAYER_MARKERS[:2]
+    if spec is None:
+        spec = 'random,ai' if engine_mode == 'AI' else ','.join(['random'] * len(markers))
+    kinds = spec.split(',')
+    if len(kinds) != len(markers):
+        raise ValueError(f"--players には {len(markers)} 人分を指定してください")
+    players = {}
+    for marker, kind in zip(markers, kinds):
+        kind, _, kind_depth = kind.partition(':')
+        if kind == 'random': players[marker] = RandomPlayer(rng)
+        elif kind == 'ai': players[marker] = AIPlayer(marker, rng, depth=int(kind_depth or depth), time_limit=time_limit, tablebase=tablebase)
+        elif kind == 'greedy': players[marker] = AIPlayer(marker, rng, depth=0)
+        elif kind in ('maxn', 'paranoid'): players[marker] = AIPlayer(marker, rng, depth=int(kind_depth or depth), time_limit=time_limit, multi=kind)
+        elif kind == 'mcts': players[marker] = MCTSPlayer(marker, rng, time_limit_ms=int(kind_depth or 300))
+        elif kind == 'expecti': players[marker] = ExpectimaxPlayer(marker, rng, depth=int(kind_depth or 2), time_limit=time_limit)
+        else: raise ValueError(f"不明なプレイヤーの種類です: {kind}")
+    return players
+
+def play_game(engine, players, max_turns, observer=None, recorder=None):
+    # ... (1局を最後まで進め、勝者(引き分けは None、打ち切りは 'unfinished')を返す)
+    # observer を渡すと、行動のたびに observer(engine) を呼ぶ。recorder を渡すと、行動をそれに記録する
+    play = recorder.play if recorder else engine.play
+    while not engine.game_over:
+        if engine.turn_count >= max_turns: return 'unfinished'
+        player = players[engine.current_player]
+        play(player.choose_action(engine))
+        engine.pop_events()
+        if observer: observer(engine)
+    return engine.winner
+
+def run_script(args):
+    engine = GameEngine(args.ruleset, args.mode, args.kaiju, args.seed, args.size, args.win)
+    with open(args.script, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            action = parse_action(line)
+            if action is None: continue
+            if engine.game_over: break
+            player = engine.current_player
+            if not engine.play(action):
+                print(f"{line_no}行目: {player} の行動 {action} は受け付けられませんでした ({engine.status_message})")
+                return 1
+            if args.verbose:
+                print(f"{line_no}行目: {player} {action} -> {engine.status_message}")
+                print(format_board(engine)); print()
+    print(f"結果: {engine.winner + ' の勝ち' if engine.winner else ('引き分け' if engine.game_over else '未決着')} ({engine.turn_count}手)")
+    return 0
+
+def run_games(args):
+    tally = {}
+    total_turns = 0
+    raw_positions, canonical_positions = set(), set()
+    observer = None
+    if args.symmetry_stats:
+        def observer(engine):
+            raw_positions.add(position_boards(engine.game) + (engine.current_player,))
+            canonical_positions.add(canonical_position(engine.game, engine.current_player)[0])
+    record_file = open(args.record, 'ab') if args.record else None
+    tablebase = Tablebase.open(args.tablebase)
+    telemetry = Telemetry() if args.telemetry else None
+    start = time.perf_counter()
+    for i in range(args.games):
+        seed = None if args.seed is None else args.seed + i
+        rng = random.Random(seed)
+        engine = GameEngine(args.ruleset, args.mode, args.kaiju, seed, args.size, args.win)
+        players = make_players(args.players, args.mode, rng, args.depth, tablebase=tablebase)
+        recorder = GameRecorder(record_file, engine, seed) if record_file else None
+        if telemetry:
+            telemetry.instrument_engine(engine)
+            for player in {id(p): p for p in players.values()}.values(): telemetry.instrument_player(player)
+        result = play_game(engine, players, args.max_turns, observer, recorder)
+        if recorder: recorder.close()
+        if telemetry: telemetry.detach()
+        tally[result] = tally.get(result, 0) + 1
+        total_turns += engine.turn_count
+        if args.verbose:
+            print(f"第{i + 1}局: {result} ({engine.turn_count}手)")
+            print(format_board(engine)); print()
+    elapsed = time.perf_counter() - start
+    if record_file: record_file.close()
+
+    print_tally(args, tally, total_turns, elapsed)
+    if telemetry:
+        print('\n'.join(telemetry.overlay_lines()))
+        telemetry.close(); telemetry.export(args.telemetry)
+    if args.symmetry_stats and canonical_positions:
+        print(f"異なる局面: {len(raw_positions)} / 対称性でまとめると {len(canonical_positions)} "
+              f"({len(raw_positions) / len(canonical_positions):.2f}分の1)")
+    return 0
+
+def run_batch(args):
+    # ... (ランダム同士の対局を BatchEngine でまとめて進める。NumPy が必要)
+    from batch_engine import BatchEngine
+    if args.players is not None and set(args.players.split(',')) != {'random'}:
+        print("--batch ではランダム同士の対局だけを実行できます")
+        return 1
+    start = time.perf_counter()
+    engine = BatchEngine(args.games, args.ruleset, args.mode, args.kaiju, args.seed, args.max_turns)
+    _, turns = engine.run()
+    print_tally(args, engine.tally(), int(turns.sum()), time.perf_counter() - start)
+    return 0
+
+def print_tally(args, tally, total_turns, elapsed):
+    # ... (勝敗の集計・平均手数・速度を表示する)
+    print(f"ルール: {args.ruleset} / モード: {args.mode} / 対局数: {args.games}")
+    for key in PLAYER_MARKERS + [None, 'unfinished']:
+        if key in tally:
+            label = {None: '引き分け', 'unfinished': '打ち切り'}.get(key, f"{key} の勝ち")
+            print(f"  {label}: {tally[key]} ({tally[key] / args.games:.1%})")
+    print(f"平均手数: {total_turns / max(args.games, 1):.1f}")
+    print(f"時間: {elapsed:.2f}秒 ({args.games / elapsed:.1f} 局/秒)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='キューブ○×ゲームをコマンドラインで実行します。')
+    parser.add_argument('--ruleset', choices=['normal', 'custom'], default='normal', help='normal: ノーマルモード / custom: 怪獣モード')
+    parser.add_argument('--mode', choices=['2P', '3P', 'AI'], default='2P')
+    parser.add_argument('--kaiju', type=int, default=1, help='怪獣の数(怪獣モードのみ)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--players', default=None, help='各プレイヤーの担当(random / greedy / ai / ai:深さ / mcts / mcts:ミリ秒 / expecti / expecti:深さ / maxn / paranoid)。例: random,ai:6')
+    parser.add_argument('--depth', type=int, default=4, help='ai プレイヤーの探索の深さ')
+    parser.add_argument('--max-turns', type=int, default=1000, help='この手数で決着しなければ打ち切り')
+    parser.add_argument('--script', default=None, help='行動を書いたファイルの通りに1局を進める')
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--batch', action='store_true', help='ランダム同士の対局を NumPy でまとめて実行する')
+    parser.add_argument('--symmetry-stats', action='store_true', help='対局中に現れた局面を数え、対称性でまとめたときの数と比べる')
+    parser.add_argument('--tablebase', default=None, help='ai プレイヤーに使わせる局面の表(tablebase_gen.py で作る)')
+    parser.add_argument('--record', default=None, help='対局をこのファイルに追記で記録する(game_record.py で読める)')
+    parser.add_argument('--size', type=int, default=3, help='キューブの1面のマスの数(3〜7)')
+    parser.add_argument('--win', type=int, default=None, help='何個揃えたら勝ちか(省略すると 3×3 は3、それより大きいと4)')
+    parser.add_argument('--telemetry', default=None, help='ターン・AI の時間を計測してこのファイルに書き出す(.trace.json なら Chrome のトレース形式)')
+    args = parser.parse_args(argv)
+    args.kaiju = max(1, min(MAX_KAIJU_TOTAL, args.kaiju))
+    try:
+        standard = geometry(args.size, args.win).standard
+    except ValueError as e:
+        parser.error(str(e))
+    if not standard and (args.batch or args.record or args.symmetry_stats):
+        parser.error('--batch / --record / --symmetry-stats は 3×3×3 で3つ揃えのときだけ使えます')
+    if args.script: return run_script(args)
+    return run_batch(args) if args.batch else run_games(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
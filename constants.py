@@ -14,11 +14,32 @@ ALL_MOVES = [                                # キューブの全ての回転
     "M", "M'", "E", "E'"
 ]
 
+# --- プレイヤーの設定 ---
+PLAYER_MARKERS = ['O', 'X', '△']             # 手番の順に並んだ各プレイヤーのマーク
+CUBE_SIZE = 3       # 画面で遊ぶキューブの1面のマスの数(3〜7)。ALL_MOVES は 3×3×3 の回転
+WIN_LENGTH = None   # 何個揃えたら勝ちか。None なら 3×3×3 は3つ、それより大きいキューブは4つ
+
 # --- UI(見た目)に関する設定 ---
 TILE_SIZE = 60      # 1マスの大きさ
 GAP = 6             # マスとマスの間の隙間
 FACE_GAP = 25       # 面と面の間の隙間
 BUTTON_SIZE = 50    # 回転ボタンの大きさ
+SHOW_FRAME_STATS = False  # True にすると、画面の左下に描画の時間と描画命令の数を表示する
+TELEMETRY = False         # True にすると、ターン・AI・フレームなどの時間を計測して、画面の左上に分布を表示する(telemetry.py)
+TELEMETRY_FILE = None     # 計測した内容を書き出すファイル名。.trace.json で終わると Chrome のトレース形式、それ以外は集計の JSON
+GAME_RECORD_FILE = None   # ファイル名を入れると、画面で遊んだ対局をそのファイルに追記で記録する(game_record.py で読める)
+BACKGROUND_SCALE = 1.0    # 背景画像の解像度(画面の点の数に対する倍率)。暗く重ねて使うので等倍で十分
+
+# --- 画像と効果音 ---
+BACKGROUND_IMAGES = {'title': 'IMG_0474.JPG', 'player_selection': 'IMG_0474.JPG',
+                     'rules': 'IMG_0479.JPG', 'playing': 'IMG_0473.JPG'}  # 画面ごとの背景画像
+SOUND_EFFECTS = ['game:Error', 'game:Ding_3', 'arcade:Jump_1', 'game:Loss_1', 'arcade:Powerup_1']  # 先読みする効果音
+
+# --- AI に関する設定 ---
+TABLEBASE_FILE = 'tablebase.bin'  # ノーマルモードの解析済みの局面の表(tablebase_gen.py で作る。なければ使わない)
+AI_THINK_TIME = 0.4   # 画面の AI が1手に考える時間(秒)。別のスレッドで考えるので、長くしても画面は止まらない
+AI_MOVE_DELAY = 0.5   # AI の番になってから指すまでの最短の時間(秒)。速く考え終わっても、この時間は待つ
+KAIJU_AI = 'mcts'     # 怪獣モードの AI。'mcts'(モンテカルロ木探索)か 'expectimax'(怪獣と卵の確率を読む期待値探索)
 
 # --- 怪獣に関する設定 ---
 MAX_KAIJU_ON_F_FACE = 4  # F面に初期配置できる怪獣の最大数
@@ -0,0 +1,131 @@
+# cube_geometry.py
+
+# ===================================================================================
+# 1面が N×N のキューブ(N×N×N)で使う表を、大きさごとにまとめるファイルです。
+# - マスの通し番号、F面で k 個並ぶライン、怪獣の移動先、隣り合うマス
+# - すべての層の回転(外側の U/D/L/R と、内側の M1, M2, ... / E1, E2, ...)の並べ替え表
+# - ビットボードの回転に使う参照表と、ゾブリストハッシュの乱数
+# 表は geometry(n, k) を初めて呼んだときに1回だけ作り、以後は同じものを使い回します。
+# 回転の参照表はさらに、その回転を初めて使ったときに作ります(大きいキューブでも起動が速い)。
+# 3×3×3 で3つ揃え(いつものゲーム)のときは、cube_moves / bitboard / zobrist の表をそのまま使います。
+#
+# 使い方の例:
+#   from cube_geometry import geometry
+#   g = geometry(5)               # 5×5×5、4つ揃えで勝ち
+#   board = g.rotate_bits(board, 'M2')
+#   g.projection.completes(board, ('R',))   (R と回したら F面で揃うか。盤面は回さない)
+# ===================================================================================
+
+import cube_moves
+import bitboard
+import zobrist
+from constants import FACE_KEYS
+from cube_moves import (FACE_INDEX, face_cells, face_lines, kaiju_next_steps, face_neighbours,
+                        layer_turns, move_names, build_move_sources, inverse_moves, _invert)
+from bitboard import build_permutation_tables, permute_wide_bits
+from zobrist import build_zobrist_tables
+
+MIN_SIZE, MAX_SIZE = 3, 7
+
+def default_win_length(n):
+    # ... (何個並べたら勝ちか。3×3 では3つ、それより大きいキューブでは4つ(4×4 なら1列全部))
+    return 3 if n == 3 else 4
+
+class CubeGeometry:
+    """
+    1面が n×n のキューブの表一式。属性の名前は cube_moves / bitboard / zobrist の定数を
+    小文字にしたものです(cells, cell_index, lines, line_masks, moves, sources, destinations, ...)。
+    rotate_bits(board, move) と has_line(board) で、ビットボードを回転・勝利判定できます。
+    standard は 3×3×3 で3つ揃えのときだけ True で、その表を前提にした機能(解析済みの局面の表・
+    MCTS・対局の記録など)が使えるかの目印です。
+    """
+    def __init__(self, n=3, win_length=None):
+        if not MIN_SIZE <= n <= MAX_SIZE: raise ValueError(f"キューブの大きさは {MIN_SIZE}〜{MAX_SIZE} です: {n}")
+        k = win_length or default_win_length(n)
+        if not 2 <= k <= n: raise ValueError(f"揃える数は 2〜{n} です: {k}")
+        self.n, self.win_length = n, k
+        self.standard = n == 3 and k == 3   # いつものゲーム(3×3×3・3つ揃え)か
+        self.face_index = FACE_INDEX
+        self.face_size = n * n
+        self.num_cells = len(FACE_KEYS) * n * n
+        standard = n == 3
+        if standard:
+            # いつもの大きさでは、同じ中身の既存の表を使う(作り直さない・別物にしない)
+            self.cells, self.cell_index = cube_moves.CELLS, cube_moves.CELL_INDEX
+            self.moves, self.layers = list(cube_moves.MOVE_SOURCES), cube_moves.LAYER_TURNS
+            self.sources, self.destinations = cube_moves.MOVE_SOURCES, cube_moves.MOVE_DESTINATIONS
+            self.inverse = cube_moves.INVERSE_MOVES
+            self.kaiju_next_step, self.face_neighbours = cube_moves.KAIJU_NEXT_STEP, cube_moves.FACE_NEIGHBOURS
+            (self.marker_keys, self.kaiju_keys, self.egg_keys, self.side_keys, self.moved_masks,
+             self.marker_rotation_deltas, self.kaiju_rotation_deltas) = (
+                zobrist.MARKER_KEYS, zobrist.KAIJU_KEYS, zobrist.EGG_KEYS, zobrist.SIDE_KEYS, zobrist.MOVED_MASKS,
+                zobrist.MARKER_ROTATION_DELTAS, zobrist.KAIJU_ROTATION_DELTAS)
+        else:
+            self.cells = face_cells(n)
+            self.cell_index = {pos: i for i, pos in enumerate(self.cells)}
+            self.moves, self.layers = move_names(n), layer_turns(n)
+            self.sources = build_move_sources(n)
+            self.destinations = {move: _invert(src) for move, src in self.sources.items()}
+            self.inverse = inverse_moves(self.sources)
+            self.kaiju_next_step, self.face_neighbours = kaiju_next_steps(n), face_neighbours(n)
+            (self.marker_keys, self.kaiju_keys, self.egg_keys, self.side_keys, self.moved_masks,
+             self.marker_rotation_deltas, self.kaiju_rotation_deltas) = build_zobrist_tables(self.num_cells, self.destinations)
+        self.f_face_cells = [self.cell_index[('F', r, c)] for r in range(n) for c in range(n)]
+        self.lines = cube_moves.F_LINES if self.standard else face_lines(n, k)
+        self.line_masks = [sum(1 << i for i in line) for line in self.lines]
+        self.full_mask = (1 << self.num_cells) - 1
+        self.f_face_mask = sum(1 << i for i in self.f_face_cells)
+        # 画面のボタン・CLI の行動から回転の名前を引くための表: (向き, 番号, 送り方向) -> 回転
+        self.layer_moves = {turn: move for move, turn in self.layers.items()}
+        if standard:
+            self._rotation_tables = bitboard.ROTATION_TABLES
+            self.rotate_bits = bitboard.rotate_bits
+        else:
+            self._rotation_tables = {}
+        if self.standard: self.has_line = bitboard.has_line
+        self._projection = None
+
+    def __repr__(self):
+        return f"CubeGeometry({self.n}, win_length={self.win_length})"
+
+    @property
+    def projection(self):
+        # ... (回転の後に F面へ来るマスの表(projection.FaceProjection)。初めて使うときに作る)
+        if self._projection is None:
+            from projection import FaceProjection   # projection はこのファイルを使うので、ここで読み込む
+            self._projection = FaceProjection(self)
+        return self._projection
+
+    def rotation_tables(self, move):
+        # ... (回転 move のビットの参照表。初めて使うときに作る)
+        tables = self._rotation_tables.get(move)
+        if tables is None:
+            tables = self._rotation_tables[move] = build_permutation_tables(self.destinations[move])
+        return tables
+
+    def rotate_bits(self, board, move):
+        # ... (ビットボードに回転を適用する)
+        tables = self._rotation_tables.get(move) or self.rotation_tables(move)
+        return permute_wide_bits(board, tables)
+
+    def has_line(self, board):
+        # ... (F面に k 個揃ったラインがあるか。F面のマークが k 個未満なら調べない)
+        if (board & self.f_face_mask).bit_count() < self.win_length: return False
+        for mask in self.line_masks:
+            if board & mask == mask: return True
+        return False
+
+    def button_move(self, bank, index):
+        # ... (画面の回転ボタン(並び, 番号)に対応する回転。左右のボタンは横の層、上下のボタンは縦の層)
+        kind, direction = {'left': ('row', 'right'), 'right': ('row', 'left'),
+                           'top': ('col', 'down'), 'bottom': ('col', 'up')}[bank]
+        return self.layer_moves[(kind, index, direction)]
+
+_GEOMETRIES = {}
+
+def geometry(n=3, win_length=None):
+    # ... (大きさ n・k 個揃えのキューブの表。同じ組み合わせでは前に作ったものを返す)
+    key = (n, win_length or default_win_length(n))
+    g = _GEOMETRIES.get(key)
+    if g is None: g = _GEOMETRIES[key] = CubeGeometry(*key)
+    return g
@@ -0,0 +1,159 @@
+# cube_moves.py
+
+# ===================================================================================
+# キューブの回転を「インデックスの並べ替え表」として事前計算するファイルです。
+# - 54枚のステッカーを一列に並べた「フラット配置」の定義
+# - ALL_MOVES の16種類の回転それぞれに対応する並べ替え表
+# GameLogic(本番のゲーム)も AIPlayer(先読み)もこの表だけを使って回転するため、
+# 両者の回転結果が食い違うことはありません。
+#
+# 表を作る関数は1面の大きさ n を引数に取り、N×N×N のキューブにも使えます
+# (n を省略すると 3)。このファイルの定数は 3×3×3 の表で、それ以外の大きさの表は
+# cube_geometry.py が大きさごとに1回だけ作ります。
+# ===================================================================================
+
+from constants import FACE_KEYS, ALL_MOVES
+
+# --- フラット配置 ---
+# マス (face, r, c) は FACE_KEYS の順に 9 マスずつ並べた通し番号で表します。
+# 例: U面は 0〜8、F面は 18〜26。
+FACE_INDEX = {face: i for i, face in enumerate(FACE_KEYS)}
+NUM_CELLS = len(FACE_KEYS) * 9
+CELLS = [(face, r, c) for face in FACE_KEYS for r in range(3) for c in range(3)]
+CELL_INDEX = {pos: i for i, pos in enumerate(CELLS)}
+F_FACE_CELLS = [CELL_INDEX[('F', r, c)] for r in range(3) for c in range(3)]
+
+def cell_index(face, r, c, n=3):
+    # (face, r, c) -> 通し番号
+    return FACE_INDEX[face] * n * n + r * n + c
+
+def face_cells(n):
+    # ... (1面の大きさが n のときの全マス (face, r, c) の一覧。通し番号の順)
+    return [(face, r, c) for face in FACE_KEYS for r in range(n) for c in range(n)]
+
+def face_lines(n, k):
+    # ... (F面で k 個並ぶライン(横・縦・斜め・逆斜め)の通し番号の一覧。n=3, k=3 なら横3本・縦3本・斜め2本)
+    starts = [(r, c) for r in range(n) for c in range(n - k + 1)]
+    lines = [[(r, c + i) for i in range(k)] for r, c in starts]
+    lines += [[(r + i, c) for i in range(k)] for c, r in starts]
+    lines += [[(r + i, c + i) for i in range(k)] for r in range(n - k + 1) for c in range(n - k + 1)]
+    lines += [[(r + i, c + k - 1 - i) for i in range(k)] for r in range(n - k + 1) for c in range(n - k + 1)]
+    return [tuple(cell_index('F', r, c, n) for r, c in line) for line in lines]
+
+# F面で3つ揃うライン(横3本・縦3本・斜め2本)の通し番号
+F_LINES = face_lines(3, 3)
+
+# --- 怪獣の移動に使うマスのつながり ---
+def _next_step_to_f_face(face, r, c, n=3):
+    # ... (F面へ向かう怪獣の次のマス。U/D/L/R 面からはF面へまっすぐ、B面からは R面を通って進む)
+    last = n - 1
+    if face == 'U': return cell_index('F', 0, c, n) if r == 0 else cell_index(face, r - 1, c, n)
+    if face == 'D': return cell_index('F', last, c, n) if r == last else cell_index(face, r + 1, c, n)
+    if face == 'L': return cell_index('F', r, 0, n) if c == last else cell_index(face, r, c + 1, n)
+    if face == 'R': return cell_index('F', r, last, n) if c == 0 else cell_index(face, r, c - 1, n)
+    if face == 'B': return cell_index('R', r, last, n) if c == 0 else cell_index(face, r, c - 1, n)
+    return cell_index(face, r, c, n)
+
+def kaiju_next_steps(n):
+    return tuple(_next_step_to_f_face(*cell, n) for cell in face_cells(n))
+
+def face_neighbours(n):
+    return tuple(tuple(cell_index(face, r + dr, c + dc, n) for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                       if (dr or dc) and 0 <= r + dr < n and 0 <= c + dc < n)
+                 for face, r, c in face_cells(n))
+
+# KAIJU_NEXT_STEP[i]  : マス i の怪獣がF面へ向かって次に進むマス(F面のマスは自分自身)
+# FACE_NEIGHBOURS[i]  : マス i と同じ面で上下左右斜めに隣り合うマス(上の行から順に最大8つ)
+KAIJU_NEXT_STEP = kaiju_next_steps(3)
+FACE_NEIGHBOURS = face_neighbours(3)
+
+# --- 各回転の定義 ---
+# 面そのものの回転: 回転名 -> (回す面, 時計回りか)
+FACE_TURNS = {
+    "U": ('U', True), "U'": ('U', False), "D": ('D', True), "D'": ('D', False),
+    "R": ('R', False), "R'": ('R', True), "L": ('L', False), "L'": ('L', True),
+    "F": ('F', True), "F'": ('F', False), "B": ('B', True), "B'": ('B', False),
+}
+# 層の回転: 回転名 -> (向き, 行/列の番号, 送り方向)
+#   'row'  : F/R/B/L の横一列。'left' は F->L->B->R->F、'right' はその逆
+#   'col'  : U/F/D/B の縦一列。'down' は U->F->D->B->U、'up' はその逆
+#   外側の層(U/D/L/R)の回転では、その面そのものも回る。内側の層は M(縦)と E(横)で、
+#   n が4以上なら層の番号を付けて M1, M2, ... / E1, E2, ... と呼ぶ
+def layer_turns(n):
+    # ... (1面の大きさが n のときの、層の回転の一覧。n=3 なら下の LAYER_TURNS と同じ)
+    last = n - 1
+    turns = {
+        "U": ('row', 0, 'left'), "U'": ('row', 0, 'right'),
+        "D": ('row', last, 'right'), "D'": ('row', last, 'left'),
+        "L": ('col', 0, 'up'), "L'": ('col', 0, 'down'),
+        "R": ('col', last, 'down'), "R'": ('col', last, 'up'),
+    }
+    for kind, name, forward, backward in (('col', 'M', 'down', 'up'), ('row', 'E', 'left', 'right')):
+        for i in range(1, last):
+            label = name if n == 3 else f"{name}{i}"
+            turns[label] = (kind, i, forward); turns[label + "'"] = (kind, i, backward)
+    return turns
+
+def move_names(n):
+    # ... (1面の大きさが n のときの回転の名前の一覧。n=3 なら ALL_MOVES と同じ並び)
+    inner = [name for name in layer_turns(n) if name[0] in 'ME']
+    return ALL_MOVES[:12] + [name for name in inner if name[0] == 'M'] + [name for name in inner if name[0] == 'E']
+
+LAYER_TURNS = layer_turns(3)
+
+def _layer_assignments(kind, index, direction, n=3):
+    # ... (「移動先の列 <- 移動元の列」の組を返す)
+    if kind == 'row':
+        f, r, b, l = ([cell_index(face, index, c, n) for c in range(n)] for face in ('F', 'R', 'B', 'L'))
+        if direction == 'left': return [(l, f), (f, r), (r, b), (b, l)]
+        return [(r, f), (f, l), (l, b), (b, r)]
+    # 縦の列では、B面は左右が反転した列が上下逆さまに繋がる
+    u, f, d = ([cell_index(face, r, index, n) for r in range(n)] for face in ('U', 'F', 'D'))
+    b = [cell_index('B', r, n - 1 - index, n) for r in range(n)][::-1]
+    if direction == 'down': return [(f, u), (d, f), (b, d), (u, b)]
+    return [(b, u), (d, b), (f, d), (u, f)]
+
+def build_move_sources(n=3):
+    # ... (回転ごとに、回転後の各マスへ入るのが「回転前のどのマスか」を表す表を作る)
+    layers = layer_turns(n)
+    table = {}
+    for move in move_names(n):
+        sources = list(range(len(FACE_KEYS) * n * n))
+        if move in FACE_TURNS:
+            face, clockwise = FACE_TURNS[move]
+            for r in range(n):
+                for c in range(n):
+                    src = cell_index(face, n - 1 - c, r, n) if clockwise else cell_index(face, c, n - 1 - r, n)
+                    sources[cell_index(face, r, c, n)] = src
+        if move in layers:
+            for dest, src in _layer_assignments(*layers[move], n):
+                for d, s in zip(dest, src): sources[d] = s
+        table[move] = tuple(sources)
+    return table
+
+def _invert(sources):
+    destinations = [0] * len(sources)
+    for dest, src in enumerate(sources): destinations[src] = dest
+    return tuple(destinations)
+
+# MOVE_SOURCES[move][i]      : 回転後のマス i に入る、回転前のマス番号
+# MOVE_DESTINATIONS[move][i] : 回転前のマス i が、回転後に移動する先のマス番号
+MOVE_SOURCES = build_move_sources(3)
+MOVE_DESTINATIONS = {move: _invert(src) for move, src in MOVE_SOURCES.items()}
+
+def apply_move(layer, move):
+    # ... (54マス分のリストに回転を適用した新しいリストを返す)
+    return [layer[i] for i in MOVE_SOURCES[move]]
+
+def inverse_moves(sources):
+    # ... (回転ごとに、続けて行うと元に戻る回転を探す)
+    by_sources = {src: move for move, src in sources.items()}
+    inverse = {}
+    for move, src in sources.items():
+        other = by_sources.get(_invert(src))
+        if other is None: raise ValueError(f"{move} の逆回転がありません")
+        inverse[move] = other
+    return inverse
+
+# INVERSE_MOVES[move]: move を打ち消す回転(U <-> U' など)
+INVERSE_MOVES = inverse_moves(MOVE_SOURCES)
@@ -0,0 +1,273 @@
+# expectimax.py
+
+# ===================================================================================
+# 怪獣モードの「偶然」を確率どおりに読む AI(期待値探索, expectimax)のファイルです。
+# 2人が交互に指す手番はアルファベータ探索(search.AlphaBetaSearch)と同じネガマックスで読み、
+# 手を指した後の怪獣の番と、卵から出るマークは「偶然の局面」として、起こりうる結果の値を
+# 確率で重み付けした平均(期待値)で評価します。結果と確率は chance.ChanceModel が作ります。
+# 偶然の局面でも、アルファベータと同じように読まなくてよい結果を刈ります。
+# - Star1: 調べ終えた結果の値と、残りの結果の値の上限・下限(勝ち・負けの点)から期待値の範囲を出し、
+#          それが窓(alpha〜beta)の外に出ると分かった時点で、残りの結果を調べずに打ち切る
+# - Star2: 先に各結果の「最初の1手だけ」を調べて相手の番の値の下限(こちらから見た上限)を出し、
+#          その合計だけで alpha 以下と分かれば打ち切る。分からなくても、残りの上限が狭まる
+# 最初の1手の結果は置換表に残るので、Star2 で先に調べた分は、続けて全部を読むときにそのまま使われます。
+# 怪獣の結果は怪獣の配置ごとに覚えておくので、怪獣が MAX_KAIJU_TOTAL 体いても、
+# 同じ配置の数え上げ(または見積もり)は1回だけです。
+#
+# 使い方の例:
+#   ai = ExpectimaxPlayer('X', depth=2, time_limit=0.4)
+#   action = ai.choose_action(engine)
+#   python cli.py --ruleset custom --kaiju 3 --players mcts,expecti --games 20
+# ===================================================================================
+
+import random
+from constants import GOLDEN_EGG_INTERVAL, GOLDEN_EGG_MARKERS, NORMAL_EGG_MARKERS
+from bitboard import iter_bits
+from chance import ChanceModel
+from search import AlphaBetaSearch, SearchTimeout, WIN_SCORE, _INFINITY, _EXACT, _LOWER, _UPPER, _score_to_tt, _score_from_tt
+
+class ExpectimaxSearch(AlphaBetaSearch):
+    """
+    怪獣の番と卵を偶然の局面として読む、2人対戦用の期待値探索。
+    search() には卵を普通の卵と金の卵のマスクに分けて、怪獣がそれまでに動いた回数と一緒に渡します。
+    卵を選ぶ手は、その卵のマスにマークを置く手の番号で表します(GameEngine.apply_action と同じ)。
+    probe=False にすると Star2 の先読みをせず、Star1 だけで刈ります(比べる用)。
+    """
+    def __init__(self, depth=3, time_limit=None, max_quiet_moves=6, tt_limit=200000, geometry=None,
+                 kaiju_samples=4, egg_samples=4, max_egg_moves=2, probe=True):
+        super().__init__(depth, time_limit, max_quiet_moves, tt_limit, geometry)
+        self.chance = ChanceModel(self.geometry)
+        self.kaiju_samples = kaiju_samples   # 怪獣の番の結果がこれより多いときは、この回数引いた割合で見積もる
+        self.egg_samples = egg_samples       # 卵のマークの出方を見積もるときに引く回数
+        self.max_egg_moves = max_egg_moves   # 根以外で調べる普通の卵の数(金の卵は全部調べる)
+        self.probe = probe
+        self.chance_nodes = 0     # 怪獣の番と卵の、偶然の局面の数
+        self.chance_cutoffs = 0   # そのうち Star1 / Star2 で打ち切った数
+
+    def search(self, me, opp, kaiju=0, normal_eggs=0, golden_eggs=0, kaiju_moves=0, progress=None, cancel=None):
+        # ... (AlphaBetaSearch.search() と同じ反復深化。卵の状態は (普通, 金, 金の卵まで) にまとめて渡していく)
+        self.chance_nodes = self.chance_cutoffs = 0
+        eggs = (normal_eggs, golden_eggs, kaiju_moves % GOLDEN_EGG_INTERVAL)
+        return super().search(me, opp, kaiju, eggs, progress, cancel)
+
+    def _root(self, me, opp, kaiju, eggs, depth):
+        key = (me, opp, kaiju) + eggs
+        alpha, beta = -_INFINITY, _INFINITY
+        entry = self.tt.get(key)
+        best_code, best_score = None, -_INFINITY
+        for code in self._ordered_moves(me, opp, kaiju, eggs, entry[3] if entry else None, True):
+            score = self._child_score(me, opp, kaiju, eggs, code, depth, alpha, beta, 0)
+            if score > best_score: best_code, best_score = code, score
+            if score > alpha: alpha = score
+        self.tt[key] = (depth, best_score, _EXACT, best_code)
+        return best_code, best_score
+
+    def _node(self, me, opp, kaiju, eggs, depth, alpha, beta, ply, probe=False):
+        # ... (手番の局面の値。probe=True なら最初の1手だけを調べて、その値(この局面の値の下限)を返す)
+        self.nodes += 1
+        if not self.nodes & 1023 and self._should_stop(): raise SearchTimeout()
+        if depth <= 0: return self.evaluate(me, opp)
+
+        key = (me, opp, kaiju) + eggs
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                tt_score = _score_from_tt(tt_score, ply)
+                if tt_flag == _EXACT: return tt_score
+                if tt_flag == _LOWER and tt_score >= beta: return tt_score
+                if tt_flag == _UPPER and tt_score <= alpha: return tt_score
+
+        original_alpha = alpha
+        best_code, best_score = None, -_INFINITY
+        for code in self._ordered_moves(me, opp, kaiju, eggs, tt_move, False):
+            score = self._child_score(me, opp, kaiju, eggs, code, depth, alpha, beta, ply)
+            if probe: return score
+            if score > best_score:
+                best_code, best_score = code, score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.history[code] += depth * depth
+                        break
+
+        flag = _UPPER if best_score <= original_alpha else (_LOWER if best_score >= beta else _EXACT)
+        self.tt[key] = (depth, _score_to_tt(best_score, ply), flag, best_code)
+        return best_score
+
+    def _child_score(self, me, opp, kaiju, eggs, code, depth, alpha, beta, ply):
+        # ... (手を指した後の値を、手番側から見た値で返す。勝ちが決まらなければ、怪獣の番へ進む)
+        has_line = self._has_line
+        if code >= self.rotation_base:
+            move = self.moves[code - self.rotation_base]
+            rotate = self._rotate
+            me2, opp2 = rotate(me, move), rotate(opp, move)
+            kaiju2 = rotate(kaiju, move) if kaiju else 0
+            mine, theirs = has_line(me2), has_line(opp2)
+            if mine and theirs: return 0
+            if mine: return WIN_SCORE - ply
+            if theirs: return -(WIN_SCORE - ply)
+            return self._kaiju_turn(me2, opp2, kaiju2, eggs, depth, alpha, beta, ply)
+        bit = 1 << code
+        if (eggs[0] | eggs[1]) & bit: return self._egg_turn(me, opp, kaiju, eggs, bit, depth, alpha, beta, ply)
+        me2 = me | bit
+        if has_line(me2): return WIN_SCORE - ply
+        return self._kaiju_turn(me2, opp, kaiju, eggs, depth, alpha, beta, ply)
+
+    def _egg_turn(self, me, opp, kaiju, eggs, bit, depth, alpha, beta, ply):
+        # ... (卵 bit を選んだ後。マークの出方ごとの値の期待値)
+        normal, golden, phase = eggs
+        num_marks = GOLDEN_EGG_MARKERS if golden & bit else NORMAL_EGG_MARKERS
+        eggs2 = (normal & ~bit, golden & ~bit, phase)
+        # 使った卵のマスにもマークが出られる(卵のマスには、マークも怪獣もいない)
+        spots = self._full_mask & ~(me | opp | kaiju | normal | golden) | bit
+        outcomes, _ = self.chance.egg_outcomes(spots, num_marks, self.egg_samples)
+        has_line = self._has_line
+        def value(marks, a, b):
+            me2 = me | marks
+            if has_line(me2): return WIN_SCORE - ply
+            return self._kaiju_turn(me2, opp, kaiju, eggs2, depth, a, b, ply)
+        if len(outcomes) == 1: return value(outcomes[0][1], alpha, beta)
+        self.chance_nodes += 1
+        return self._expect(outcomes, value, alpha, beta)
+
+    def _kaiju_turn(self, me, opp, kaiju, eggs, depth, alpha, beta, ply):
+        # ... (手番側が指した後、怪獣の番を経た相手の番の局面の値を、手番側から見た値で返す)
+        if not kaiju: return -self._node(opp, me, kaiju, eggs, depth - 1, -beta, -alpha, ply + 1)
+        # 初めての怪獣の配置は数え上げに時間がかかるので、局面の数とは別に、偶然の局面 64 個ごとにも時間を確かめる
+        self.chance_nodes += 1
+        if not self.chance_nodes & 63 and self._should_stop(): raise SearchTimeout()
+        normal, golden, phase = eggs
+        if depth <= 1:
+            # 読みの最後は静的評価だけなので、怪獣が来て消えるマークが同じ結果は、まとめて1回だけ評価する
+            # (怪獣が来うるマスにマークがなければ、どの結果も同じ局面なので1回で済む)
+            arrivals, reach = self.chance.kaiju_arrivals(kaiju, phase, self.kaiju_samples)
+            marks = (me | opp) & reach
+            if not marks:
+                self.nodes += 1
+                return -self.evaluate(opp, me)
+            merged = {}
+            for p, arrived in arrivals:
+                hit = arrived & marks
+                merged[hit] = merged.get(hit, 0.0) + p
+            self.nodes += len(merged)
+            return -sum(p * self.evaluate(opp & ~hit, me & ~hit) for hit, p in merged.items())
+        # 途中の局面でも、怪獣が空いているマスに来ただけの違いしかない結果は同じ局面になるので、1つにまとめる
+        outcomes, _ = self.chance.kaiju_outcomes(kaiju, phase, self.kaiju_samples)
+        merged = {}
+        for p, o in outcomes:
+            keep = ~o.arrived
+            child = (opp & keep, me & keep, o.kaiju, o.eggs(normal, golden) + ((phase + o.moved) % GOLDEN_EGG_INTERVAL,))
+            merged[child] = merged.get(child, 0.0) + p
+        children = [(p, child) for child, p in merged.items()]
+        def value(child, a, b):
+            return -self._node(*child, depth - 1, -b, -a, ply + 1)
+        if len(children) == 1: return value(children[0][1], alpha, beta)
+        probe = None
+        if self.probe:
+            probe = lambda child, a, b: -self._node(*child, depth - 1, -b, -a, ply + 1, True)
+        return self._expect(children, value, alpha, beta, probe)
+
+    def _expect(self, children, value, alpha, beta, probe=None):
+        """
+        偶然の局面の値(children は [(確率, 結果), ...]、value(結果, a, b) はその結果の値)。
+        結果の値は -WIN_SCORE〜WIN_SCORE に収まるので、調べ終えた分の合計と残りの上限・下限から
+        期待値の範囲が分かります。範囲が窓の外に出たら、その範囲の端を返して打ち切ります(Star1)。
+        probe(結果, a, b) を渡すと、先にそれで各結果の上限を絞ります(Star2)。
+        """
+        lo, hi = -WIN_SCORE, WIN_SCORE
+        uppers = [hi] * len(children)
+        if probe is not None:
+            total_hi = hi
+            for i, (p, child) in enumerate(children):
+                rest_hi = total_hi - p * hi
+                a = max(lo, (alpha - rest_hi) / p)
+                b = min(hi, (beta - (1 - p) * lo) / p)
+                v = probe(child, a, b)
+                # 最初の1手の値が窓の下に外れていなければ、相手の番の値はそれ以上(こちらから見てそれ以下)
+                if v < b and v < hi:
+                    uppers[i] = v
+                    total_hi = rest_hi + p * v
+                    if total_hi <= alpha:
+                        self.chance_cutoffs += 1
+                        return total_hi
+        done, rest_p = 0.0, 1.0
+        rest_hi = sum(p * upper for (p, _), upper in zip(children, uppers))
+        for (p, child), upper in zip(children, uppers):
+            rest_p -= p
+            rest_hi -= p * upper
+            a = (alpha - done - rest_hi) / p
+            b = (beta - done - rest_p * lo) / p
+            done += p * value(child, max(a, lo), min(b, upper))
+            if done + rest_hi <= alpha:
+                if rest_p > 1e-9: self.chance_cutoffs += 1
+                return done + rest_hi
+            if done + rest_p * lo >= beta:
+                if rest_p > 1e-9: self.chance_cutoffs += 1
+                return done + rest_p * lo
+        return done
+
+    def _ordered_moves(self, me, opp, kaiju, eggs, tt_move, is_root):
+        # ... (置換表の手 → 金の卵 → 普通の卵 → AlphaBetaSearch と同じ並び。根以外では普通の卵は価値の高いマスから max_egg_moves 個)
+        normal, golden, _ = eggs
+        cell_weights = self._cell_weights
+        egg_codes = sorted(iter_bits(normal), key=cell_weights.__getitem__, reverse=True)
+        if not is_root: egg_codes = egg_codes[:self.max_egg_moves]
+        ordered = list(iter_bits(golden)) + egg_codes + super()._ordered_moves(me, opp, kaiju, normal | golden, None, is_root)
+        if tt_move is not None and tt_move in ordered:
+            ordered.remove(tt_move); ordered.insert(0, tt_move)
+        return ordered
+
+class ExpectimaxPlayer:
+    """
+    ExpectimaxSearch で行動を選ぶプレイヤー。AIPlayer と同じく choose_action(engine) で次の行動を返します。
+    怪獣モード向けですが、ノーマルモードでは偶然の局面がないので、ふつうのアルファベータ探索と同じになります。
+    3人対戦は AIPlayer(paranoid 探索)に任せます。
+    偶然の局面は分かれ方が大きいので、深さ 2 と少なめの見積もり回数を既定にして、0.4 秒の中で読み切れるようにしています。
+    """
+    def __init__(self, marker='X', rng=None, depth=2, time_limit=0.4, kaiju_samples=4, egg_samples=4):
+        self.marker = marker
+        self.rng = rng if rng is not None else random.Random()
+        self.search = ExpectimaxSearch(depth=depth, time_limit=time_limit, kaiju_samples=kaiju_samples, egg_samples=egg_samples)
+        self.nodes = 0   # 直前の1手で探索した局面の数
+        self._fallback = None
+
+    def make_move(self, engine):
+        return engine.apply_action(self.choose_action(engine))
+
+    def choose_action(self, engine, progress=None, cancel=None):
+        # ... (AIPlayer.choose_action() と同じ引数。卵を選ぶ手は ('egg', マス) で返す)
+        self.nodes = 0
+        if engine.game_mode == '3P':
+            if self._fallback is None:
+                from ai_player import AIPlayer
+                self._fallback = AIPlayer(self.marker, self.rng, time_limit=self.search.time_limit)
+            # 打ち切り(AIWorker.cancel())と途中経過の知らせも、そのまま任せた先に渡す
+            action = self._fallback.choose_action(engine, progress=progress, cancel=cancel)
+            self.nodes = self._fallback.nodes
+            return action
+        search = self.search
+        if search.geometry is not engine.geometry:
+            # キューブの大きさが変わったら、その大きさの表で探索し直す(置換表と覚えた結果も作り直す)
+            search = self.search = ExpectimaxSearch(search.depth, search.time_limit, search.max_quiet_moves, search.tt_limit,
+                                                    engine.geometry, search.kaiju_samples, search.egg_samples,
+                                                    search.max_egg_moves, search.probe)
+        game = engine.game
+        boards = game.bitboards
+        opponent = 'O' if self.marker != 'O' else 'X'
+        index = engine.geometry.cell_index
+        normal = sum(1 << index[pos] for pos, kind in game.egg_positions.items() if kind == 'normal')
+        golden = sum(1 << index[pos] for pos, kind in game.egg_positions.items() if kind == 'golden')
+        report = None
+        if progress is not None:
+            report = lambda depth, code, score: progress(depth, self._action(engine, search.action_from_code(code)))
+        code, _ = search.search(boards[self.marker], boards[opponent], game.kaiju_mask, normal, golden,
+                                game.total_kaiju_moves, report, cancel)
+        self.nodes = search.nodes
+        return self._action(engine, search.action_from_code(code))
+
+    @staticmethod
+    def _action(engine, action):
+        if action[0] == 'place' and action[1] in engine.game.egg_positions: return ('egg', action[1])
+        return action
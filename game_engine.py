@@ -0,0 +1,260 @@
+# game_engine.py
+
+# ===================================================================================
+# ゲームの「進行ルール」を担当するファイルです。
+# - 手番の管理(2人・3人・AI対戦)
+# - 行動(マークを置く・回転する・卵を選ぶ)の適用
+# - 勝敗判定
+# - 怪獣の移動と卵の効果(怪獣モード)
+# 描画・音・タッチ操作には一切依存しないため、iPad の外(コマンドラインなど)でも
+# そのままゲームを進められます。画面側(game_scene.py)はこのクラスの薄い表示役です。
+# ===================================================================================
+
+import random
+from constants import *
+from game_logic import GameLogic
+from bitboard import iter_bits
+from chance import chance_model
+
+# --- 行動の表し方 ---
+# ('place', (face, r, c))  : マークを置く
+# ('rotate', move)         : キューブを回転する(move は ALL_MOVES のいずれか。大きいキューブでは geometry.moves)
+# ('egg', (face, r, c))    : 卵を選ぶ(怪獣モードのみ)
+
+# --- イベント(音や演出のきっかけ)の種類 ---
+# 'egg'     : 卵からマークが出現した
+# 'error'   : 置けない・空きマスがない・引き分けなど
+# 'kaiju'   : 怪獣が動いた
+# 'win'     : 誰かが勝った
+
+class GameEngine:
+    """
+    1ゲーム分の進行(手番・勝敗・怪獣・卵)を管理するクラス。
+    apply_action() で行動を適用し、怪獣モードでは kaiju_step() と
+    end_kaiju_phase() で怪獣の番を進めます。まとめて進めたい場合は play() を使います。
+    盤面の変更はすべて GameLogic.apply() を通すので、undo_turn() で何手でも戻せます。
+    size と win_length を渡すと、N×N×N のキューブで k 個揃えのゲームになります。
+    """
+    def __init__(self, ruleset='normal', game_mode='2P', num_kaiju=1, seed=None, size=3, win_length=None):
+        self.rng = random.Random(seed)
+        self.game = GameLogic(self.rng, size, win_length)
+        self.geometry = self.game.geometry
+        self.reset(ruleset, game_mode, num_kaiju)
+
+    def reset(self, ruleset=None, game_mode=None, num_kaiju=None):
+        # ... (ゲームの状態を初期化する。引数を省略した設定はそのまま引き継ぐ)
+        if ruleset is not None: self.ruleset = ruleset
+        if game_mode is not None: self.game_mode = game_mode
+        if num_kaiju is not None: self.num_kaiju = num_kaiju
+        self.game.reset()
+        self.current_player = 'O'; self.game_over = False; self.winner = None
+        self.status_message = "Oのターン"
+        self.awaiting_kaiju = False
+        self.turn_count = 0
+        self.events = []
+        self.undo_stack = []
+        if self.ruleset == 'custom':
+            self.game.place_kaiju(self.num_kaiju)
+        self.game.record_position(self.geometry.side_keys[self.current_player])
+
+    def copy(self):
+        # ... (今の局面の写しを作る。取り消しの記録とイベントは持たない。別のスレッドで AI に考えさせるとき用)
+        other = GameEngine.__new__(GameEngine)
+        other.rng = random.Random(); other.rng.setstate(self.rng.getstate())
+        other.game = self.game.copy(other.rng)
+        other.geometry = self.geometry
+        other.ruleset, other.game_mode, other.num_kaiju = self.ruleset, self.game_mode, self.num_kaiju
+        (other.current_player, other.game_over, other.winner, other.status_message,
+         other.awaiting_kaiju, other.turn_count) = self._snapshot()
+        other.events, other.undo_stack = [], []
+        return other
+
+    # --- 問い合わせ ---
+    def players(self):
+        return PLAYER_MARKERS if self.game_mode == '3P' else PLAYER_MARKERS[:2]
+
+    def is_ai_turn(self):
+        return self.game_mode == 'AI' and self.current_player == 'X' and not self.game_over
+
+    def is_placeable(self, pos):
+        # ... (マークを置けるマスか。怪獣や卵のいるマスには置けない)
+        return bool(self.game.free_mask >> self.geometry.cell_index[pos] & 1)
+
+    def legal_actions(self):
+        # ... (現在の手番で選べる行動の一覧)
+        if self.game_over or self.awaiting_kaiju: return []
+        cells = self.geometry.cells
+        actions = [('place', cells[i]) for i in iter_bits(self.game.free_mask)]
+        if self.ruleset == 'custom':
+            actions.extend(('egg', pos) for pos in self.game.egg_positions)
+        actions.extend(('rotate', move) for move in self.geometry.moves)
+        return actions
+
+    def pop_events(self):
+        events, self.events = self.events, []
+        return events
+
+    # --- 行動の適用 ---
+    def apply_action(self, action):
+        # ... (行動を適用して手番を終える。受け付けられなかった場合は False を返す)
+        if self.game_over or self.awaiting_kaiju: return False
+        kind, arg = action
+        snapshot = self._snapshot()
+        if kind == 'rotate':
+            if arg not in self.geometry.sources: return False
+            record = self.game.apply(('rotate', arg))
+        elif kind == 'egg' or (kind == 'place' and self.ruleset == 'custom' and arg in self.game.egg_positions):
+            if self.ruleset != 'custom' or arg not in self.game.egg_positions: return False
+            record = self._handle_egg_effect(arg)
+        elif kind == 'place':
+            if arg not in self.geometry.cell_index: return False
+            index = self.geometry.cell_index[arg]
+            if self.game.kaiju_mask >> index & 1:
+                self.status_message = "怪獣がいて置けない!"; self.events.append('error')
+                return False
+            if self.game.occupied >> index & 1: return False
+            record = self.game.apply(('place', arg, self.current_player))
+        else:
+            return False
+        # 取り消し用に [手番前の状態, 盤面の変更記録の一覧, 数えた局面の手番キー] を積む
+        self.undo_stack.append([snapshot, [record], None])
+        self.turn_count += 1
+        self._end_turn()
+        return True
+
+    def play(self, action):
+        # ... (行動の適用から怪獣の番・手番交代までを一度に進める。CLIや対局の自動実行用)
+        if not self.apply_action(action): return False
+        if self.awaiting_kaiju:
+            self.kaiju_step()
+            self.end_kaiju_phase()
+        return True
+
+    def _end_turn(self):
+        # ... (ターン終了時の処理)
+        self.check_win()
+        if self.game_over: return
+        if self.ruleset == 'custom' and self.game.kaiju_positions:
+            self.awaiting_kaiju = True
+        else:
+            self.switch_player()
+
+    def _handle_egg_effect(self, egg_pos):
+        # ... (卵の効果処理。マークを出すマスを決めてから、まとめて盤面に適用する)
+        egg_type = self.game.egg_positions[egg_pos]
+        num_marks = GOLDEN_EGG_MARKERS if egg_type == 'golden' else NORMAL_EGG_MARKERS
+        self.events.append('egg')
+
+        # 使った卵のマスにも(マークや怪獣がいなければ)マークが出られる
+        game = self.game
+        cells = self.geometry.cells
+        egg_bit = 1 << self.geometry.cell_index[egg_pos]
+        spots = game.free_mask | (egg_bit if not (game.occupied | game.kaiju_mask) & egg_bit else 0)
+        empty_spots = [cells[i] for i in iter_bits(spots)]
+        self.rng.shuffle(empty_spots)
+
+        if empty_spots:
+            num_to_place = min(num_marks, len(empty_spots))
+            self.status_message = f"{num_to_place}個のマークが出現!"
+        else:
+            num_to_place = 0
+            self.status_message = "空きマスがなかった!"
+            self.events.append('error')
+        return self.game.apply(('egg', egg_pos, self.current_player, empty_spots[:num_to_place]))
+
+    # --- 怪獣の番 ---
+    def kaiju_step(self):
+        # ... (怪獣をランダムに動かし、動いた怪獣の (番号, 移動前, 移動後) の一覧を返す)
+        game = self.game
+        if not game.kaiju_positions: return []
+        num_to_move = self.rng.randint(1, len(game.kaiju_positions))
+        self.status_message = f"{num_to_move}体の怪獣が動く!"
+        self.events.append('kaiju')
+        indices_to_move = self.rng.sample(range(len(game.kaiju_positions)), num_to_move)
+
+        # 怪獣のいるマスは通し番号のビットマスクで持ち、行き先は事前計算した表から引く
+        # F面の外では KAIJU_NEXT_STEP の決まったマスへ、F面では空いている隣のマスへランダムに動く
+        g = self.geometry
+        cells = [g.cell_index[pos] for pos in game.kaiju_positions]
+        occupied = 0
+        for cell in cells: occupied |= 1 << cell
+        new_positions = {}
+        for i in indices_to_move:
+            start = cells[i]
+            occupied ^= 1 << start
+            target = g.kaiju_next_step[start]
+            if target == start:
+                free = [cell for cell in g.face_neighbours[start] if not occupied >> cell & 1]
+                if free: target = self.rng.choice(free)
+            elif occupied >> target & 1:
+                target = start
+            if target != start: new_positions[i] = g.cells[target]
+            occupied |= 1 << target
+
+        moves = [(i, game.kaiju_positions[i], new_pos) for i, new_pos in new_positions.items()]
+        record = game.apply(('kaiju', list(new_positions.items())))
+        if self.undo_stack: self.undo_stack[-1][1].append(record)
+        return moves
+
+    # --- 偶然の結果(探索用) ---
+    def kaiju_outcomes(self):
+        # ... (今の局面で kaiju_step() をしたときに起こりうる結果と確率。([(確率, chance.KaijuOutcome), ...], 確率が正確か))
+        g = self.geometry
+        return chance_model(g.n, g.win_length).kaiju_outcomes(self.game.kaiju_mask, self.game.total_kaiju_moves)
+
+    def egg_outcomes(self, egg_pos):
+        # ... (今の手番が卵 egg_pos を選んだときに、マークが出るマスのマスクと確率。([(確率, マスク), ...], 確率が正確か))
+        game, g = self.game, self.geometry
+        num_marks = GOLDEN_EGG_MARKERS if game.egg_positions[egg_pos] == 'golden' else NORMAL_EGG_MARKERS
+        egg_bit = 1 << g.cell_index[egg_pos]
+        spots = game.free_mask | (egg_bit if not (game.occupied | game.kaiju_mask) & egg_bit else 0)
+        return chance_model(g.n, g.win_length).egg_outcomes(spots, num_marks)
+
+    def end_kaiju_phase(self):
+        # ... (怪獣の番を終えて、次のプレイヤーへ交代する)
+        self.awaiting_kaiju = False
+        self.switch_player()
+
+    # --- 手番交代と勝敗 ---
+    def switch_player(self):
+        # ... (プレイヤー交代)
+        players = self.players()
+        self.current_player = players[(players.index(self.current_player) + 1) % len(players)]
+        self.check_win()
+        if self.game_over: return
+        if self.ruleset == 'normal' and self._record_position() >= 3:
+            # ルール説明の「同じ盤面が3回繰り返されると引き分け」(手番も含めて同じ局面)
+            self.game_over = True; self.winner = None
+            self.status_message = "同じ盤面が3回で引き分け!"; self.events.append('error')
+            return
+        if self.is_ai_turn():
+            self.status_message = "AI 考え中... 🤔"
+        else:
+            self.status_message = f"{self.current_player}のターン"
+
+    def _record_position(self):
+        side_key = self.geometry.side_keys[self.current_player]
+        if self.undo_stack: self.undo_stack[-1][2] = side_key
+        return self.game.record_position(side_key)
+
+    # --- 取り消し ---
+    def _snapshot(self):
+        return (self.current_player, self.game_over, self.winner, self.status_message, self.awaiting_kaiju, self.turn_count)
+
+    def undo_turn(self):
+        # ... (直前の1手(怪獣の番を含む)を取り消す。戻せる手がなければ False)
+        if not self.undo_stack: return False
+        snapshot, records, side_key = self.undo_stack.pop()
+        if side_key is not None: self.game.forget_position(side_key)
+        for record in reversed(records): self.game.undo(record)
+        (self.current_player, self.game_over, self.winner, self.status_message,
+         self.awaiting_kaiju, self.turn_count) = snapshot
+        return True
+
+    def check_win(self):
+        # ... (勝利判定。同時に2人以上揃った場合は引き分け)
+        winners = [p for p in PLAYER_MARKERS if self.game.has_line(p)]
+        if len(winners) >= 2:
+            self.game_over = True; self.winner = None; self.status_message = "引き分け!"; self.events.append('error')
+        elif len(winners) == 1:
+            self.winner = winners[0]; self.game_over = True; self.events.append('win')
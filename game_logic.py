@@ -8,90 +8,327 @@
 # といった、「ゲームのデータ」とその操作を専門に扱います。
 # ===================================================================================
 
-import copy
 import random
-import math
 from constants import *
+from cube_moves import FACE_INDEX
+from cube_geometry import geometry
+from bitboard import iter_bits, select_bit
+
+class _RowView:
+    # ... (1行分を board[r][c] の形で読むための窓。書き込みはできない)
+    __slots__ = ('get', 'base', 'n')
+    def __init__(self, get, base, n): self.get, self.base, self.n = get, base, n
+    def __getitem__(self, c): return self.get(self.base + c)
+    def __iter__(self): return (self.get(self.base + c) for c in range(self.n))
+    def __len__(self): return self.n
+
+class _FaceView:
+    # ... (1面分を state[face][r][c] の形で読むための窓)
+    __slots__ = ('get', 'base', 'n')
+    def __init__(self, get, base, n): self.get, self.base, self.n = get, base, n
+    def __getitem__(self, r): return _RowView(self.get, self.base + r * self.n, self.n)
+    def __iter__(self): return (self[r] for r in range(self.n))
+    def __len__(self): return self.n
+
+class _LayerView:
+    # ... (全マス分の状態を、従来の「面ごとの n×n リスト」の辞書として見せる読み取り専用アダプタ)
+    __slots__ = ('get', 'n')
+    def __init__(self, get, n): self.get, self.n = get, n
+    def __getitem__(self, face): return _FaceView(self.get, FACE_INDEX[face] * self.n * self.n, self.n)
+    def __iter__(self): return iter(FACE_KEYS)
+    def keys(self): return list(FACE_KEYS)
 
 class GameLogic:
     """
     ゲームの状態(データ)と、それを変更するルールを管理するクラス。
+    マスの色は全マス(3×3×3 なら54マス)のフラットなリスト(colors)、マークはプレイヤーごとの
+    整数(bitboards、3×3×3 なら54ビット)で持ちます。cube_state / marker_state は
+    それらを state[face][r][c] の形で見せる、描画用の読み取り専用の窓です。
+    局面のゾブリストハッシュ(hash)と、怪獣・卵のいるマスのビットマスク(kaiju_mask / egg_mask)は、
+    状態を変えるたびに差分だけで更新します。そのため、怪獣や卵の位置も必ずこのクラスのメソッドを
+    通して変更してください。マークを置けるマスは free_mask でいつでも求められます。
+    apply() で行動を適用すると、それを打ち消すための小さな記録が返り、
+    undo() に渡すと局面を完全に元に戻せます(盤面のコピーは作りません)。
+    size で1面のマスの数(N×N×N のキューブ)、win_length で何個揃えたら勝ちかを変えられます。
+    マスの通し番号や回転の表は geometry(cube_geometry.CubeGeometry)にまとまっています。
     """
-    def __init__(self):
-        # ... (以下、初期化処理)
-        self.cube_state = {}
-        self.marker_state = {}
+    def __init__(self, rng=None, size=3, win_length=None):
+        # ... (以下、初期化処理。rng を渡すと怪獣の配置がその乱数で再現できる)
+        self.rng = rng if rng is not None else random
+        self.geometry = geometry(size, win_length)
+        self.size = size
+        self.colors = [None] * self.geometry.num_cells
+        self.bitboards = {player: 0 for player in PLAYER_MARKERS}
+        self.occupied = 0
+        self.cube_state = _LayerView(self.colors.__getitem__, size)
+        self.marker_state = _LayerView(self.marker_at, size)
         self.kaiju_positions = []
         self.egg_positions = {}
+        self.kaiju_mask = 0
+        self.egg_mask = 0
         self.total_kaiju_moves = 0
+        self.hash = 0
+        self.position_counts = {}
+        self._journal = None
         self.reset()
 
+    def copy(self, rng=None):
+        # ... (局面の写しを作る。表(geometry)は共有し、状態だけをコピーする。取り消しの記録は持たない)
+        # rng を省くと、乱数も今の状態から続く別のものにする(元の乱数の進み方は変えない)
+        other = GameLogic.__new__(GameLogic)
+        if rng is None:
+            rng = random.Random(); rng.setstate(self.rng.getstate())
+        other.rng, other.geometry, other.size = rng, self.geometry, self.size
+        other.colors = list(self.colors)
+        other.bitboards = dict(self.bitboards)
+        other.occupied = self.occupied
+        other.cube_state = _LayerView(other.colors.__getitem__, self.size)
+        other.marker_state = _LayerView(other.marker_at, self.size)
+        other.kaiju_positions = list(self.kaiju_positions)
+        other.egg_positions = dict(self.egg_positions)
+        other.kaiju_mask, other.egg_mask = self.kaiju_mask, self.egg_mask
+        other.total_kaiju_moves = self.total_kaiju_moves
+        other.hash = self.hash
+        other.position_counts = dict(self.position_counts)
+        other._journal = None
+        return other
+
     def reset(self):
         # ... (ゲームの状態を全て初期化する)
-        for key in FACE_KEYS:
-            self.cube_state[key] = [[COLORS[key]] * 3 for _ in range(3)]
-            self.marker_state[key] = [[None] * 3 for _ in range(3)]
+        self.colors[:] = [COLORS[face] for face, _, _ in self.geometry.cells]
+        for player in self.bitboards: self.bitboards[player] = 0
+        self.occupied = 0
         self.kaiju_positions.clear()
         self.egg_positions.clear()
+        self.kaiju_mask = 0
+        self.egg_mask = 0
         self.total_kaiju_moves = 0
+        self.hash = 0
+        self.position_counts.clear()
 
     def place_kaiju(self, num_kaiju):
         # ... (指定された数の怪獣をルールに従って配置する)
+        g = self.geometry
+        for pos in self.kaiju_positions: self.hash ^= g.kaiju_keys[g.cell_index[pos]]
         self.kaiju_positions.clear()
-        f_spots = [('F', r, c) for r in range(3) for c in range(3)]
-        other_spots = [(f, r, c) for f in FACE_KEYS if f != 'F' for r in range(3) for c in range(3)]
-        random.shuffle(f_spots); random.shuffle(other_spots)
+        f_spots = [pos for pos in g.cells if pos[0] == 'F']
+        other_spots = [pos for pos in g.cells if pos[0] != 'F']
+        self.rng.shuffle(f_spots); self.rng.shuffle(other_spots)
 
         num_on_f = min(num_kaiju, MAX_KAIJU_ON_F_FACE)
         self.kaiju_positions.extend(f_spots[:num_on_f])
-        
+
         remaining = num_kaiju - num_on_f
         if remaining > 0:
             self.kaiju_positions.extend(other_spots[:remaining])
 
-        for face, r, c in self.kaiju_positions:
-            self.marker_state[face][r][c] = None
+        self.kaiju_mask = 0
+        for pos in self.kaiju_positions:
+            self.clear_marker(pos)
+            self.hash ^= g.kaiju_keys[g.cell_index[pos]]
+            self.kaiju_mask |= 1 << g.cell_index[pos]
+
+    def move_kaiju(self, kaiju_index, new_pos):
+        # ... (怪獣を1体動かす。移動先のマークは消える)
+        self._set_kaiju(kaiju_index, new_pos)
+        self.clear_marker(new_pos)
+
+    def _set_kaiju(self, kaiju_index, new_pos):
+        old_pos = self.kaiju_positions[kaiju_index]
+        if self._journal is not None: self._journal.append(('k', kaiju_index, old_pos))
+        g = self.geometry
+        old_index, new_index = g.cell_index[old_pos], g.cell_index[new_pos]
+        self.hash ^= g.kaiju_keys[old_index] ^ g.kaiju_keys[new_index]
+        self.kaiju_mask = self.kaiju_mask & ~(1 << old_index) | 1 << new_index
+        self.kaiju_positions[kaiju_index] = new_pos
+
+    def set_egg(self, pos, egg_type):
+        # ... (マスに卵を置く。既にある卵は置き換える)
+        index, egg_keys = self.geometry.cell_index[pos], self.geometry.egg_keys
+        previous = self.egg_positions.get(pos)
+        if previous is not None: self.hash ^= egg_keys[previous][index]
+        if self._journal is not None: self._journal.append(('e', pos, previous))
+        self.egg_positions[pos] = egg_type
+        self.hash ^= egg_keys[egg_type][index]
+        self.egg_mask |= 1 << index
+
+    def remove_egg(self, pos):
+        # ... (マスの卵を取り除き、その種類を返す。なければ None)
+        egg_type = self.egg_positions.pop(pos, None)
+        if egg_type is not None:
+            if self._journal is not None: self._journal.append(('e', pos, egg_type))
+            index = self.geometry.cell_index[pos]
+            self.hash ^= self.geometry.egg_keys[egg_type][index]
+            self.egg_mask &= ~(1 << index)
+        return egg_type
+
+    # --- 空いているマス ---
+    @property
+    def free_mask(self):
+        # ... (マークを置けるマス(マーク・怪獣・卵のどれもないマス)のビットマスク)
+        return self.geometry.full_mask & ~(self.occupied | self.kaiju_mask | self.egg_mask)
+
+    def random_free_cell(self, rng=None):
+        # ... (空いているマスを等確率で1つ選び、その通し番号を返す。なければ None)
+        # rng.choice(空いているマスの一覧) と同じ乱数の使い方なので、一覧から選んでいた頃と同じマスになる
+        free = self.free_mask
+        if not free: return None
+        return select_bit(free, (rng or self.rng).randrange(free.bit_count()))
+
+    def marker_at(self, index):
+        # ... (通し番号のマスにあるマークを返す。なければ None)
+        bit = 1 << index
+        if not self.occupied & bit: return None
+        for player, board in self.bitboards.items():
+            if board & bit: return player
 
-    def rotate_face(self, face_key, clockwise=True):
-        # ... (指定された「面」だけを90度回転させる)
-        for state in [self.cube_state, self.marker_state]:
-            face = state[face_key]
-            if clockwise: state[face_key] = [list(row) for row in zip(*face[::-1])]
-            else: state[face_key] = [list(row) for row in zip(*face)][::-1]
+    def place_marker(self, pos, player):
+        # ... (マスにマークを置く。既にあるマークは上書きする)
+        self._set_marker(self.geometry.cell_index[pos], player)
+
+    def clear_marker(self, pos):
+        # ... (マスのマークを消す)
+        self._set_marker(self.geometry.cell_index[pos], None)
+
+    def _set_marker(self, index, player):
+        # ... (マークを書き換える唯一の場所。ビットボード・ハッシュ・取り消し記録をまとめて更新する)
+        previous = self.marker_at(index)
+        if previous == player: return
+        bit = 1 << index
+        marker_keys = self.geometry.marker_keys
+        if previous is not None:
+            self.bitboards[previous] &= ~bit
+            self.hash ^= marker_keys[previous][index]
+        if player is not None:
+            self.bitboards[player] |= bit
+            self.hash ^= marker_keys[player][index]
+            self.occupied |= bit
+        else:
+            self.occupied &= ~bit
+        if self._journal is not None: self._journal.append(('m', index, previous))
+
+    def has_line(self, player):
+        # ... (F面でそのプレイヤーのマークが揃っているか)
+        return self.geometry.has_line(self.bitboards[player])
+
+    # --- 回転した後の F面(盤面を回さずに、F面への写り方の表 geometry.projection で調べる) ---
+    def lines_completed_by(self, move, then=None):
+        # ... (回転 move(then を渡すと続けてもう1回)の後に F面で揃うラインを {プレイヤー: [ラインの番号]} で返す)
+        # move が None なら今の盤面。揃うラインのないプレイヤーは含めない
+        projection = self.geometry.projection
+        moves = tuple(m for m in (move, then) if m is not None)
+        result = {}
+        for player, board in self.bitboards.items():
+            if board:
+                lines = projection.lines_completed(board, moves)
+                if lines: result[player] = lines
+        return result
+
+    def threats_after(self, move, player, then=None):
+        # ... (回転の後に、player があと1つ置けば揃う F面のマス (面, 行, 列) の一覧。ほかのマーク・怪獣・卵のマスは除く)
+        board = self.bitboards[player]
+        moves = tuple(m for m in (move, then) if m is not None)
+        mask = self.geometry.projection.threats(board, (self.occupied & ~board) | self.kaiju_mask, moves, self.egg_mask)
+        return [self.geometry.cells[i] for i in iter_bits(mask)]
 
     def rotate(self, move):
-        # ... (指定された「層」(U, D, Mなど)を回転させる複雑な処理)
-        s, m = self.cube_state, self.marker_state
-        face_moves = {"U":('U',True), "U'":('U',False), "D":('D',True), "D'":('D',False), "R":('R',False), "R'":('R',True), "L":('L',False), "L'":('L',True), "F":('F',True), "F'":('F',False), "B":('B',True), "B'":('B',False)}
-        if move in face_moves: face, clockwise = face_moves[move]; self.rotate_face(face, clockwise)
-        # (以下、各層の回転ロジックは元のコードと同じ)
-        if move in ("D","D'"):
-            temp_s_f,temp_m_f=s['F'][2][:],m['F'][2][:]; temp_s_r,temp_m_r=s['R'][2][:],m['R'][2][:]; temp_s_b,temp_m_b=s['B'][2][:],m['B'][2][:]; temp_s_l,temp_m_l=s['L'][2][:],m['L'][2][:]
-            if move=="D": s['R'][2],m['R'][2]=temp_s_f,temp_m_f; s['F'][2],m['F'][2]=temp_s_l,temp_m_l; s['L'][2],m['L'][2]=temp_s_b,temp_m_b; s['B'][2],m['B'][2]=temp_s_r,temp_m_r
-            else: s['L'][2],m['L'][2]=temp_s_f,temp_m_f; s['F'][2],m['F'][2]=temp_s_r,temp_m_r; s['R'][2],m['R'][2]=temp_s_b,temp_m_b; s['B'][2],m['B'][2]=temp_s_l,temp_m_l
-        elif move in ("U","U'"):
-            temp_s_f,temp_m_f=s['F'][0][:],m['F'][0][:]; temp_s_r,temp_m_r=s['R'][0][:],m['R'][0][:]; temp_s_b,temp_m_b=s['B'][0][:],m['B'][0][:]; temp_s_l,temp_m_l=s['L'][0][:],m['L'][0][:]
-            if move=="U": s['L'][0],m['L'][0]=temp_s_f,temp_m_f; s['F'][0],m['F'][0]=temp_s_r,temp_m_r; s['R'][0],m['R'][0]=temp_s_b,temp_m_b; s['B'][0],m['B'][0]=temp_s_l,temp_m_l
-            else: s['R'][0],m['R'][0]=temp_s_f,temp_m_f; s['F'][0],m['F'][0]=temp_s_l,temp_m_l; s['L'][0],m['L'][0]=temp_s_b,temp_m_b; s['B'][0],m['B'][0]=temp_s_r,temp_m_r
-        elif move in ("R","R'"):
-            temp_s_u,temp_m_u=[s['U'][i][2] for i in range(3)],[m['U'][i][2] for i in range(3)]; temp_s_f,temp_m_f=[s['F'][i][2] for i in range(3)],[m['F'][i][2] for i in range(3)]; temp_s_d,temp_m_d=[s['D'][i][2] for i in range(3)],[m['D'][i][2] for i in range(3)]; temp_s_b,temp_m_b=[s['B'][i][0] for i in range(3)],[m['B'][i][0] for i in range(3)]
-            if move=="R":
-                for i in range(3): s['F'][i][2],m['F'][i][2]=temp_s_u[i],temp_m_u[i]; s['D'][i][2],m['D'][i][2]=temp_s_f[i],temp_m_f[i]; s['B'][2-i][0],m['B'][2-i][0]=temp_s_d[i],temp_m_d[i]; s['U'][i][2],m['U'][i][2]=temp_s_b[2-i],temp_m_b[2-i]
-            else:
-                for i in range(3): s['B'][2-i][0],m['B'][2-i][0]=temp_s_u[i],temp_m_u[i]; s['D'][i][2],m['D'][i][2]=temp_s_b[2-i],temp_m_b[2-i]; s['F'][i][2],m['F'][i][2]=temp_s_d[i],temp_m_d[i]; s['U'][i][2],m['U'][i][2]=temp_s_f[i],temp_m_f[i]
-        elif move in ("L","L'"):
-            temp_s_u,temp_m_u=[s['U'][i][0] for i in range(3)],[m['U'][i][0] for i in range(3)]; temp_s_f,temp_m_f=[s['F'][i][0] for i in range(3)],[m['F'][i][0] for i in range(3)]; temp_s_d,temp_m_d=[s['D'][i][0] for i in range(3)],[m['D'][i][0] for i in range(3)]; temp_s_b,temp_m_b=[s['B'][i][2] for i in range(3)],[m['B'][i][2] for i in range(3)]
-            if move=="L":
-                for i in range(3): s['B'][2-i][2],m['B'][2-i][2]=temp_s_u[i],temp_m_u[i]; s['D'][i][0],m['D'][i][0]=temp_s_b[2-i],temp_m_b[2-i]; s['F'][i][0],m['F'][i][0]=temp_s_d[i],temp_m_d[i]; s['U'][i][0],m['U'][i][0]=temp_s_f[i],temp_m_f[i]
-            else:
-                for i in range(3): s['F'][i][0],m['F'][i][0]=temp_s_u[i],temp_m_u[i]; s['D'][i][0],m['D'][i][0]=temp_s_f[i],temp_m_f[i]; s['B'][2-i][2],m['B'][2-i][2]=temp_s_d[i],temp_m_d[i]; s['U'][i][0],m['U'][i][0]=temp_s_b[2-i],temp_m_b[2-i]
-        elif move in ("M","M'"):
-            temp_s_u,temp_m_u=[s['U'][i][1] for i in range(3)],[m['U'][i][1] for i in range(3)]; temp_s_f,temp_m_f=[s['F'][i][1] for i in range(3)],[m['F'][i][1] for i in range(3)]; temp_s_d,temp_m_d=[s['D'][i][1] for i in range(3)],[m['D'][i][1] for i in range(3)]; temp_s_b,temp_m_b=[s['B'][i][1] for i in range(3)],[m['B'][i][1] for i in range(3)]
-            if move=="M":
-                for i in range(3): s['F'][i][1],m['F'][i][1]=temp_s_u[i],temp_m_u[i]; s['D'][i][1],m['D'][i][1]=temp_s_f[i],temp_m_f[i]; s['B'][2-i][1],m['B'][2-i][1]=temp_s_d[i],temp_m_d[i]; s['U'][i][1],m['U'][i][1]=temp_s_b[2-i],temp_m_b[2-i]
+        # ... (指定された回転を、事前計算した並べ替え表で適用する)
+        # 色は並べ替え表、マークはビットの参照表、怪獣は移動先の表で位置だけを付け替える
+        # ハッシュは、位置が変わるマスにあるものの差分だけを XOR する
+        if self._journal is not None: self._journal.append(('r', move))
+        g = self.geometry
+        rotate_bits = g.rotate_bits
+        colors = self.colors
+        colors[:] = [colors[i] for i in g.sources[move]]
+        moved = g.moved_masks[move]
+        h = self.hash
+        for player, board in self.bitboards.items():
+            if board:
+                deltas = g.marker_rotation_deltas[player][move]
+                for i in iter_bits(board & moved): h ^= deltas[i]
+                self.bitboards[player] = rotate_bits(board, move)
+        self.occupied = rotate_bits(self.occupied, move)
+        if self.kaiju_positions:
+            destinations = g.destinations[move]
+            deltas = g.kaiju_rotation_deltas[move]
+            cells, cell_index = g.cells, g.cell_index
+            new_positions = []
+            for pos in self.kaiju_positions:
+                index = cell_index[pos]
+                h ^= deltas[index]
+                new_positions.append(cells[destinations[index]])
+            self.kaiju_positions[:] = new_positions
+            self.kaiju_mask = rotate_bits(self.kaiju_mask, move)
+        self.hash = h
+
+    # --- 行動の適用と取り消し ---
+    # ('place', pos, player)        : マークを置く
+    # ('rotate', move)              : 回転する
+    # ('egg', pos, player, spots)   : 卵 pos を使い、spots の各マスに player のマークを出す
+    # ('kaiju', [(番号, 移動先), ...]): 怪獣を順に動かし、元の位置に卵を残す
+    def apply(self, action):
+        # ... (行動を適用し、undo() で元に戻すための記録を返す)
+        self._journal = journal = []
+        try:
+            kind = action[0]
+            if kind == 'place':
+                self.place_marker(action[1], action[2])
+            elif kind == 'rotate':
+                self.rotate(action[1])
+            elif kind == 'egg':
+                _, pos, player, spots = action
+                self.remove_egg(pos)
+                for spot in spots: self.place_marker(spot, player)
+            elif kind == 'kaiju':
+                for kaiju_index, new_pos in action[1]:
+                    old_pos = self.kaiju_positions[kaiju_index]
+                    self.move_kaiju(kaiju_index, new_pos)
+                    journal.append(('t', self.total_kaiju_moves))
+                    self.total_kaiju_moves += 1
+                    egg_type = 'golden' if self.total_kaiju_moves % GOLDEN_EGG_INTERVAL == 0 else 'normal'
+                    self.set_egg(old_pos, egg_type)
+                    self.remove_egg(new_pos)
             else:
-                for i in range(3): s['B'][2-i][1],m['B'][2-i][1]=temp_s_u[i],temp_m_u[i]; s['D'][i][1],m['D'][i][1]=temp_s_b[2-i],temp_m_b[2-i]; s['F'][i][1],m['F'][i][1]=temp_s_d[i],temp_m_d[i]; s['U'][i][1],m['U'][i][1]=temp_s_f[i],temp_m_f[i]
-        elif move in ("E","E'"):
-            temp_s_f,temp_m_f=s['F'][1][:],m['F'][1][:]; temp_s_r,temp_m_r=s['R'][1][:],m['R'][1][:]; temp_s_b,temp_m_b=s['B'][1][:],m['B'][1][:]; temp_s_l,temp_m_l=s['L'][1][:],m['L'][1][:]
-            if move=="E": s['L'][1],m['L'][1]=temp_s_f,temp_m_f; s['B'][1],m['B'][1]=temp_s_l,temp_m_l; s['R'][1],m['R'][1]=temp_s_b,temp_m_b; s['F'][1],m['F'][1]=temp_s_r,temp_m_r
-            else: s['R'][1],m['R'][1]=temp_s_f,temp_m_f; s['B'][1],m['B'][1]=temp_s_r,temp_m_r; s['L'][1],m['L'][1]=temp_s_b,temp_m_b; s['F'][1],m['F'][1]=temp_s_l,temp_m_l
+                raise ValueError(f"不明な行動です: {action!r}")
+        finally:
+            self._journal = None
+        return tuple(journal)
+
+    def undo(self, record):
+        # ... (apply() が返した記録を新しいものから順に打ち消す)
+        for op in reversed(record):
+            kind = op[0]
+            if kind == 'm': self._set_marker(op[1], op[2])
+            elif kind == 'r': self.rotate(self.geometry.inverse[op[1]])
+            elif kind == 'k': self._set_kaiju(op[1], op[2])
+            elif kind == 't': self.total_kaiju_moves = op[1]
+            elif kind == 'e':
+                _, pos, egg_type = op
+                self.remove_egg(pos)
+                if egg_type is not None: self.set_egg(pos, egg_type)
+
+    # --- 同一局面の繰り返し ---
+    def record_position(self, side_key=0):
+        # ... (現在の局面を1回分数え、これまでに現れた回数を返す)
+        # side_key には手番などハッシュに含めたい情報の乱数を渡す
+        key = self.hash ^ side_key
+        count = self.position_counts.get(key, 0) + 1
+        self.position_counts[key] = count
+        return count
+
+    def forget_position(self, side_key=0):
+        # ... (record_position() で数えた現在の局面を1回分取り消す)
+        key = self.hash ^ side_key
+        count = self.position_counts.get(key, 0) - 1
+        if count > 0: self.position_counts[key] = count
+        else: self.position_counts.pop(key, None)
+
+    def compute_hash(self):
+        # ... (ハッシュを最初から計算し直す。差分更新が正しいかの確認用)
+        g = self.geometry
+        h = 0
+        for player, board in self.bitboards.items():
+            for i in iter_bits(board): h ^= g.marker_keys[player][i]
+        for pos in self.kaiju_positions: h ^= g.kaiju_keys[g.cell_index[pos]]
+        for pos, egg_type in self.egg_positions.items(): h ^= g.egg_keys[egg_type][g.cell_index[pos]]
+        return h
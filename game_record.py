@@ -0,0 +1,379 @@
+# game_record.py
+
+# ===================================================================================
+# 対局を小さなバイナリ形式で記録・再生するためのファイルです。
+# - 記録は対局の進行に合わせて少しずつ書き足す(途中で止まっても、そこまでは読める)
+# - 1ファイルに何局でも続けて書ける。読むときは1局ずつ流し読みするので、何千局あってもメモリは1局分
+# - 一定の手数ごとに局面の「チェックポイント」を挟むので、長い対局の途中へも
+#   最初から再生し直さずに、近いチェックポイントから残りの手だけを進めて移動できる
+#
+# ファイルの中身(数は可変長整数):
+#   0xFE 長さ ヘッダ           : 1局の始まり(ルール・人数・怪獣の数・乱数の種・怪獣の初期配置など)
+#   0x00-0x7F                  : 行動1つ(1バイト)。0-53 マークを置く / 54-69 回転 / 70-123 卵を選ぶ
+#   0x80 長さ チェックポイント : その手番が始まる時点の局面
+#   0x81 結果 手数             : 1局の終わり
+#
+# 使い方の例:
+#   python cli.py --games 1000 --ruleset custom --kaiju 3 --seed 1 --record games.rec
+#   python game_record.py games.rec                       (全局の集計)
+#   python game_record.py games.rec --game 10 --turn 150  (10局目の150手目の局面)
+# ===================================================================================
+
+import argparse
+import bisect
+import os
+import re
+import struct
+import sys
+import time
+from constants import *
+from game_engine import GameEngine
+from cube_moves import CELLS, CELL_INDEX, NUM_CELLS
+from bitboard import iter_bits
+from zobrist import SIDE_KEYS
+
+FORMAT_VERSION = 1
+CHECKPOINT_INTERVAL = 32   # 何手ごとにチェックポイントを挟むか
+
+RECORD_TAG = 0xFE
+CHECKPOINT_TAG = 0x80
+END_TAG = 0x81
+_TAG_PATTERN = re.compile(rb'[\x80-\xff]')
+
+RULESETS = ('normal', 'custom')
+GAME_MODES = ('2P', '3P', 'AI')
+RESULTS = (None, 'O', 'X', '△', 'unfinished')   # 結果の番号 -> 勝者(None は引き分け)
+
+# --- 行動の番号 ---
+CODE_ACTIONS = ([('place', pos) for pos in CELLS] + [('rotate', move) for move in ALL_MOVES]
+                + [('egg', pos) for pos in CELLS])
+ACTION_CODES = {action: code for code, action in enumerate(CODE_ACTIONS)}
+_COLOR_PALETTE = list(dict.fromkeys(COLORS.values()))
+_COLOR_INDEX = {color: i for i, color in enumerate(_COLOR_PALETTE)}
+
+# --- 可変長整数と乱数の状態 ---
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80); value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]; pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80: return value, pos
+        shift += 7
+
+_RNG_STATE = struct.Struct('<625I')
+
+def _pack_rng(rng):
+    return _RNG_STATE.pack(*rng.getstate()[1])
+
+def _unpack_rng(data, pos):
+    return (3, _RNG_STATE.unpack_from(data, pos), None), pos + _RNG_STATE.size
+
+# --- ヘッダとチェックポイント ---
+def _encode_header(engine, seed, rng_state):
+    # ... (ルール・人数・怪獣の数・乱数の種・怪獣の初期配置。種で再現できないときは乱数の状態も入れる)
+    flags = (seed is not None) | (rng_state is not None) << 1
+    out = bytearray([FORMAT_VERSION, RULESETS.index(engine.ruleset), GAME_MODES.index(engine.game_mode),
+                     engine.num_kaiju, flags])
+    if seed is not None: out += _varint(seed << 1 if seed >= 0 else (-seed << 1) - 1)
+    kaiju = engine.game.kaiju_positions
+    out.append(len(kaiju)); out += bytes(CELL_INDEX[pos] for pos in kaiju)
+    if rng_state is not None: out += rng_state
+    return bytes(out)
+
+def _encode_state(engine):
+    # ... (手番の始まりの局面。手番・手数・マスの色・マーク・怪獣・卵・繰り返しの記録・乱数の状態)
+    game = engine.game
+    out = bytearray(_varint(engine.turn_count))
+    out.append(PLAYER_MARKERS.index(engine.current_player))
+    if len(_COLOR_PALETTE) > 1: out += bytes(_COLOR_INDEX[color] for color in game.colors)
+    for player in PLAYER_MARKERS: out += game.bitboards[player].to_bytes(7, 'little')
+    out.append(len(game.kaiju_positions)); out += bytes(CELL_INDEX[pos] for pos in game.kaiju_positions)
+    out.append(len(game.egg_positions))
+    out += bytes(CELL_INDEX[pos] | (0x80 if egg_type == 'golden' else 0) for pos, egg_type in game.egg_positions.items())
+    out += _varint(game.total_kaiju_moves)
+    out += _varint(len(game.position_counts))
+    for key, count in game.position_counts.items(): out += key.to_bytes(8, 'little') + _varint(count)
+    # 乱数を使うのは怪獣モードだけ
+    if engine.ruleset == 'custom': out += _pack_rng(engine.rng)
+    return bytes(out)
+
+def _restore_state(engine, data):
+    # ... (チェックポイントの局面を engine に読み込む。読み込んだ局面より前へは取り消せない)
+    game = engine.game
+    game.reset()
+    turn_count, pos = _read_varint(data, 0)
+    player = PLAYER_MARKERS[data[pos]]; pos += 1
+    if len(_COLOR_PALETTE) > 1:
+        game.colors[:] = [_COLOR_PALETTE[i] for i in data[pos:pos + NUM_CELLS]]; pos += NUM_CELLS
+    for p in PLAYER_MARKERS:
+        for i in iter_bits(int.from_bytes(data[pos:pos + 7], 'little')): game.place_marker(CELLS[i], p)
+        pos += 7
+    count = data[pos]; pos += 1
+    game.kaiju_positions[:] = [CELLS[i] for i in data[pos:pos + count]]; pos += count
+    for i in data[pos - count:pos]: game.kaiju_mask |= 1 << i
+    count = data[pos]; pos += 1
+    for code in data[pos:pos + count]: game.set_egg(CELLS[code & 0x7F], 'golden' if code & 0x80 else 'normal')
+    pos += count
+    game.total_kaiju_moves, pos = _read_varint(data, pos)
+    game.hash = game.compute_hash()
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        key = int.from_bytes(data[pos:pos + 8], 'little')
+        game.position_counts[key], pos = _read_varint(data, pos + 8)
+    if engine.ruleset == 'custom':
+        state, pos = _unpack_rng(data, pos); engine.rng.setstate(state)
+    engine.current_player = player; engine.turn_count = turn_count
+    engine.game_over = False; engine.winner = None; engine.awaiting_kaiju = False
+    engine.events = []; engine.undo_stack = []
+    engine.status_message = "AI 考え中... 🤔" if engine.is_ai_turn() else f"{player}のターン"
+
+class GameRecorder:
+    """
+    対局を記録するクラス。engine を reset() した直後に作り、行動は engine ではなく
+    この play() / apply_action() を通して進めます(受け付けられた行動だけが書かれます)。
+    怪獣の番(kaiju_step / end_kaiju_phase)は engine を直接呼んで構いません。
+    seed を渡すと、その種から始まりの局面を再現できることを確かめ、乱数の状態の代わりに種だけを書きます。
+    書き込みは最初の行動のときに始まり、close() で対局の結果を書いて終わります。
+    """
+    def __init__(self, stream, engine, seed=None, checkpoint_interval=CHECKPOINT_INTERVAL, flush=False):
+        if engine.turn_count or engine.undo_stack: raise ValueError("記録は対局の最初から始めてください")
+        if not engine.geometry.standard: raise ValueError("記録できるのは 3×3×3 で3つ揃えの対局だけです")
+        self.stream = stream
+        self.engine = engine
+        self.checkpoint_interval = checkpoint_interval
+        self.flush = flush
+        rng_state = None
+        if engine.ruleset == 'custom':
+            fresh = GameEngine(engine.ruleset, engine.game_mode, engine.num_kaiju, seed) if seed is not None else None
+            if fresh is None or fresh.rng.getstate() != engine.rng.getstate() or fresh.game.kaiju_positions != engine.game.kaiju_positions:
+                rng_state = _pack_rng(engine.rng)
+        header = _encode_header(engine, seed, rng_state)
+        self._pending = bytes([RECORD_TAG]) + _varint(len(header)) + header
+        self._checkpointed = 0
+        self.closed = False
+
+    def _write(self, data):
+        if self._pending:
+            data = self._pending + data; self._pending = b''
+        self.stream.write(data)
+        if self.flush: self.stream.flush()
+
+    def _before_action(self):
+        # ... (手番の始まりがチェックポイントの手数なら、局面を書いておく)
+        engine = self.engine
+        turn = engine.turn_count
+        if turn and turn % self.checkpoint_interval == 0 and turn != self._checkpointed and not engine.awaiting_kaiju:
+            self._checkpointed = turn
+            state = _encode_state(engine)
+            self._write(bytes([CHECKPOINT_TAG]) + _varint(len(state)) + state)
+
+    def apply_action(self, action):
+        # ... (engine.apply_action() と同じ。受け付けられたら行動を書く)
+        if self.closed: raise ValueError("記録はもう閉じています")
+        self._before_action()
+        accepted = self.engine.apply_action(action)
+        if accepted: self._write(bytes([ACTION_CODES[action]]))
+        return accepted
+
+    def play(self, action):
+        # ... (engine.play() と同じ。受け付けられたら行動を書く)
+        if self.closed: raise ValueError("記録はもう閉じています")
+        self._before_action()
+        accepted = self.engine.play(action)
+        if accepted: self._write(bytes([ACTION_CODES[action]]))
+        return accepted
+
+    def close(self):
+        # ... (対局の結果を書いて記録を終える。1手も指していなければ何も書かない)
+        if self.closed: return
+        self.closed = True
+        if self._pending: return
+        engine = self.engine
+        result = RESULTS.index(engine.winner if engine.game_over else 'unfinished')
+        self._write(bytes([END_TAG, result]) + _varint(engine.turn_count))
+        self.stream.flush()
+
+class GameRecord:
+    """
+    読み込んだ1局分の記録。actions は行動の番号の列(1手1バイト)、checkpoints は (手数, 局面) の一覧です。
+    engine_at(turn) で、turn 手を指した直後(turn 手目の手番の始まり)の局面を持つ GameEngine を作ります。
+    結果の書かれていない記録(途中で止まった対局)は finished が False になります。
+    """
+    def __init__(self, header):
+        version = header[0]
+        if version != FORMAT_VERSION: raise ValueError(f"対応していない記録の形式です: {version}")
+        self.ruleset, self.game_mode = RULESETS[header[1]], GAME_MODES[header[2]]
+        self.num_kaiju, flags = header[3], header[4]
+        pos = 5
+        self.seed = None
+        if flags & 1:
+            value, pos = _read_varint(header, pos)
+            self.seed = value >> 1 if not value & 1 else -((value + 1) >> 1)
+        count = header[pos]; pos += 1
+        self.kaiju_setup = [CELLS[i] for i in header[pos:pos + count]]; pos += count
+        self.rng_state = _unpack_rng(header, pos)[0] if flags & 2 else None
+        self.actions = bytearray()
+        self.checkpoints = []
+        self.finished = False
+        self.result = 'unfinished'
+        self.turns = 0
+
+    def __len__(self):
+        return len(self.actions)
+
+    def action(self, index):
+        return CODE_ACTIONS[self.actions[index]]
+
+    def start_engine(self):
+        # ... (対局の始まりの局面の GameEngine を作る)
+        engine = GameEngine(self.ruleset, self.game_mode, self.num_kaiju, self.seed)
+        if self.rng_state is not None:
+            game = engine.game
+            game.reset()
+            game.kaiju_positions[:] = self.kaiju_setup
+            for pos in self.kaiju_setup: game.kaiju_mask |= 1 << CELL_INDEX[pos]
+            game.hash = game.compute_hash()
+            game.record_position(SIDE_KEYS[engine.current_player])
+            engine.rng.setstate(self.rng_state)
+        elif engine.game.kaiju_positions != self.kaiju_setup:
+            raise ValueError("乱数の種から怪獣の初期配置を再現できませんでした")
+        return engine
+
+    def engine_at(self, turn):
+        # ... (turn 手目の手番の始まりの局面。turn 以下で一番近いチェックポイントから残りの手だけを進める)
+        turn = max(0, min(turn, len(self.actions)))
+        i = bisect.bisect_right(self.checkpoints, turn, key=lambda checkpoint: checkpoint[0])
+        if i:
+            start, state = self.checkpoints[i - 1]
+            engine = GameEngine(self.ruleset, self.game_mode, self.num_kaiju, self.seed)
+            _restore_state(engine, state)
+        else:
+            start, engine = 0, self.start_engine()
+        for code in self.actions[start:turn]:
+            if not engine.play(CODE_ACTIONS[code]):
+                raise ValueError(f"{engine.turn_count}手目の行動 {CODE_ACTIONS[code]} を再生できませんでした")
+            engine.pop_events()
+        return engine
+
+class _Reader:
+    # ... (ファイルを一定の大きさずつ読みながら、バイト列を先頭から順に取り出す)
+    def __init__(self, stream, block_size):
+        self.stream, self.block_size = stream, block_size
+        self.buf, self.pos = b'', 0
+
+    def fill(self, need):
+        # ... (少なくとも need バイトを読める状態にする。ファイルの終わりなら False)
+        while len(self.buf) - self.pos < need:
+            data = self.stream.read(max(self.block_size, need))
+            if not data: return False
+            self.buf = self.buf[self.pos:] + data; self.pos = 0
+        return True
+
+    def byte(self):
+        if not self.fill(1): return None
+        self.pos += 1
+        return self.buf[self.pos - 1]
+
+    def varint(self):
+        value = shift = 0
+        while True:
+            byte = self.byte()
+            if byte is None: return None
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80: return value
+            shift += 7
+
+    def chunk(self):
+        # ... (長さ付きのかたまりを1つ読む。途中で切れていれば None)
+        length = self.varint()
+        if length is None or not self.fill(length): return None
+        self.pos += length
+        return self.buf[self.pos - length:self.pos]
+
+    def actions(self, out):
+        # ... (次の目印(0x80 以上のバイト)の手前までの行動を out に足す)
+        while self.fill(1):
+            match = _TAG_PATTERN.search(self.buf, self.pos)
+            end = match.start() if match else len(self.buf)
+            out += self.buf[self.pos:end]; self.pos = end
+            if match: return
+
+def iter_records(stream, block_size=1 << 16):
+    # ... (ファイルの記録を1局ずつ読んで返す。読むのは一度に block_size バイトと1局分だけ)
+    if isinstance(stream, str):
+        with open(stream, 'rb') as f:
+            yield from iter_records(f, block_size)
+        return
+    reader = _Reader(stream, block_size)
+    record = None
+    while True:
+        tag = reader.byte()
+        if tag is None: break
+        if tag < 0x80:
+            reader.pos -= 1
+            reader.actions(record.actions)
+        elif tag == RECORD_TAG:
+            if record is not None:
+                record.turns = len(record.actions)
+                yield record
+            header = reader.chunk()
+            if header is None: return
+            record = GameRecord(header)
+        elif tag == CHECKPOINT_TAG:
+            state = reader.chunk()
+            if state is None: break
+            record.checkpoints.append((_read_varint(state, 0)[0], state))
+        elif tag == END_TAG:
+            result, turns = reader.byte(), reader.varint()
+            if turns is None: break
+            record.result, record.turns, record.finished = RESULTS[result], turns, True
+            yield record
+            record = None
+        else:
+            raise ValueError(f"記録の形式が正しくありません(目印 {tag:#x})")
+    if record is not None:
+        record.turns = len(record.actions)
+        yield record
+
+def main(argv=None):
+    from cli import format_board
+    parser = argparse.ArgumentParser(description='対局の記録を集計したり、途中の局面を表示したりします。')
+    parser.add_argument('path')
+    parser.add_argument('--game', type=int, default=None, help='表示する対局の番号(1から)')
+    parser.add_argument('--turn', type=int, default=None, help='表示する局面の手数(省略すると最後)')
+    args = parser.parse_args(argv)
+    if args.game is not None:
+        for number, record in enumerate(iter_records(args.path), 1):
+            if number < args.game: continue
+            turn = len(record) if args.turn is None else args.turn
+            start = time.perf_counter()
+            engine = record.engine_at(turn)
+            print(f"第{number}局 {record.ruleset} / {record.game_mode} / {engine.turn_count}手目 "
+                  f"({(time.perf_counter() - start) * 1000:.2f}ms): {engine.status_message}")
+            print(format_board(engine))
+            return 0
+        print(f"{args.game}局目の記録がありません")
+        return 1
+    games = turns = checkpoints = 0
+    tally = {}
+    start = time.perf_counter()
+    for record in iter_records(args.path):
+        games += 1; turns += len(record); checkpoints += len(record.checkpoints)
+        tally[record.result] = tally.get(record.result, 0) + 1
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.path)
+    print(f"{games}局 / {turns}手 / チェックポイント {checkpoints}個 / {size}バイト ({size / max(turns, 1):.1f}バイト/手)")
+    for key, count in tally.items():
+        print(f"  {({None: '引き分け', 'unfinished': '打ち切り'}).get(key, f'{key} の勝ち')}: {count}")
+    print(f"読み込み: {elapsed:.2f}秒 ({games / max(elapsed, 1e-9):.0f} 局/秒)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# load_client.py
+
+# ===================================================================================
+# server.py に負荷をかけて、1秒あたりに終わる対局の数と、行動の応答時間を測るファイルです。
+# 1つの部屋につきプレイヤーの人数分の接続を作り、それぞれが自分の番にランダムな行動を送ります。
+# 行動は、サーバーから届いた盤面(board の文字列)だけを見て選びます。
+# 応答時間は「行動を送ってから、受け付けの返事(result)が届くまで」の時間です。
+#
+# --port を省くと、同じプロセスの中にサーバーを立てて測ります(怪獣の待ち時間は --kaiju-delay)。
+#
+# 使い方の例:
+#   python load_client.py --rooms 500 --concurrency 50
+#   python load_client.py --rooms 200 --ruleset custom --mode 3P --kaiju 3
+#   python load_client.py --port 8765 --rooms 1000 --concurrency 100   (別に立てたサーバーに対して)
+# ===================================================================================
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from constants import *
+from cube_moves import CELLS
+from server import GameServer
+
+def choose_action(board, ruleset, rng):
+    # ... (盤面の文字列から選べる行動を並べ、ランダムに1つ選ぶ。RandomPlayer と同じ選び方)
+    actions = [f"place {face} {r} {c}" for (face, r, c), ch in zip(CELLS, board) if ch == '.']
+    if ruleset == 'custom':
+        actions.extend(f"egg {face} {r} {c}" for (face, r, c), ch in zip(CELLS, board) if ch in 'e*')
+    actions.extend(f"rotate {move}" for move in ALL_MOVES)
+    return rng.choice(actions)
+
+async def play_seat(host, port, room, args, seed, rng, latencies):
+    # ... (1人分の接続。部屋に入り、対局が終わるまで自分の番に行動を送る。終わりのメッセージを返す)
+    reader, writer = await asyncio.open_connection(host, port)
+    def send(message):
+        writer.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+    send({'type': 'join', 'room': room, 'ruleset': args.ruleset, 'mode': args.mode, 'kaiju': args.kaiju, 'seed': seed})
+    marker, acted_turn, next_id, sent = None, None, 0, {}
+    try:
+        while True:
+            line = await reader.readline()
+            if not line: return {'type': 'end', 'winner': None, 'reason': 'closed'}
+            message = json.loads(line)
+            kind = message['type']
+            if kind == 'joined':
+                marker = message['player']
+            elif kind == 'result':
+                latencies.append(time.perf_counter() - sent.pop(message['id']))
+                if not message['accepted']: acted_turn = None   # 断られたら選び直す
+            elif kind == 'end':
+                return message
+            elif kind == 'error':
+                raise RuntimeError(message['message'])
+            state = message.get('state')
+            if (state and state['current'] == marker and not state['kaiju_phase'] and not state['game_over']
+                    and acted_turn != state['turn'] and not sent):
+                next_id += 1
+                acted_turn = state['turn']
+                sent[next_id] = time.perf_counter()
+                send({'type': 'action', 'id': next_id, 'action': choose_action(state['board'], args.ruleset, rng)})
+                await writer.drain()
+    finally:
+        writer.close()
+
+async def run_load(host, port, args):
+    # ... (部屋を args.concurrency 個ずつ同時に動かし、args.rooms 個の対局を終えるまで続ける)
+    rng = random.Random(args.seed)
+    num_players = 3 if args.mode == '3P' else 2
+    latencies, tally = [], {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_room(i):
+        async with semaphore:
+            room, seed = f"load-{i}", rng.randrange(1 << 32)
+            seats = [play_seat(host, port, room, args, seed, random.Random(rng.random()), latencies) for _ in range(num_players)]
+            results = await asyncio.gather(*seats)
+            end = results[0]
+            key = end['winner'] or end['reason']
+            tally[key] = tally.get(key, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_room(i) for i in range(args.rooms)))
+    return time.perf_counter() - start, latencies, tally
+
+def percentile(values, p):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+async def main_async(args):
+    server = None
+    host, port = args.host, args.port
+    if port is None:
+        server = GameServer(kaiju_delay=args.kaiju_delay, kaiju_animation=args.kaiju_delay)
+        port = await server.start(host, 0)
+    try:
+        elapsed, latencies, tally = await run_load(host, port, args)
+    finally:
+        if server is not None: await server.close()
+    ms = lambda v: f"{v * 1000:.2f}ms"
+    print(f"部屋 {args.rooms} (同時 {args.concurrency}) / {elapsed:.2f}秒: {args.rooms / elapsed:.1f} 部屋/秒")
+    print(f"行動 {len(latencies)}: {len(latencies) / elapsed:.0f} 回/秒")
+    print(f"応答時間: p50 {ms(percentile(latencies, 50))}  p90 {ms(percentile(latencies, 90))}  "
+          f"p99 {ms(percentile(latencies, 99))}  最大 {ms(max(latencies, default=0))}")
+    print("結果:", ', '.join(f"{k}: {v}" for k, v in sorted(tally.items())))
+    if server is not None: print("サーバー:", server.stats)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='対局サーバーに負荷をかけて、部屋/秒と応答時間を測ります。')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='省くと同じプロセスの中にサーバーを立てる')
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--ruleset', choices=['normal', 'custom'], default='normal')
+    parser.add_argument('--mode', choices=['2P', '3P'], default='2P')
+    parser.add_argument('--kaiju', type=int, default=1)
+    parser.add_argument('--kaiju-delay', type=float, default=0.0, help='同じプロセスのサーバーでの怪獣の待ち時間(秒)')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
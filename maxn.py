@@ -0,0 +1,266 @@
+# maxn.py
+
+# ===================================================================================
+# 3人対戦(O → X → △ の順に指す)の AI の「先読み」を担当するファイルです。
+# - max-n: 局面の値を「プレイヤーごとの取り分」の組で表し、手番のプレイヤーは自分の取り分が
+#          一番大きくなる手を選ぶ、として読む。取り分の合計は MAX_SUM を超えないので、手番のプレイヤーの
+#          取り分が MAX_SUM - (1つ前の手番のプレイヤーがほかの手でもう確保した取り分) 以上になったら、
+#          1つ前のプレイヤーはこの手を選ばないと分かり、残りの手は調べない(浅い枝刈り, shallow pruning)
+# - paranoid: ほかの2人は手を組んで自分の取り分を一番小さくする、として読む。2人対戦と同じ
+#          アルファベータ枝刈りが効くので max-n より深く読めるが、相手を悲観的に見すぎることがある
+# 局面の写しは作らず、GameLogic.apply() で指して undo() で戻しながら読みます(GameEngine と同じ手の適用)。
+# 置換表は search.AlphaBetaSearch と同じもの(エントリは (深さ, 値, 種類, 最善手)、tt_limit を超えたら空にする)で、
+# キーには GameLogic が差分で更新しているゾブリストハッシュに、手番の乱数を XOR したものを使います。
+# 3人対戦は1手ごとの分岐が多く、1巡(3手)読むだけで2人対戦の1.5倍の深さになるので、
+# 反復深化で time_limit(秒)までに読み終えた深さの結果を使います。
+# 怪獣モードでは、怪獣は回転で一緒に動くマス、卵は置けないマスとして扱います(怪獣の番と卵は読みません)。
+#
+# 使い方の例:
+#   search = MaxNSearch(depth=3, time_limit=0.4)             (paranoid=True で paranoid)
+#   code, share = search.search(engine.game, '△')            (share はそのプレイヤーの取り分)
+#   python cli.py --mode 3P --players maxn,paranoid,greedy --games 20
+#   python maxn.py --positions 20 --time 0.4                 (時間内に読めた深さと1秒あたりの局面数を比べる)
+# ===================================================================================
+
+import argparse
+import random
+import sys
+import time
+from constants import PLAYER_MARKERS
+from search import AlphaBetaSearch, SearchTimeout, WIN_SCORE, _INFINITY, _EXACT, _LOWER, _UPPER, _score_to_tt, _score_from_tt
+
+# 1つの局面の取り分の合計の上限。勝ったプレイヤーは MAX_SUM - 手数、ほかは 0。
+# 決着のつかない局面は、ラインの揃いかけ具合に応じて MAX_SUM の半分を分ける(勝ちの方がいつも大きい)
+MAX_SUM = WIN_SCORE
+
+class MaxNSearch(AlphaBetaSearch):
+    """
+    3人対戦用の max-n 探索(paranoid=True なら paranoid 探索)。
+    search() に GameLogic と手番のプレイヤーを渡すと、最善と判断した手の番号とそのプレイヤーの取り分を返します。
+    手の番号・置換表・手の並べ替え・時間切れの扱いは AlphaBetaSearch と同じです。
+    """
+    def __init__(self, depth=3, time_limit=None, max_quiet_moves=6, tt_limit=200000, geometry=None, paranoid=False):
+        super().__init__(depth, time_limit, max_quiet_moves, tt_limit, geometry)
+        self.paranoid = paranoid
+        self.players = tuple(PLAYER_MARKERS)
+        self.shallow_cutoffs = 0   # max-n の浅い枝刈りで打ち切った局面の数
+        self._root_index = 0
+
+    def search(self, game, player, progress=None, cancel=None):
+        # ... (AlphaBetaSearch.search() と同じ反復深化。読んでいる間は game に指しては戻すので、
+        # 時間切れで打ち切られても、返るときには game は元の局面に戻っている)
+        self.nodes = 0
+        self.completed_depth = 0
+        self.shallow_cutoffs = 0
+        self._deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self._cancel = cancel
+        if len(self.tt) > self.tt_limit: self.tt.clear()
+        index = self._root_index = self.players.index(player)
+        start = time.perf_counter()
+        best = (None, 0)
+        try:
+            for depth in range(1, self.depth + 1):
+                best = self._root(game, index, depth)
+                self.completed_depth = depth
+                if progress is not None: progress(depth, *best)
+                if best[1] >= MAX_SUM - 100: break
+        except SearchTimeout:
+            pass
+        if best[0] is None: best = (self._moves(game, index, None, True)[0], 0)
+        self.elapsed = time.perf_counter() - start
+        self.nodes_per_second = self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+        return best
+
+    def _key(self, game, index):
+        # paranoid の値は「誰から見た取り分か」で変わるので、根のプレイヤーもキーに含める
+        key = game.hash ^ self.geometry.side_keys[self.players[index]]
+        return (key, self._root_index) if self.paranoid else key
+
+    def _moves(self, game, index, tt_move, is_root):
+        # ... (AlphaBetaSearch と同じ並び。ほかの2人のマークは「相手」としてまとめる)
+        me = game.bitboards[self.players[index]]
+        return self._ordered_moves(me, game.occupied & ~me, game.kaiju_mask, game.egg_mask, tt_move, is_root)
+
+    def _values(self, game):
+        # ... (決着のついていない局面の取り分。ほかのマークのないラインの揃いかけ具合と、F面に近いマークの数で MAX_SUM / 2 を分ける)
+        boards = [game.bitboards[player] for player in self.players]
+        occupied = game.occupied
+        weights, near = self._line_weights, self._near_f_mask
+        scores = [1 + (board & near).bit_count() for board in boards]
+        for mask in self._line_masks:
+            marks = occupied & mask
+            if marks:
+                for i, board in enumerate(boards):
+                    if board & mask == marks:
+                        scores[i] += weights[marks.bit_count()]
+                        break
+        share = MAX_SUM / 2 / sum(scores)
+        return tuple(score * share for score in scores)
+
+    def _leaf(self, game, index, ply):
+        # ... (読む深さの端の局面。手番のプレイヤーが置くだけで揃えられるなら、次の手で勝つ局面として扱う
+        # (max-n は1巡読み切れないことが多いので、3人目の「あと1つ」を見落とさないため))
+        me = game.bitboards[self.players[index]]
+        empty = self._full_mask & ~(game.occupied | game.kaiju_mask | game.egg_mask)
+        almost = self._almost
+        for mask in self._line_masks:
+            hole = mask & empty
+            if hole and hole.bit_count() == 1 and (me & mask).bit_count() == almost:
+                return self._terminal([index], ply)
+        return self._values(game)
+
+    def _terminal(self, winners, ply):
+        # ... (誰かが揃えた局面の取り分。2人以上が同時に揃えたら引き分け(GameEngine.check_win と同じ)で、3人で等分する)
+        if len(winners) == 1:
+            values = [0.0] * len(self.players)
+            values[winners[0]] = MAX_SUM - ply
+            return tuple(values)
+        return (MAX_SUM / len(self.players),) * len(self.players)
+
+    def _child(self, game, index, code, depth, ply, alpha, beta):
+        """
+        手番 index のプレイヤーが手 code を指し、その後の局面を読んでから指す前に戻します。
+        max-n なら取り分の組を、paranoid なら根のプレイヤーの取り分を返します。
+        max-n では alpha に「この局面の手番のプレイヤーがほかの手でもう確保した取り分」を渡します(浅い枝刈り用)。
+        """
+        if code >= self.rotation_base: record = game.apply(('rotate', self.moves[code - self.rotation_base]))
+        else: record = game.apply(('place', self.geometry.cells[code], self.players[index]))
+        try:
+            has_line, boards = self._has_line, game.bitboards
+            if code >= self.rotation_base:
+                winners = [i for i, player in enumerate(self.players) if has_line(boards[player])]
+            else:
+                # 置く手で揃うのは、置いたプレイヤーだけ
+                winners = [index] if has_line(boards[self.players[index]]) else []
+            following = (index + 1) % len(self.players)
+            if self.paranoid:
+                if winners: return self._terminal(winners, ply)[self._root_index]
+                return self._paranoid(game, following, depth - 1, alpha, beta, ply + 1)
+            if winners: return self._terminal(winners, ply)
+            return self._maxn(game, following, depth - 1, alpha, ply + 1)
+        finally:
+            game.undo(record)
+
+    def _root(self, game, index, depth):
+        key = self._key(game, index)
+        entry = self.tt.get(key)
+        alpha, beta = -_INFINITY, _INFINITY
+        best_code, best_score, best_values = None, -_INFINITY, None
+        for code in self._moves(game, index, entry[3] if entry else None, True):
+            if self.paranoid:
+                score = self._child(game, index, code, depth, 0, alpha, beta)
+            else:
+                values = self._child(game, index, code, depth, 0, max(best_score, 0.0), None)
+                score = values[index]
+            if score > best_score:
+                best_code, best_score = code, score
+                if not self.paranoid: best_values = values
+            if score > alpha: alpha = score
+        self.tt[key] = (depth, best_score if self.paranoid else best_values, _EXACT, best_code)
+        return best_code, best_score
+
+    def _maxn(self, game, index, depth, bound, ply):
+        # ... (max-n。bound は1つ前の手番のプレイヤーがもう確保した取り分)
+        self.nodes += 1
+        # 3人対戦は1局面あたりの手の適用と戻しが重いので、時間切れは局面 256 個ごとに確かめる
+        if not self.nodes & 255 and self._should_stop(): raise SearchTimeout()
+        if depth <= 0: return self._leaf(game, index, ply)
+
+        key = self._key(game, index)
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_values, tt_flag, tt_move = entry
+            if tt_depth >= depth and tt_flag == _EXACT: return tuple(_score_from_tt(v, ply) for v in tt_values)
+
+        best_code, best, flag = None, None, _EXACT
+        for code in self._moves(game, index, tt_move, False):
+            values = self._child(game, index, code, depth, ply, best[index] if best else 0.0, None)
+            if best is None or values[index] > best[index]:
+                best_code, best = code, values
+                if best[index] >= MAX_SUM - bound:
+                    # 1つ前のプレイヤーはこの局面で bound より多くは取れないので、ほかの手を調べても選ばれない
+                    self.history[code] += depth * depth
+                    self.shallow_cutoffs += 1
+                    flag = _LOWER
+                    break
+        self.tt[key] = (depth, tuple(_score_to_tt(v, ply) for v in best), flag, best_code)
+        return best
+
+    def _paranoid(self, game, index, depth, alpha, beta, ply):
+        # ... (paranoid。根のプレイヤーの番は大きく、ほかの2人の番は小さくする、根のプレイヤーの取り分のアルファベータ)
+        self.nodes += 1
+        if not self.nodes & 255 and self._should_stop(): raise SearchTimeout()
+        if depth <= 0: return self._leaf(game, index, ply)[self._root_index]
+
+        key = self._key(game, index)
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                tt_score = _score_from_tt(tt_score, ply)
+                if tt_flag == _EXACT: return tt_score
+                if tt_flag == _LOWER and tt_score >= beta: return tt_score
+                if tt_flag == _UPPER and tt_score <= alpha: return tt_score
+
+        original_alpha, original_beta = alpha, beta
+        maximizing = index == self._root_index
+        best_code, best_score = None, -_INFINITY if maximizing else _INFINITY
+        for code in self._moves(game, index, tt_move, False):
+            score = self._child(game, index, code, depth, ply, alpha, beta)
+            if maximizing:
+                if score > best_score:
+                    best_code, best_score = code, score
+                    if score > alpha: alpha = score
+            elif score < best_score:
+                best_code, best_score = code, score
+                if score < beta: beta = score
+            if alpha >= beta:
+                self.history[code] += depth * depth
+                break
+
+        flag = _UPPER if best_score <= original_alpha else (_LOWER if best_score >= original_beta else _EXACT)
+        self.tt[key] = (depth, _score_to_tt(best_score, ply), flag, best_code)
+        return best_score
+
+def main(argv=None):
+    from game_engine import GameEngine
+    from ai_player import RandomPlayer
+    parser = argparse.ArgumentParser(description='3人対戦の途中の局面で、max-n と paranoid の読めた深さと速さを比べます。')
+    parser.add_argument('--positions', type=int, default=10)
+    parser.add_argument('--time', type=float, default=0.4, help='1手に使う時間(秒)')
+    parser.add_argument('--depth', type=int, default=6, help='読む深さの上限')
+    parser.add_argument('--ruleset', default='normal', choices=['normal', 'custom'])
+    parser.add_argument('--kaiju', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    # ランダム同士で 9〜20 手進めた局面を作る
+    rng = random.Random(args.seed)
+    engines = []
+    while len(engines) < args.positions:
+        engine = GameEngine(args.ruleset, '3P', args.kaiju, seed=rng.getrandbits(32))
+        player = RandomPlayer(random.Random(rng.getrandbits(32)))
+        for _ in range(rng.randint(9, 20)):
+            if engine.game_over: break
+            engine.play(player.choose_action(engine))
+        if not engine.game_over: engines.append(engine)
+
+    for paranoid in (False, True):
+        search = MaxNSearch(depth=args.depth, time_limit=args.time, paranoid=paranoid)
+        depths, nodes, elapsed, over = [], 0, 0.0, 0.0
+        for engine in engines:
+            before = engine.game.hash
+            search.search(engine.game, engine.current_player)
+            assert engine.game.hash == before
+            depths.append(search.completed_depth)
+            nodes += search.nodes; elapsed += search.elapsed
+            over = max(over, search.elapsed - args.time)
+        name = 'paranoid' if paranoid else 'max-n'
+        print(f"{name:<9} 読めた深さ 平均 {sum(depths) / len(depths):.2f} (最小 {min(depths)}, 最大 {max(depths)}), "
+              f"{nodes / elapsed:,.0f} 局面/秒, 時間の超過 最大 {over * 1000:.1f}ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,333 @@
+# mcts.py
+
+# ===================================================================================
+# モンテカルロ木探索(MCTS)で行動を選ぶAIのファイルです。
+# 怪獣モードは「どの怪獣が動くか」「卵からどこにマークが出るか」など偶然の要素が多く、
+# 決まった深さまで読むアルファベータ探索とは相性がよくありません。MCTS は
+# 「最後までランダムに打ってみる(プレイアウト)」を時間いっぱい繰り返し、
+# よく勝てた手ほど深く調べていくので、偶然の要素もそのまま試行の中で扱えます。
+# - 時間制限(ミリ秒)に達したら、その時点で一番多く試した手を返す
+# - 木は「手の並び」だけで作り(偶然の結果は毎回引き直す)、局面は試行ごとに最初から再現する
+# - プレイアウトは整数のビットボードと事前計算した表だけで進め、途中でリストなどを作らない
+# - workers を2以上にすると、複数のプロセスで別々に探索して結果を足し合わせる(根の並列化)
+# 1秒あたりの試行回数(simulations_per_second)を記録するので、強さを計算量で調整できます。
+# プレイアウトは 3×3×3 の表で書いてあるため、それ以外の大きさのキューブでは AIPlayer に任せます。
+# ===================================================================================
+
+import math
+import multiprocessing
+import random
+import time
+from constants import *
+from cube_moves import NUM_CELLS, CELL_INDEX, F_FACE_CELLS, MOVE_DESTINATIONS, KAIJU_NEXT_STEP, FACE_NEIGHBOURS
+from bitboard import FULL_MASK, LINE_MASKS, rotate_bits, has_line, iter_bits
+from search import ROTATION_BASE, action_from_code
+
+_NUM_CODES = ROTATION_BASE + len(ALL_MOVES)
+_NO_RESULT = -1
+_DRAW = -2
+MAX_PLAYOUT_TURNS = 200  # これを超えたプレイアウトは引き分けとして扱う
+
+# 怪獣は、F面の外では KAIJU_NEXT_STEP の決まったマスへ、F面では FACE_NEIGHBOURS のどれかへ動く
+_F_FACE_SET = frozenset(F_FACE_CELLS)
+
+class PlayoutState:
+    """
+    探索用の軽い局面。プレイヤーごとのビットボード、怪獣の位置(マスの通し番号)、
+    卵のビットマスク、怪獣が動いた回数、手番のプレイヤーの番号だけを持ちます。
+    """
+    __slots__ = ('boards', 'kaiju', 'kaiju_mask', 'normal_eggs', 'golden_eggs', 'kaiju_moves', 'player', 'custom')
+
+    def __init__(self, boards, kaiju, normal_eggs, golden_eggs, kaiju_moves, player, custom):
+        self.boards = list(boards)
+        self.kaiju = list(kaiju)
+        self.kaiju_mask = sum(1 << i for i in kaiju)
+        self.normal_eggs = normal_eggs
+        self.golden_eggs = golden_eggs
+        self.kaiju_moves = kaiju_moves
+        self.player = player
+        self.custom = custom
+
+    @classmethod
+    def from_engine(cls, engine):
+        # ... (GameEngine の現在の局面から作る)
+        game = engine.game
+        players = engine.players()
+        eggs = {'normal': 0, 'golden': 0}
+        for pos, type in game.egg_positions.items(): eggs[type] |= 1 << CELL_INDEX[pos]
+        custom = engine.ruleset == 'custom'
+        return cls([game.bitboards[p] for p in players], [CELL_INDEX[pos] for pos in game.kaiju_positions] if custom else [],
+                   eggs['normal'], eggs['golden'], game.total_kaiju_moves, players.index(engine.current_player), custom)
+
+    def copy_from(self, other):
+        # ... (other の中身を、リストを作り直さずに写す)
+        self.boards[:] = other.boards
+        self.kaiju[:] = other.kaiju
+        self.kaiju_mask = other.kaiju_mask
+        self.normal_eggs = other.normal_eggs
+        self.golden_eggs = other.golden_eggs
+        self.kaiju_moves = other.kaiju_moves
+        self.player = other.player
+        self.custom = other.custom
+
+class _Node:
+    # ... (木の節。mover はこの節に来る手を指したプレイヤー、reward はそのプレイヤーから見た報酬の合計)
+    __slots__ = ('children', 'visits', 'reward', 'mover')
+    def __init__(self, mover):
+        self.children = {}
+        self.visits = 0
+        self.reward = 0.0
+        self.mover = mover
+
+class MCTSSearch:
+    """
+    PlayoutState を根にした MCTS。search() に局面と時間制限(ミリ秒)を渡すと、
+    根の各手について {手の番号: (試行回数, 報酬の合計)} を返します。
+    """
+    def __init__(self, rng=None, exploration=1.4):
+        self.rng = rng if rng is not None else random.Random()
+        self.exploration = exploration
+        self.simulations = 0
+        self.elapsed = 0.0
+        self._order = []
+
+    def search(self, root_state, time_limit_ms, cancel=None):
+        start = time.perf_counter()
+        deadline = start + time_limit_ms / 1000
+        root = _Node(None)
+        state = PlayoutState(root_state.boards, root_state.kaiju, 0, 0, 0, 0, root_state.custom)
+        self._order[:] = range(len(root_state.kaiju))
+        num_players = len(root_state.boards)
+        simulations = 0
+        # 時間が短すぎても、打ち切りを頼まれても、1回は試す(手を返せるように)
+        while not simulations or (time.perf_counter() < deadline and not (cancel and cancel.is_set())):
+            state.copy_from(root_state)
+            result, path = self._descend(root, state)
+            if result == _NO_RESULT: result = self._rollout(state)
+            root.visits += 1
+            for node in path:
+                node.visits += 1
+                node.reward += (1.0 if node.mover == result else 0.0) if result != _DRAW else 1.0 / num_players
+            simulations += 1
+        self.simulations = simulations
+        self.elapsed = time.perf_counter() - start
+        return {code: (child.visits, child.reward) for code, child in root.children.items()}
+
+    @property
+    def simulations_per_second(self):
+        return self.simulations / self.elapsed if self.elapsed > 0 else 0.0
+
+    # --- 木をたどる ---
+    def _descend(self, node, state):
+        # ... (UCT で木をたどり、まだ試していない手を1つ増やす。(勝敗, たどった節の一覧) を返す)
+        rng, exploration = self.rng, self.exploration
+        path = []
+        while True:
+            legal = self._legal_codes(state)
+            untried = [code for code in legal if code not in node.children]
+            if untried:
+                code = untried[rng.randrange(len(untried))]
+                child = node.children[code] = _Node(state.player)
+                path.append(child)
+                return self._play(state, code), path
+            log_visits = math.log(node.visits + 1)
+            best_code, best_value = None, -1.0
+            for code in legal:
+                child = node.children[code]
+                value = child.reward / child.visits + exploration * math.sqrt(log_visits / child.visits)
+                if value > best_value: best_code, best_value = code, value
+            node = node.children[best_code]
+            path.append(node)
+            result = self._play(state, best_code)
+            if result != _NO_RESULT: return result, path
+
+    def _legal_codes(self, state):
+        # ... (選べる手の番号の一覧: 置けるマス・卵のマス・16通りの回転)
+        eggs = state.normal_eggs | state.golden_eggs
+        occupied = state.kaiju_mask | eggs
+        for board in state.boards: occupied |= board
+        codes = list(iter_bits((FULL_MASK & ~occupied) | eggs))
+        codes.extend(range(ROTATION_BASE, _NUM_CODES))
+        return codes
+
+    # --- プレイアウト ---
+    def _rollout(self, state):
+        # ... (勝敗が付くまでランダムに進める。1手で勝てるなら必ずその手を選ぶ)
+        for _ in range(MAX_PLAYOUT_TURNS):
+            result = self._play(state, self._random_code(state))
+            if result != _NO_RESULT: return result
+        return _DRAW
+
+    def _random_code(self, state):
+        # ... (選べる手から1つを等確率で選ぶ。置いてラインが揃うマスがあればそこを選ぶ)
+        rng = self.rng
+        board = state.boards[state.player]
+        eggs = state.normal_eggs | state.golden_eggs
+        occupied = state.kaiju_mask | eggs
+        for b in state.boards: occupied |= b
+        free = FULL_MASK & ~occupied
+        for mask in LINE_MASKS:
+            hole = mask & ~board
+            if hole and not hole & (hole - 1) and hole & free: return hole.bit_length() - 1
+        num_free, num_eggs = free.bit_count(), eggs.bit_count()
+        pick = rng.randrange(num_free + num_eggs + len(ALL_MOVES))
+        if pick >= num_free + num_eggs: return ROTATION_BASE + pick - num_free - num_eggs
+        cells = free if pick < num_free else eggs
+        while True:
+            cell = rng.randrange(NUM_CELLS)
+            if cells >> cell & 1: return cell
+
+    def _play(self, state, code):
+        # ... (手番のプレイヤーの手を適用し、怪獣の番を進めて手番を渡す。勝敗が付いたらその結果を返す)
+        player = state.player
+        boards = state.boards
+        if code >= ROTATION_BASE:
+            move = ALL_MOVES[code - ROTATION_BASE]
+            for i, board in enumerate(boards): boards[i] = rotate_bits(board, move)
+            if state.kaiju:
+                destinations = MOVE_DESTINATIONS[move]
+                kaiju = state.kaiju
+                for i, pos in enumerate(kaiju): kaiju[i] = destinations[pos]
+                state.kaiju_mask = rotate_bits(state.kaiju_mask, move)
+        elif (state.normal_eggs | state.golden_eggs) >> code & 1:
+            self._crack_egg(state, code)
+        else:
+            boards[player] |= 1 << code
+
+        winner, num_winners = _NO_RESULT, 0
+        for i, board in enumerate(boards):
+            if has_line(board): winner, num_winners = i, num_winners + 1
+        if num_winners: return winner if num_winners == 1 else _DRAW
+
+        # 怪獣はマークを消すだけなので、怪獣の番の後に勝敗が変わることはない
+        if state.kaiju: self._kaiju_step(state)
+        state.player = (player + 1) % len(boards)
+        return _NO_RESULT
+
+    def _crack_egg(self, state, cell):
+        # ... (卵を使い、空いているマス(使った卵のマスを含む)からランダムに選んだ所にマークを出す)
+        bit = 1 << cell
+        golden = state.golden_eggs & bit
+        state.normal_eggs &= ~bit; state.golden_eggs &= ~bit
+        occupied = state.kaiju_mask | state.normal_eggs | state.golden_eggs
+        for board in state.boards: occupied |= board
+        spots = FULL_MASK & ~occupied
+        wanted = GOLDEN_EGG_MARKERS if golden else NORMAL_EGG_MARKERS
+        if spots.bit_count() <= wanted:
+            state.boards[state.player] |= spots
+            return
+        rng = self.rng
+        chosen = 0
+        while wanted:
+            spot = 1 << rng.randrange(NUM_CELLS)
+            if spots & spot and not chosen & spot: chosen |= spot; wanted -= 1
+        state.boards[state.player] |= chosen
+
+    def _kaiju_step(self, state):
+        # ... (GameEngine.kaiju_step と同じ規則で、ランダムに選んだ1〜全体の怪獣を1マスずつ動かす)
+        rng, order, kaiju = self.rng, self._order, state.kaiju
+        count = len(kaiju)
+        num_to_move = rng.randrange(count) + 1
+        for j in range(num_to_move):
+            # order の先頭から順に、残りからランダムに選んだ怪獣と入れ替えていく(部分的なシャッフル)
+            k = j + rng.randrange(count - j)
+            order[j], order[k] = order[k], order[j]
+            index = order[j]
+            start = kaiju[index]
+            others = state.kaiju_mask & ~(1 << start)
+            if start in _F_FACE_SET:
+                neighbours = FACE_NEIGHBOURS[start]
+                num_free = 0
+                for cell in neighbours:
+                    if not others >> cell & 1: num_free += 1
+                if not num_free: continue
+                pick = rng.randrange(num_free)
+                for cell in neighbours:
+                    if not others >> cell & 1:
+                        if not pick: break
+                        pick -= 1
+                target = cell
+            else:
+                target = KAIJU_NEXT_STEP[start]
+                if others >> target & 1: continue
+
+            kaiju[index] = target
+            target_bit = 1 << target
+            state.kaiju_mask = others | target_bit
+            boards = state.boards
+            for i, board in enumerate(boards): boards[i] = board & ~target_bit
+            state.kaiju_moves += 1
+            start_bit = 1 << start
+            if state.kaiju_moves % GOLDEN_EGG_INTERVAL == 0:
+                state.golden_eggs |= start_bit; state.normal_eggs &= ~start_bit
+            else:
+                state.normal_eggs |= start_bit; state.golden_eggs &= ~start_bit
+            state.normal_eggs &= ~target_bit; state.golden_eggs &= ~target_bit
+
+def _root_search(args):
+    # ... (根の並列化用。ワーカープロセスの中で1回分の探索をして、根の統計と試行回数を返す)
+    state, seed, time_limit_ms, exploration = args
+    search = MCTSSearch(random.Random(seed), exploration)
+    stats = search.search(state, time_limit_ms)
+    return stats, search.simulations
+
+class MCTSPlayer:
+    """
+    MCTS で行動を選ぶプレイヤー。AIPlayer と同じく choose_action(engine) で次の行動を返します。
+    time_limit_ms は1手に使う時間、workers は探索するプロセスの数です。
+    """
+    def __init__(self, marker='X', rng=None, time_limit_ms=300, exploration=1.4, workers=1):
+        self.marker = marker
+        self.rng = rng if rng is not None else random.Random()
+        self.time_limit_ms = time_limit_ms
+        self.exploration = exploration
+        self.workers = workers
+        self.search = MCTSSearch(self.rng, exploration)
+        self.simulations = 0
+        self.simulations_per_second = 0.0
+        self._pool = None
+        self._fallback = None
+
+    def make_move(self, engine):
+        return engine.apply_action(self.choose_action(engine))
+
+    def choose_action(self, engine, progress=None, cancel=None):
+        # ... (AIPlayer と同じ引数。反復深化はしないので progress は使わず、cancel がセットされたら試行をやめる)
+        if not engine.geometry.standard:
+            if self._fallback is None:
+                from ai_player import AIPlayer
+                self._fallback = AIPlayer(self.marker, self.rng, time_limit=self.time_limit_ms / 1000)
+            self.simulations = 0
+            return self._fallback.choose_action(engine, progress, cancel)
+        state = PlayoutState.from_engine(engine)
+        start = time.perf_counter()
+        if self.workers > 1:
+            stats = self._parallel_search(state)
+        else:
+            stats = self.search.search(state, self.time_limit_ms, cancel)
+            self.simulations = self.search.simulations
+        elapsed = time.perf_counter() - start
+        self.simulations_per_second = self.simulations / elapsed if elapsed > 0 else 0.0
+
+        code = max(stats, key=lambda c: (stats[c][0], stats[c][1]))
+        action = action_from_code(code)
+        if action[0] == 'place' and action[1] in engine.game.egg_positions: return ('egg', action[1])
+        return action
+
+    def _parallel_search(self, state):
+        # ... (各プロセスで別々の乱数で探索し、根の手ごとの試行回数と報酬を足し合わせる)
+        if self._pool is None: self._pool = multiprocessing.Pool(self.workers)
+        jobs = [(state, self.rng.getrandbits(32), self.time_limit_ms, self.exploration) for _ in range(self.workers)]
+        merged = {}
+        self.simulations = 0
+        for stats, simulations in self._pool.map(_root_search, jobs):
+            self.simulations += simulations
+            for code, (visits, reward) in stats.items():
+                total = merged.get(code, (0, 0.0))
+                merged[code] = (total[0] + visits, total[1] + reward)
+        return merged
+
+    def close(self):
+        # ... (並列探索用のプロセスを終了する)
+        if self._pool is not None:
+            self._pool.terminate(); self._pool = None
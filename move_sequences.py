@@ -0,0 +1,225 @@
+# move_sequences.py
+
+# ===================================================================================
+# 回転の手順(U R' M ...)を、結果が同じになるものは1通りだけにまとめるためのファイルです。
+# - 同じ層の回転は足し合わせられる: X X' と X' X は何もしないのと同じ、X X X は X'、X' X' は X X
+# - 平行な層の回転は、順番を入れ替えても結果が同じ(U・E・D どうし、L・M・R どうし、F・B どうし)
+# そこで手順を作るときは、次の2つの規則で「同じ結果の別の手順」を作らないようにします。
+#   1. 直前と同じ層を回すのは、X の次の X(半回転を X X と書く)だけ。X X X は作らない
+#   2. 平行な層が続くときは、決まった順(回転の一覧の並び)にしか並べない
+# どの層どうしが平行(入れ替えられる)かは、並べ替え表を2通りの順で合成して確かめるので、
+# N×N×N のキューブ(M1, M2, ... / E1, E2, ...)でもそのまま使えます。
+# 回転だけを何手も先まで読む解析(rotation_win など)は、これで調べる手順の数が大きく減ります。
+# 2人が交互に指す探索(search.py)では、相手が回転を戻すのも正当な手なのでこの規則では刈らず、
+# 同じ局面への合流は置換表で扱います。
+#
+# 使い方の例:
+#   from move_sequences import move_sequences
+#   seqs = move_sequences()                       (3×3×3 の表)
+#   seqs.canonical(['U', 'D', "U'", 'R'])         -> ['D', 'R']
+#   for seq in seqs.sequences(3): ...
+#   python move_sequences.py --depth 6            (手順の数と実効分岐数を表示する)
+#   python move_sequences.py --depth 4 --size 5 --distinct --positions 50
+# ===================================================================================
+
+import argparse
+import random
+import sys
+import time
+from cube_geometry import geometry
+
+class MoveSequences:
+    """
+    1つのキューブの大きさ(cube_geometry.CubeGeometry)について、回転の手順の規則をまとめたクラス。
+    next_moves(前の前, 前) で次に回してよい回転の一覧を、canonical(手順) で同じ結果になる
+    決まった形の手順を、counts(depth) で手順の数を返します。
+    """
+    def __init__(self, g):
+        self.geometry = g
+        self.moves = list(g.moves)
+        order = {move: i for i, move in enumerate(self.moves)}
+        # 層の番号は、その層の「正の向き」の回転(一覧で先に出てくる方)の並び順
+        self.layer, self.positive = {}, {}
+        for move in self.moves:
+            other = g.inverse[move]
+            first = move if order[move] <= order[other] else other
+            self.layer[move], self.positive[move] = order[first], move == first
+        layers = sorted(set(self.layer.values()))
+        sources = g.sources
+        def commute(a, b):
+            p, q = sources[self.moves[a]], sources[self.moves[b]]
+            return all(p[q[i]] == q[p[i]] for i in range(len(p)))
+        self.commutes = {a: {b: a == b or commute(a, b) for b in layers} for a in layers}
+        # 層ごとの、回した量(4分の1回転の数 0〜3)の書き方
+        self._spell = {}
+        for move in self.moves:
+            if self.positive[move]:
+                self._spell[self.layer[move]] = ((), (move,), (move, move), (g.inverse[move],))
+        # (前の前の回転, 前の回転) -> 次に回してよい回転。手順の最初は (None, None)
+        previous = [None] + self.moves
+        self._next = {(a, b): tuple(m for m in self.moves if self._allowed(a, b, m))
+                      for a in previous for b in previous if b is not None or a is None}
+
+    def _allowed(self, before, last, move):
+        if last is None: return True
+        layer, last_layer = self.layer[move], self.layer[last]
+        if layer == last_layer:
+            # 同じ層は X X(半回転)だけ。X' X' は X X と、X X X は X' と同じ
+            return move == last and self.positive[move] and before != move
+        # 平行な層が続くときは、層の番号の小さい順にだけ並べる
+        return not (self.commutes[layer][last_layer] and layer < last_layer)
+
+    def next_moves(self, before=None, last=None):
+        # ... (直前の2つの回転(なければ None)の後に、回してよい回転の一覧)
+        return self._next[(before, last)]
+
+    def is_canonical(self, seq):
+        before = last = None
+        for move in seq:
+            if not self._allowed(before, last, move): return False
+            before, last = last, move
+        return True
+
+    def canonical(self, seq):
+        """
+        手順 seq と同じ結果になる、決まった形の手順を返します(打ち消し合う回転は消えます)。
+        平行な層が続く部分をまとめて層ごとに回した量を足し、層の番号の順に書き直すことを、
+        形が変わらなくなるまで繰り返します(間の回転が消えると、前後がまとめられることがあるため)。
+        """
+        seq = list(seq)
+        while True:
+            runs = []   # 平行な層が続く部分ごとの {層: 回した量}
+            for move in seq:
+                layer = self.layer[move]
+                if not (runs and all(self.commutes[layer][other] for other in runs[-1])): runs.append({})
+                run = runs[-1]
+                run[layer] = (run.get(layer, 0) + (1 if self.positive[move] else 3)) % 4
+            result = [move for run in runs for layer in sorted(run) for move in self._spell[layer][run[layer]]]
+            if result == seq: return result
+            seq = result
+
+    def sequences(self, depth):
+        # ... (長さ depth の決まった形の手順を、すべて順に返す)
+        seq = []
+        def extend(before, last, remaining):
+            if not remaining:
+                yield tuple(seq); return
+            for move in self._next[(before, last)]:
+                seq.append(move)
+                yield from extend(last, move, remaining - 1)
+                seq.pop()
+        return extend(None, None, depth)
+
+    def counts(self, max_depth):
+        # ... (長さ 0〜max_depth の決まった形の手順の数。直前の2手ごとの数を数え上げるので、列挙しない)
+        states = {(None, None): 1}
+        result = [1]
+        for _ in range(max_depth):
+            following = {}
+            for (before, last), count in states.items():
+                for move in self._next[(before, last)]:
+                    following[(last, move)] = following.get((last, move), 0) + count
+            states = following
+            result.append(sum(states.values()))
+        return result
+
+    def branching_factors(self, max_depth):
+        # ... (長さごとの実効分岐数(1手増えると手順が何倍になるか))と、何も刈らないときの分岐数
+        counts = self.counts(max_depth)
+        return [counts[d] / counts[d - 1] for d in range(1, max_depth + 1)], len(self.moves)
+
+    def rotation_win(self, board, max_depth, canonical=True):
+        """
+        ビットボード board を回転だけで何手回せば F面に揃うかを、短い順に調べます。
+        (揃う手順 or None, 調べた局面の数) を返します。canonical=False なら規則を使わずに全部の手順を調べます(比較用)。
+        """
+        g = self.geometry
+        rotate, has_line = g.rotate_bits, g.has_line
+        if has_line(board): return [], 1
+        nodes = 0
+        all_moves = tuple(self.moves)
+        def dfs(board, before, last, remaining, seq):
+            nonlocal nodes
+            for move in (self._next[(before, last)] if canonical else all_moves):
+                nodes += 1
+                rotated = rotate(board, move)
+                seq.append(move)
+                if remaining == 1:
+                    if has_line(rotated): return True
+                elif dfs(rotated, last, move, remaining - 1, seq):
+                    return True
+                seq.pop()
+            return False
+        for depth in range(1, max_depth + 1):
+            seq = []
+            if dfs(board, None, None, depth, seq): return seq, nodes
+        return None, nodes
+
+_CACHE = {}
+
+def move_sequences(n=3, win_length=None):
+    # ... (大きさ n のキューブの MoveSequences。同じ大きさでは前に作ったものを返す)
+    g = geometry(n, win_length)
+    table = _CACHE.get(g)
+    if table is None: table = _CACHE[g] = MoveSequences(g)
+    return table
+
+def distinct_counts(table, max_depth):
+    # ... (長さ 0〜max_depth の手順で行ける、異なる並べ替えの数(何手目で初めて行けたかごと))
+    identity = tuple(range(table.geometry.num_cells))
+    seen, frontier, result = {identity}, [identity], [1]
+    sources = [table.geometry.sources[move] for move in table.moves]
+    for _ in range(max_depth):
+        following = []
+        for perm in frontier:
+            for src in sources:
+                child = tuple(perm[i] for i in src)
+                if child not in seen:
+                    seen.add(child); following.append(child)
+        frontier = following
+        result.append(len(following))
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='回転の手順の数と、決まった形にまとめたときの実効分岐数を表示します。')
+    parser.add_argument('--size', type=int, default=3, help='キューブの1面のマスの数(3〜7)')
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--distinct', action='store_true', help='実際に異なる並べ替えの数も数える(深さ4〜5くらいまで)')
+    parser.add_argument('--positions', type=int, default=0, help='ランダムな局面で rotation_win の調べた局面の数を比べる')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    table = move_sequences(args.size)
+    counts = table.counts(args.depth)
+    factors, naive = table.branching_factors(args.depth)
+    distinct = distinct_counts(table, args.depth) if args.distinct else None
+    print(f"{args.size}×{args.size}×{args.size}: 回転 {naive} 種類")
+    print(f"{'長さ':>4} {'全部の手順':>16} {'決まった形':>14} {'分岐数':>8}" + (f" {'新しく行ける並べ替え':>12}" if distinct else ''))
+    for d in range(1, args.depth + 1):
+        line = f"{d:>4} {naive ** d:>16} {counts[d]:>14} {factors[d - 1]:>8.2f}"
+        if distinct: line += f" {distinct[d]:>12}"
+        print(line)
+    print(f"実効分岐数(長さ {args.depth} まで): {counts[args.depth] ** (1 / args.depth):.2f} (何も刈らないと {naive})")
+
+    if args.positions:
+        # 回転だけで揃うまでを、規則あり・なしで読み比べる
+        g = table.geometry
+        rng = random.Random(args.seed)
+        depth = min(args.depth, 3)
+        totals = {True: [0, 0.0], False: [0, 0.0]}
+        for _ in range(args.positions):
+            board = 0
+            for i in rng.sample(range(g.num_cells), g.num_cells // 8): board |= 1 << i
+            found = {}
+            for canonical in (True, False):
+                start = time.perf_counter()
+                seq, nodes = table.rotation_win(board, depth, canonical)
+                totals[canonical][0] += nodes; totals[canonical][1] += time.perf_counter() - start
+                found[canonical] = seq is None or len(seq)
+            assert found[True] == found[False], found
+        for canonical, (nodes, elapsed) in totals.items():
+            print(f"rotation_win 深さ{depth}まで {'規則あり' if canonical else '規則なし'}: {nodes} 局面, {elapsed * 1000:.0f}ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
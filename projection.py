@@ -0,0 +1,98 @@
+# projection.py
+
+# ===================================================================================
+# 「この回転をしたら、F面に何が来るか」を、盤面を回さずに表を引くだけで答えるためのファイルです。
+# - 回転(または続けて2回の回転)ごとに、回転の後の F面の各マスへ、回転の前のどのマスが来るかの表
+# - それを F面のラインごとにまとめたビットマスク: board & mask == mask なら、回転の後にそのラインが揃う
+# 1手の回転の表はキューブの大きさごとに最初に1回だけ作り、2手の表は使ったものから作って覚えます。
+# 2手の表は move_sequences で決まった形にまとめてから覚えるので、U D と D U、U U' と何もしない、
+# のような同じ結果の組は同じ表を使います。
+# 卵は回転で動かない(その場に残る)ので、卵のマスは回転の後の F面の位置で調べます。
+# GameLogic.lines_completed_by() / threats_after() は、この表で今の局面をそのまま読みます。
+#
+# 使い方の例:
+#   projection = game.geometry.projection
+#   projection.completes(board, ('R',))            (R と回したら board のマークが F面で揃うか)
+#   game.lines_completed_by('R')                     -> {'O': [3]}
+#   game.threats_after('U', 'X', then="M'")          -> [('F', 1, 2)]
+# ===================================================================================
+
+from move_sequences import move_sequences
+
+class FaceProjection:
+    """
+    1つのキューブの大きさ(cube_geometry.CubeGeometry)の、回転の後の F面への写り方の表。
+    moves は回転の名前のタプル(() は回さない、('R',) は1手、('R', 'U') は R の後に U)です。
+    lines_completed() / completes() / threats() は、どれもビットボードを受け取って表を引くだけで、
+    盤面を回したりコピーしたりはしません。
+    """
+    def __init__(self, g):
+        self.geometry = g
+        self.win_length = g.win_length
+        self.sequences = move_sequences(g.n, g.win_length)
+        self._tables = {}   # 回転のタプル -> (ラインのマスク, {回転の前のマス: 回転の後の F面のマス})
+        self._tables[()] = self._build(())
+        for move in g.moves: self._tables[(move,)] = self._build((move,))
+
+    def _build(self, moves):
+        # ... (回転の後のマス i に来るのは、回転を後ろからたどった先のマス)
+        sources = self.geometry.sources
+        def trace(i):
+            for move in reversed(moves): i = sources[move][i]
+            return i
+        origin = {trace(i): i for i in self.geometry.f_face_cells}
+        line_masks = tuple(sum(1 << trace(i) for i in line) for line in self.geometry.lines)
+        return line_masks, origin
+
+    def tables(self, moves):
+        # ... (回転のタプルの表。2手以上は決まった形にまとめてから作り、同じ結果の組と共有する)
+        entry = self._tables.get(moves)
+        if entry is None:
+            key = tuple(self.sequences.canonical(moves))
+            entry = self._tables.get(key)
+            if entry is None: entry = self._tables[key] = self._build(key)
+            self._tables[moves] = entry
+        return entry
+
+    def precompute(self, depth=2):
+        # ... (長さ depth までの決まった形の手順の表を、まとめて先に作っておく)
+        for d in range(2, depth + 1):
+            for seq in self.sequences.sequences(d): self.tables(seq)
+
+    def f_sources(self, moves):
+        # ... (回転の後の F面の各マス(geometry.f_face_cells の順)に来る、回転の前のマス)
+        origin = self.tables(moves)[1]
+        where = {after: before for before, after in origin.items()}
+        return [where[i] for i in self.geometry.f_face_cells]
+
+    def completes(self, board, moves):
+        # ... (回転の後に board のマークが F面で揃うか)
+        for mask in self.tables(moves)[0]:
+            if board & mask == mask: return True
+        return False
+
+    def lines_completed(self, board, moves):
+        # ... (回転の後に揃うラインの番号(geometry.lines の並び)の一覧)
+        return [i for i, mask in enumerate(self.tables(moves)[0]) if board & mask == mask]
+
+    def threats(self, board, blocked, moves, eggs=0):
+        """
+        回転の後に、あと1つ置けば board のラインが揃う F面のマスのビットマスクを返します。
+        blocked は回転と一緒に動く置けないマス(ほかのプレイヤーのマーク・怪獣)、
+        eggs は回転しても動かない卵のマスです。
+        """
+        line_masks, origin = self.tables(moves)
+        almost = self.win_length - 1
+        result = 0
+        for mask in line_masks:
+            mine = board & mask
+            if mine.bit_count() == almost:
+                hole = mask & ~mine
+                if not hole & blocked:
+                    after = origin[hole.bit_length() - 1]
+                    if not eggs >> after & 1: result |= 1 << after
+        return result
+
+    def rotation_wins(self, board, depth=1):
+        # ... (回転だけで board のマークが F面で揃う、長さ depth までの決まった形の手順の一覧)
+        return [seq for d in range(1, depth + 1) for seq in self.sequences.sequences(d) if self.completes(board, seq)]
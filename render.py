@@ -0,0 +1,218 @@
+# render.py
+
+# ===================================================================================
+# 画面の描画を「レイヤー」にまとめて、変わったところだけを描き直すためのファイルです。
+# - Layer: 描画命令の一覧(ディスプレイリスト)を覚えておく部品。元になる状態(キー)が
+#          変わったときだけ描画命令を作り直す
+# - SceneBackend: Pythonista の scene モジュールに描く。レイヤーは画像に焼き付けて1回で貼る
+# - RecordingBackend: 何も描かずに描画命令を記録し、フレームごとの回数を数える
+#                     (iPad の外での確認・計測と、Layer のディスプレイリスト作りに使う)
+# - FrameStats: 1フレームの描画にかかった時間と描画命令の数の記録
+# 描画する側は backend.fill(...) / backend.rect(...) のように、scene の関数と同じ名前・引数で描きます。
+# ===================================================================================
+
+import time
+from collections import Counter, deque
+
+# scene モジュールの描画関数のうち、レイヤーに記録できるもの
+DRAW_COMMANDS = ('fill', 'no_fill', 'stroke', 'no_stroke', 'stroke_weight', 'tint', 'rect', 'ellipse', 'text', 'image')
+
+class RecordingBackend:
+    """
+    描画命令を実行せずに記録するバックエンド。
+    commands に (命令名, 引数) を順に積み、counts に命令ごとの回数を数えます。
+    begin_frame() / end_frame() で囲むと、フレームごとの回数が frames に残ります。
+    焼き付けたレイヤーは、描き直したときの命令と、貼り付け1回('layer')として数えます。
+    """
+    def __init__(self, bake=True):
+        self.bake = bake
+        self.commands = []
+        self.counts = Counter()
+        self.frames = []
+
+    def _record(self, name, args):
+        self.commands.append((name, args))
+        self.counts[name] += 1
+
+    def fill(self, *args): self._record('fill', args)
+    def no_fill(self): self._record('no_fill', ())
+    def stroke(self, *args): self._record('stroke', args)
+    def no_stroke(self): self._record('no_stroke', ())
+    def stroke_weight(self, *args): self._record('stroke_weight', args)
+    def tint(self, *args): self._record('tint', args)
+    def rect(self, *args): self._record('rect', args)
+    def ellipse(self, *args): self._record('ellipse', args)
+    def text(self, *args): self._record('text', args)
+    def image(self, *args): self._record('image', args)
+
+    def replay(self, commands):
+        for name, args in commands: self._record(name, args)
+
+    def draw_layer(self, layer):
+        # ... (焼き付けるレイヤーは、描き直したときだけ中身を数え、あとは貼り付け1回にする)
+        if self.bake and layer.bake:
+            if layer.cache is None:
+                layer.cache = len(layer.commands)
+                self.counts['bake'] += 1
+                self.counts['baked_commands'] += len(layer.commands)
+            self.counts['layer'] += 1
+        else:
+            self.replay(layer.commands)
+
+    def begin_frame(self):
+        self.commands.clear()
+        self.counts = Counter()
+
+    def end_frame(self):
+        # ... (このフレームの命令の回数を frames に残して返す)
+        self.frames.append(self.counts)
+        return self.counts
+
+    def draw_calls(self, counts=None):
+        # ... (実際に画面へ出る描画の回数。焼き付けの中身は数えず、貼り付けを1回と数える)
+        counts = self.counts if counts is None else counts
+        return sum(counts[name] for name in ('rect', 'ellipse', 'text', 'image', 'layer'))
+
+class SceneBackend:
+    """
+    Pythonista の scene モジュールに描くバックエンド。Scene.draw() の中で使います。
+    焼き付けるレイヤーは ui.ImageContext で画面と同じ大きさの画像に描いておき、
+    以後は image() 1回で貼ります。画像を貼れない環境では、記録した命令をそのまま流します。
+    """
+    def __init__(self, bake=True):
+        import scene, ui
+        self.scene, self.ui = scene, ui
+        self.bake = bake
+        self.size = (0, 0)
+        self.calls = 0
+
+    def begin_frame(self, size):
+        self.size = size
+        self.calls = 0
+
+    def _call(self, name, args):
+        self.calls += 1
+        getattr(self.scene, name)(*args)
+
+    def fill(self, *args): self._call('fill', args)
+    def no_fill(self): self._call('no_fill', ())
+    def stroke(self, *args): self._call('stroke', args)
+    def no_stroke(self): self._call('no_stroke', ())
+    def stroke_weight(self, *args): self._call('stroke_weight', args)
+    def tint(self, *args): self._call('tint', args)
+    def rect(self, *args): self._call('rect', args)
+    def ellipse(self, *args): self._call('ellipse', args)
+    def text(self, *args): self._call('text', args)
+    def image(self, *args): self._call('image', args)
+
+    def replay(self, commands):
+        for name, args in commands: self._call(name, args)
+
+    def draw_layer(self, layer):
+        if self.bake and layer.bake:
+            if layer.cache is None: layer.cache = self._bake(layer.commands)
+            try:
+                self.scene.image(layer.cache, 0, 0, *self.size)
+                self.calls += 1
+                return
+            except TypeError:
+                # scene.image() が ui.Image を受け付けない版では、焼き付けをやめる
+                self.bake = False
+        self.replay(layer.commands)
+
+    def _bake(self, commands):
+        # ... (記録した命令を ui の描画関数で画像に描く。scene は左下原点、ui は左上原点なので y を反転する)
+        ui = self.ui
+        width, height = self.size
+        state = {'fill': (1, 1, 1, 1), 'stroke': None, 'stroke_weight': 1, 'tint': (1, 1, 1, 1)}
+        color = lambda args: args[0] if len(args) == 1 else tuple(args)
+        with ui.ImageContext(width, height) as context:
+            for name, args in commands:
+                if name in ('fill', 'stroke', 'tint'): state[name] = color(args)
+                elif name == 'no_fill': state['fill'] = None
+                elif name == 'no_stroke': state['stroke'] = None
+                elif name == 'stroke_weight': state['stroke_weight'] = args[0]
+                elif name in ('rect', 'ellipse'):
+                    x, y, w, h = args[:4]
+                    path = (ui.Path.rect if name == 'rect' else ui.Path.oval)(x, height - y - h, w, h)
+                    if state['fill'] is not None: ui.set_color(state['fill']); path.fill()
+                    if state['stroke'] is not None and state['stroke_weight'] > 0:
+                        ui.set_color(state['stroke']); path.line_width = state['stroke_weight']; path.stroke()
+                elif name == 'text':
+                    string, font_name, font_size, x, y = args[:5]
+                    w, h = ui.measure_string(string, font=(font_name, font_size))
+                    ui.draw_string(string, (x - w / 2, height - y - h / 2, w, h), font=(font_name, font_size),
+                                   color=state['tint'], alignment=ui.ALIGN_CENTER)
+                elif name == 'image':
+                    image_name, x, y, w, h = args[:5]
+                    ui.Image.named(image_name).draw(x, height - y - h, w, h)
+            return context.get_image()
+
+class Layer:
+    """
+    描画の一部分(背景・盤面・ボタン・見出しなど)をまとめた部品。
+    draw(backend, key, *args) のたびに key を前回と比べ、変わっていたときだけ
+    paint(recorder, *args) を呼んで描画命令を記録し直します(renders がその回数)。
+    bake=True のレイヤーは、バックエンドが画像に焼き付けて、次に変わるまでそれを貼るだけにします。
+    """
+    def __init__(self, name, paint, bake=True):
+        self.name = name
+        self.paint = paint
+        self.bake = bake
+        self.key = None
+        self.commands = ()
+        self.cache = None
+        self.renders = 0
+        self._valid = False
+
+    def invalidate(self):
+        # ... (次の draw() で必ず描き直させる)
+        self._valid = False
+
+    def draw(self, backend, key, *args):
+        if not self._valid or key != self.key:
+            recorder = RecordingBackend()
+            self.paint(recorder, *args)
+            self.commands = tuple(recorder.commands)
+            self.key = key
+            self.cache = None
+            self.renders += 1
+            self._valid = True
+        backend.draw_layer(self)
+
+def draw_stylish_text(backend, text_str, font_name, font_size, x, y, main_color):
+    # ... (影付きの文字を描く)
+    shadow_offset = 2; backend.tint(0, 0, 0, 0.6); backend.text(text_str, font_name, font_size, x + shadow_offset, y - shadow_offset)
+    backend.tint(main_color); backend.text(text_str, font_name, font_size, x, y); backend.tint(1, 1, 1, 1)
+
+class FrameStats:
+    """
+    直近 window フレーム分の、描画にかかった時間(ミリ秒)と描画命令の数の記録。
+    begin() と end(draw_calls) で1フレームの描画を囲みます。
+    """
+    def __init__(self, window=240):
+        self.times = deque(maxlen=window)
+        self.calls = deque(maxlen=window)
+        self._start = None
+
+    def begin(self):
+        self._start = time.perf_counter()
+
+    def end(self, draw_calls=0):
+        if self._start is None: return
+        self.times.append((time.perf_counter() - self._start) * 1000)
+        self.calls.append(draw_calls)
+        self._start = None
+
+    def summary(self):
+        # ... (フレーム数・平均・中央値・95パーセンタイル・最大の時間と、平均の描画命令の数)
+        if not self.times: return {'frames': 0}
+        times = sorted(self.times)
+        pick = lambda q: times[min(len(times) - 1, int(q * len(times)))]
+        return {'frames': len(times), 'mean_ms': sum(times) / len(times), 'p50_ms': pick(0.5),
+                'p95_ms': pick(0.95), 'max_ms': times[-1], 'mean_draw_calls': sum(self.calls) / len(self.calls)}
+
+    def format(self):
+        s = self.summary()
+        if not s['frames']: return ''
+        return f"{s['mean_ms']:.2f}ms (p95 {s['p95_ms']:.2f}) / {s['mean_draw_calls']:.0f}命令"
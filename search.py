@@ -0,0 +1,264 @@
+# search.py
+
+# ===================================================================================
+# AIの「先読み」を担当するファイルです。
+# - ネガマックス法 + アルファベータ枝刈りによる、指定した深さまでの探索
+# - 置換表(一度調べた局面の結果を覚えておく表)
+# - 手の並べ替え(勝てる手・防ぐ手を先に調べて、枝刈りを効きやすくする)
+# 盤面は2人分のビットボード(整数)だけで表すため、局面のコピーは発生しません。
+# N×N×N のキューブ(cube_geometry)でも、同じ探索をその大きさの表で行えます。
+# ===================================================================================
+
+import time
+from constants import ALL_MOVES
+from cube_moves import NUM_CELLS, CELLS, CELL_INDEX, MOVE_DESTINATIONS
+from bitboard import FULL_MASK, LINE_MASKS, rotate_bits, has_line, iter_bits
+from cube_geometry import geometry
+
+WIN_SCORE = 100000
+_INFINITY = WIN_SCORE * 10
+
+def _line_weights(k):
+    # ... (ラインに自分のマークだけが c 個あるときの価値。あと1つで揃うラインを特に高くする。k=3 なら (0, 1, 12, 0))
+    return (0,) + tuple(12 if c == k - 1 else c for c in range(1, k)) + (0,)
+
+_LINE_WEIGHTS = _line_weights(3)
+
+# --- 手の表し方 ---
+# 0〜53 : そのマスにマークを置く
+# 54〜69: ALL_MOVES[code - 54] の回転
+# (大きいキューブでは、マスの数から先が geometry.moves の回転)
+ROTATION_BASE = NUM_CELLS
+ROTATION_CODES = range(ROTATION_BASE, ROTATION_BASE + len(ALL_MOVES))
+
+# 置換表の値の種類
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+# 勝ち負けが決まった局面の値(WIN_SCORE - 決まるまでの手数)は、大きさがこれより大きい
+_MATE_BOUND = WIN_SCORE - 100
+
+def _score_to_tt(score, ply):
+    # ... (置換表に入れる値。勝ち負けの値は、根からではなくその局面から決まるまでの手数で表す
+    # (置換表は次の手番にも残るので、根からの手数のままだと、別の手数の所で出会ったときに勝ちまでの手数がずれる))
+    if score > _MATE_BOUND: return score + ply
+    if score < -_MATE_BOUND: return score - ply
+    return score
+
+def _score_from_tt(score, ply):
+    # ... (_score_to_tt() で入れた値を、根から ply 手目の局面の値に戻す)
+    if score > _MATE_BOUND: return score - ply
+    if score < -_MATE_BOUND: return score + ply
+    return score
+
+def _cell_weights(g=None):
+    # ... (何もない盤面での各マスの価値。F面の中央ほど高く、1回の回転でF面に来られるマスは少しだけ)
+    g = g or geometry()
+    cells, line_masks = g.cells, g.line_masks
+    reach = {i for dests in g.destinations.values() for i, d in enumerate(dests) if cells[d][0] == 'F'}
+    weights = []
+    for i, (face, r, c) in enumerate(cells):
+        if face == 'F': weights.append(sum(1 for mask in line_masks if mask >> i & 1))
+        else: weights.append(1 if i in reach else 0)
+    return weights
+
+def _near_f_mask(g, weights):
+    return sum(1 << i for i, w in enumerate(weights) if w == 1 and g.cells[i][0] != 'F')
+
+CELL_WEIGHTS = _cell_weights()
+_NEAR_F_MASK = _near_f_mask(geometry(), CELL_WEIGHTS)
+
+class SearchTimeout(Exception):
+    pass
+
+def action_from_code(code):
+    # ... (手の番号を GameEngine の行動に変換する)
+    if code >= ROTATION_BASE: return ('rotate', ALL_MOVES[code - ROTATION_BASE])
+    return ('place', CELLS[code])
+
+def code_from_action(action):
+    kind, arg = action
+    if kind == 'rotate': return ROTATION_BASE + ALL_MOVES.index(arg)
+    return CELL_INDEX[arg]
+
+def evaluate(me, opp):
+    # ... (手番側から見た静的評価。F面のラインの「揃いかけ具合」と、F面に近いマークの数)
+    score = 0
+    for mask in LINE_MASKS:
+        a = me & mask; b = opp & mask
+        if a:
+            if not b: score += _LINE_WEIGHTS[a.bit_count()]
+        elif b:
+            score -= _LINE_WEIGHTS[b.bit_count()]
+    return score + (me & _NEAR_F_MASK).bit_count() - (opp & _NEAR_F_MASK).bit_count()
+
+class AlphaBetaSearch:
+    """
+    2人対戦用のネガマックス + アルファベータ探索。
+    search() に手番側と相手のビットボードを渡すと、最善と判断した手の番号と評価値を返します。
+    探索した局面数と、1秒あたりの局面数(nodes_per_second)を記録します。
+    geometry(cube_geometry.CubeGeometry)を渡すと、その大きさのキューブで探索します。
+    手の番号は action_from_code() / code_from_action() メソッドで行動と変換してください。
+    """
+    def __init__(self, depth=4, time_limit=None, max_quiet_moves=8, tt_limit=200000, geometry=None):
+        self.depth = depth
+        self.time_limit = time_limit          # 秒。None なら時間制限なし
+        self.max_quiet_moves = max_quiet_moves  # 根以外で調べる「静かな手」(置くだけの手)の数
+        self.tt_limit = tt_limit
+        self._set_geometry(geometry)
+        self.tt = {}
+        self.history = [0] * (self.rotation_base + len(self.moves))
+        self.nodes = 0
+        self.elapsed = 0.0
+        self.nodes_per_second = 0.0
+        self.completed_depth = 0
+
+    def _set_geometry(self, g):
+        # ... (探索で使う表をキューブの大きさに合わせる。3×3×3 ではこのファイルの定数と同じもの)
+        if g is None or g is geometry():
+            self.geometry = geometry()
+            self.rotation_base, self.moves = ROTATION_BASE, ALL_MOVES
+            self._rotate, self._has_line = rotate_bits, has_line
+            self._line_masks, self._full_mask = LINE_MASKS, FULL_MASK
+            self._line_weights, self._cell_weights, self._near_f_mask = _LINE_WEIGHTS, CELL_WEIGHTS, _NEAR_F_MASK
+        else:
+            self.geometry = g
+            self.rotation_base, self.moves = g.num_cells, g.moves
+            self._rotate, self._has_line = g.rotate_bits, g.has_line
+            self._line_masks, self._full_mask = g.line_masks, g.full_mask
+            self._line_weights, self._cell_weights = _line_weights(g.win_length), _cell_weights(g)
+            self._near_f_mask = _near_f_mask(g, self._cell_weights)
+        self._rotation_codes = range(self.rotation_base, self.rotation_base + len(self.moves))
+        self._almost = self.geometry.win_length - 1   # あと1つで揃うラインにある自分のマークの数
+
+    def action_from_code(self, code):
+        # ... (手の番号を GameEngine の行動に変換する)
+        if code >= self.rotation_base: return ('rotate', self.moves[code - self.rotation_base])
+        return ('place', self.geometry.cells[code])
+
+    def code_from_action(self, action):
+        kind, arg = action
+        if kind == 'rotate': return self.rotation_base + self.moves.index(arg)
+        return self.geometry.cell_index[arg]
+
+    def evaluate(self, me, opp):
+        # ... (evaluate() と同じ評価を、このキューブの大きさの表で行う)
+        weights, near = self._line_weights, self._near_f_mask
+        score = 0
+        for mask in self._line_masks:
+            a = me & mask; b = opp & mask
+            if a:
+                if not b: score += weights[a.bit_count()]
+            elif b:
+                score -= weights[b.bit_count()]
+        return score + (me & near).bit_count() - (opp & near).bit_count()
+
+    def search(self, me, opp, kaiju=0, eggs=0, progress=None, cancel=None):
+        # ... (反復深化で1手ずつ深く読み、時間切れになったら直前の深さの結果を返す)
+        # progress(深さ, 手の番号, 評価値) を渡すと、深さを1つ読み終えるたびにその時点の最善手を知らせる
+        # cancel(threading.Event など is_set() を持つもの)がセットされたら、時間切れと同じく打ち切る
+        self.nodes = 0
+        self.completed_depth = 0
+        self._deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self._cancel = cancel
+        if len(self.tt) > self.tt_limit: self.tt.clear()
+        start = time.perf_counter()
+        best = (None, 0)
+        try:
+            for depth in range(1, self.depth + 1):
+                best = self._root(me, opp, kaiju, eggs, depth)
+                self.completed_depth = depth
+                if progress is not None: progress(depth, *best)
+                if abs(best[1]) > _MATE_BOUND: break
+        except SearchTimeout:
+            pass
+        if best[0] is None: best = (self._ordered_moves(me, opp, kaiju, eggs, None, True)[0], 0)
+        self.elapsed = time.perf_counter() - start
+        self.nodes_per_second = self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+        return best
+
+    def _should_stop(self):
+        # ... (時間切れか、打ち切りを頼まれたか。局面を 1024 個調べるごとに確かめる)
+        if self._deadline is not None and time.perf_counter() > self._deadline: return True
+        return self._cancel is not None and self._cancel.is_set()
+
+    def _root(self, me, opp, kaiju, eggs, depth):
+        alpha, beta = -_INFINITY, _INFINITY
+        entry = self.tt.get((me, opp, kaiju, eggs))
+        best_code, best_score = None, -_INFINITY
+        for code in self._ordered_moves(me, opp, kaiju, eggs, entry[3] if entry else None, True):
+            score = self._child_score(me, opp, kaiju, eggs, code, depth, alpha, beta, 0)
+            if score > best_score: best_code, best_score = code, score
+            if score > alpha: alpha = score
+        self.tt[(me, opp, kaiju, eggs)] = (depth, best_score, _EXACT, best_code)
+        return best_code, best_score
+
+    def _child_score(self, me, opp, kaiju, eggs, code, depth, alpha, beta, ply):
+        # ... (手を指した後の局面の値を、手番側から見た値で返す)
+        has_line = self._has_line
+        if code >= self.rotation_base:
+            move = self.moves[code - self.rotation_base]
+            rotate = self._rotate
+            me2, opp2 = rotate(me, move), rotate(opp, move)
+            kaiju2 = rotate(kaiju, move) if kaiju else 0
+            mine, theirs = has_line(me2), has_line(opp2)
+            if mine and theirs: return 0
+            if mine: return WIN_SCORE - ply
+            if theirs: return -(WIN_SCORE - ply)
+        else:
+            me2, opp2, kaiju2 = me | (1 << code), opp, kaiju
+            if has_line(me2): return WIN_SCORE - ply
+        return -self._negamax(opp2, me2, kaiju2, eggs, depth - 1, -beta, -alpha, ply + 1)
+
+    def _negamax(self, me, opp, kaiju, eggs, depth, alpha, beta, ply):
+        self.nodes += 1
+        if not self.nodes & 1023 and self._should_stop(): raise SearchTimeout()
+        if depth <= 0: return self.evaluate(me, opp)
+
+        # 卵のマスには置けないので、卵だけが違う局面は別の局面(置換表は手をまたいで残るので、卵が減った後に古い値を使わない)
+        key = (me, opp, kaiju, eggs)
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                tt_score = _score_from_tt(tt_score, ply)
+                if tt_flag == _EXACT: return tt_score
+                if tt_flag == _LOWER and tt_score >= beta: return tt_score
+                if tt_flag == _UPPER and tt_score <= alpha: return tt_score
+
+        original_alpha = alpha
+        best_code, best_score = None, -_INFINITY
+        for code in self._ordered_moves(me, opp, kaiju, eggs, tt_move, False):
+            score = self._child_score(me, opp, kaiju, eggs, code, depth, alpha, beta, ply)
+            if score > best_score:
+                best_code, best_score = code, score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.history[code] += depth * depth
+                        break
+
+        flag = _UPPER if best_score <= original_alpha else (_LOWER if best_score >= beta else _EXACT)
+        self.tt[key] = (depth, _score_to_tt(best_score, ply), flag, best_code)
+        return best_score
+
+    def _ordered_moves(self, me, opp, kaiju, eggs, tt_move, is_root):
+        # ... (置換表の手 → 勝てる置き方 → 相手の勝ちを防ぐ置き方 → 回転 → 静かな置き方、の順に並べる)
+        empty = self._full_mask & ~(me | opp | kaiju | eggs)
+        almost = self._almost
+        wins = blocks = 0
+        for mask in self._line_masks:
+            hole = mask & empty
+            if hole and hole.bit_count() == 1:
+                if (me & mask).bit_count() == almost: wins |= hole
+                elif (opp & mask).bit_count() == almost: blocks |= hole
+        ordered = list(iter_bits(wins))
+        ordered.extend(iter_bits(blocks & ~wins))
+        history, cell_weights = self.history, self._cell_weights
+        ordered.extend(sorted(self._rotation_codes, key=history.__getitem__, reverse=True))
+        quiet = sorted(iter_bits(empty & ~(wins | blocks)), key=lambda i: cell_weights[i] * 64 + history[i], reverse=True)
+        if not is_root: quiet = quiet[:self.max_quiet_moves]
+        ordered.extend(quiet)
+        if tt_move is not None and tt_move in ordered:
+            ordered.remove(tt_move); ordered.insert(0, tt_move)
+        return ordered
@@ -0,0 +1,337 @@
+# server.py
+
+# ===================================================================================
+# ネットワーク越しに対局できるようにする、asyncio のゲームサーバーです。
+# 1つのプロセスで、たくさんの対局部屋(ルーム)を同時に動かします。
+# - 通信は TCP で、1行に1つの JSON を送り合う(JSON Lines)
+# - 手番の確認(自分の番か・怪獣の番でないか)と行動の適用は部屋ごとに GameEngine が行う
+# - 怪獣の番は、画面の self.delay の代わりに asyncio のタスクで時間をおいて進める
+# - 受け取りの遅い相手には送信待ちの上限を設け、あふれたら切断する(他の部屋を巻き込まない)
+#
+# やりとりの例(→ はクライアントから、← はサーバーから):
+#   → {"type": "join", "room": "abc", "ruleset": "custom", "mode": "2P", "kaiju": 3}
+#        room を省くと、同じ設定で待っている部屋に自動で入る
+#   ← {"type": "joined", "room": "abc", "player": "O", "waiting": 1}
+#   ← {"type": "start", "room": "abc", "player": "O", "players": ["O", "X"], "state": {...}}
+#   → {"type": "action", "id": 1, "action": "place F 1 1"}   (cli.py のスクリプトと同じ書き方)
+#   ← {"type": "result", "id": 1, "accepted": true}           (行動を送った人にだけ)
+#   ← {"type": "state", "by": "O", "action": "place F 1 1", "state": {...}}
+#   ← {"type": "kaiju", "moves": [[0, "F 1 1", "F 1 2"]], "state": {...}}
+#   ← {"type": "end", "winner": "O", "reason": "win"}
+# state の board は54マスを1文字ずつ並べた文字列です(. 空き / K 怪獣 / e 卵 / * 金の卵 / マーク)。
+#
+# 使い方の例:
+#   python server.py --port 8765
+#   python load_client.py --port 8765 --rooms 500 --concurrency 50   (負荷をかけて測る)
+# ===================================================================================
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+from constants import *
+from game_engine import GameEngine
+from cube_moves import CELLS, CELL_INDEX, NUM_CELLS
+from cli import parse_action, format_action
+
+QUEUE_LIMIT = 256          # 1つの接続で送信待ちにできるメッセージの数
+LINE_LIMIT = 4096          # 1行の長さの上限(バイト)
+KAIJU_DELAY = 0.5          # 行動から怪獣が動き出すまでの時間(秒)。画面の self.delay(0.5, ...) と同じ
+KAIJU_ANIMATION = 0.35     # 怪獣が動いてから次の手番になるまでの時間(秒)。画面のアニメーションの長さ
+MAX_TURNS = 1000           # この手数で決着しなければ打ち切り
+
+def _encode(message):
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+def board_string(game):
+    # ... (54マスの中身を1文字ずつ並べた文字列)
+    chars = ['.'] * NUM_CELLS
+    for player, board in game.bitboards.items():
+        while board:
+            low = board & -board; chars[low.bit_length() - 1] = player; board ^= low
+    for pos, egg_type in game.egg_positions.items(): chars[CELLS.index(pos)] = '*' if egg_type == 'golden' else 'e'
+    mask = game.kaiju_mask
+    while mask:
+        low = mask & -mask; chars[low.bit_length() - 1] = 'K'; mask ^= low
+    return ''.join(chars)
+
+def _cell_name(pos):
+    return f"{pos[0]} {pos[1]} {pos[2]}"
+
+class Connection:
+    """
+    1つのクライアントとの接続。send() は送信待ちの列に積むだけで、実際の書き込みは
+    別のタスクがまとめて行います。列が上限を超えたら、その相手は遅すぎるとみなして切断します。
+    """
+    def __init__(self, server, reader, writer, queue_limit):
+        self.server, self.reader, self.writer = server, reader, writer
+        self.queue = asyncio.Queue(queue_limit)
+        self.room = None
+        self.marker = None
+        self.closed = False
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+    def send(self, message):
+        if self.closed: return
+        try:
+            self.queue.put_nowait(_encode(message))
+        except asyncio.QueueFull:
+            self.server.stats['slow_disconnects'] += 1
+            self.close()
+
+    async def _write_loop(self):
+        # ... (送信待ちのメッセージを、溜まっている分まとめて書き込む)
+        try:
+            while True:
+                data = [await self.queue.get()]
+                while not self.queue.empty(): data.append(self.queue.get_nowait())
+                if data[-1] is None:
+                    self.writer.write(b''.join(data[:-1])); await self.writer.drain()
+                    break
+                self.writer.write(b''.join(data))
+                await self.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+
+    def close(self):
+        # ... (送信待ちを書き終えてから切断する。列があふれている場合はすぐに切断する)
+        if self.closed: return
+        self.closed = True
+        if self.room is not None: self.room.leave(self)
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            self._writer_task.cancel()
+
+class Room:
+    """
+    1つの対局部屋。全員がそろったら GameEngine で対局を始め、行動の受け付け・怪獣の番・
+    結果の知らせを行います。怪獣の番は asyncio のタスクで、時間をおいて進めます。
+    """
+    def __init__(self, server, name, ruleset, mode, num_kaiju, seed=None):
+        self.server = server
+        self.name = name
+        self.settings = (ruleset, mode, num_kaiju)
+        self.engine = GameEngine(ruleset, mode, num_kaiju, seed)
+        self.markers = self.engine.players()
+        self.seats = {}
+        self.started = False
+        self.finished = False
+        self._kaiju_task = None
+
+    @property
+    def full(self):
+        return len(self.seats) == len(self.markers)
+
+    def join(self, conn):
+        marker = self.markers[len(self.seats)]
+        self.seats[marker] = conn
+        conn.room, conn.marker = self, marker
+        conn.send({'type': 'joined', 'room': self.name, 'player': marker, 'waiting': len(self.markers) - len(self.seats)})
+        if self.full:
+            self.started = True
+            self.server.stats['rooms_started'] += 1
+            state = self.state()
+            for marker, seat in self.seats.items():
+                seat.send({'type': 'start', 'room': self.name, 'player': marker, 'players': self.markers, 'state': state})
+
+    def leave(self, conn):
+        # ... (誰かが抜けたら、対局はそこで終わり)
+        self.seats.pop(conn.marker, None)
+        conn.room = None
+        if not self.finished:
+            self._finish({'type': 'end', 'winner': None, 'reason': 'disconnected'})
+
+    def state(self):
+        engine = self.engine
+        return {'turn': engine.turn_count, 'current': engine.current_player, 'kaiju_phase': engine.awaiting_kaiju,
+                'status': engine.status_message, 'board': board_string(engine.game),
+                'game_over': engine.game_over, 'winner': engine.winner}
+
+    def broadcast(self, message):
+        for conn in list(self.seats.values()): conn.send(message)
+
+    def handle_action(self, conn, message_id, text):
+        # ... (行動を確かめて適用する。受け付けたかどうかは送った人にだけ返す)
+        engine = self.engine
+        reason = None
+        if not self.started or self.finished: reason = '対局中ではありません'
+        elif engine.awaiting_kaiju: reason = '怪獣の番です'
+        elif conn.marker != engine.current_player: reason = f'{engine.current_player}の番です'
+        elif text is not None and not isinstance(text, str): reason = '行動は文字列で送ってください'
+        else:
+            try:
+                action = parse_action(text or '')
+            except ValueError as e:
+                action, reason = None, str(e)
+            if action is None and reason is None: reason = '行動がありません'
+            elif action is not None and action[0] != 'rotate' and action[1] not in CELL_INDEX: action, reason = None, 'そのマスはありません'
+            elif action is not None and not engine.apply_action(action):
+                reason = engine.status_message if engine.pop_events() else '受け付けられない行動です'
+        if reason is not None:
+            self.server.stats['rejected'] += 1
+            conn.send({'type': 'result', 'id': message_id, 'accepted': False, 'reason': reason})
+            return
+        self.server.stats['actions'] += 1
+        engine.pop_events()
+        conn.send({'type': 'result', 'id': message_id, 'accepted': True})
+        self.broadcast({'type': 'state', 'by': conn.marker, 'action': format_action(action), 'state': self.state()})
+        self._after_turn()
+
+    def _after_turn(self):
+        engine = self.engine
+        if engine.game_over or engine.turn_count >= self.server.max_turns:
+            self._finish({'type': 'end', 'winner': engine.winner,
+                          'reason': ('win' if engine.winner else 'draw') if engine.game_over else 'max_turns'})
+        elif engine.awaiting_kaiju:
+            self._kaiju_task = asyncio.create_task(self._kaiju_phase())
+
+    async def _kaiju_phase(self):
+        # ... (画面と同じく、少し待ってから怪獣を動かし、動き終わるのを待ってから次の手番にする)
+        server = self.server
+        if server.kaiju_delay: await asyncio.sleep(server.kaiju_delay)
+        if self.finished: return
+        moves = self.engine.kaiju_step()
+        self.engine.pop_events()
+        self.broadcast({'type': 'kaiju', 'moves': [[i, _cell_name(start), _cell_name(end)] for i, start, end in moves],
+                        'state': self.state()})
+        if server.kaiju_animation: await asyncio.sleep(server.kaiju_animation)
+        if self.finished: return
+        self.engine.end_kaiju_phase()
+        self.broadcast({'type': 'state', 'by': None, 'action': None, 'state': self.state()})
+        self._kaiju_task = None
+        self._after_turn()
+
+    def _finish(self, message):
+        self.finished = True
+        self.server.stats['rooms_finished'] += 1
+        if self._kaiju_task is not None and self._kaiju_task is not asyncio.current_task(): self._kaiju_task.cancel()
+        self.broadcast(message)
+        for conn in self.seats.values(): conn.room = None
+        self.seats.clear()
+        self.server.remove_room(self)
+
+class GameServer:
+    """
+    部屋を管理するサーバー。start() で待ち受けを始め、接続ごとに handle_client() が動きます。
+    stats に開始・終了した部屋の数、受け付けた・断った行動の数、遅くて切断した接続の数を数えます。
+    """
+    def __init__(self, kaiju_delay=KAIJU_DELAY, kaiju_animation=KAIJU_ANIMATION, queue_limit=QUEUE_LIMIT, max_turns=MAX_TURNS):
+        self.kaiju_delay = kaiju_delay
+        self.kaiju_animation = kaiju_animation
+        self.queue_limit = queue_limit
+        self.max_turns = max_turns
+        self.rooms = {}
+        self.connections = set()
+        self.waiting = {}   # 設定 -> 人を待っている自動の部屋
+        self.stats = {'connections': 0, 'rooms_started': 0, 'rooms_finished': 0, 'actions': 0, 'rejected': 0, 'slow_disconnects': 0}
+        self._server = None
+        self._next_room = 0
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self._server = await asyncio.start_server(self.handle_client, host, port, limit=LINE_LIMIT)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for conn in list(self.connections): conn.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def remove_room(self, room):
+        self.rooms.pop(room.name, None)
+        if self.waiting.get(room.settings) is room: del self.waiting[room.settings]
+
+    def _join(self, conn, message):
+        # ... (名前の付いた部屋か、同じ設定で人を待っている部屋に入れる。なければ新しく作る)
+        ruleset = message.get('ruleset', 'normal')
+        mode = message.get('mode', '2P')
+        if ruleset not in ('normal', 'custom') or mode not in ('2P', '3P'):
+            conn.send({'type': 'error', 'message': 'ruleset は normal / custom、mode は 2P / 3P です'}); return
+        # 相手が送ってくる値なので、型を確かめてから使う(変な値で接続ごと落ちないよう、エラーを返すだけにする)
+        try:
+            num_kaiju = max(1, min(MAX_KAIJU_TOTAL, int(message.get('kaiju', 1))))
+        except (TypeError, ValueError, OverflowError):
+            conn.send({'type': 'error', 'message': 'kaiju は整数です'}); return
+        seed = message.get('seed')
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+            conn.send({'type': 'error', 'message': 'seed は整数か null です'}); return
+        name = message.get('room')
+        if name is not None and not isinstance(name, str):
+            conn.send({'type': 'error', 'message': 'room は文字列です'}); return
+        settings = (ruleset, mode, num_kaiju)
+        room = self.rooms.get(name) if name else self.waiting.get(settings)
+        if room is not None and (room.started or room.settings != settings):
+            conn.send({'type': 'error', 'message': f'部屋 {name} には入れません'}); return
+        if room is None:
+            if not name:
+                # 自動の部屋の名前は、同じ名前の部屋を自分で作った人がいれば飛ばす(名前が重なると remove_room が別の部屋を消す)
+                while not name or name in self.rooms:
+                    self._next_room += 1; name = f"room-{self._next_room}"
+            room = Room(self, name, ruleset, mode, num_kaiju, seed)
+            self.rooms[name] = room
+            if not message.get('room'): self.waiting[settings] = room
+        room.join(conn)
+        if room.full and self.waiting.get(settings) is room: del self.waiting[settings]
+
+    async def handle_client(self, reader, writer):
+        self.stats['connections'] += 1
+        conn = Connection(self, reader, writer, self.queue_limit)
+        self.connections.add(conn)
+        try:
+            while not conn.closed:
+                # 1行ずつ処理し終えてから次を読むので、送りすぎる相手からの受信も自然に待たされる
+                line = await reader.readline()
+                if not line: break
+                try:
+                    message = json.loads(line)
+                    kind = message.get('type')
+                except (ValueError, AttributeError):
+                    conn.send({'type': 'error', 'message': 'JSON として読めません'}); continue
+                if kind == 'action':
+                    if conn.room is None: conn.send({'type': 'result', 'id': message.get('id'), 'accepted': False, 'reason': '部屋に入っていません'})
+                    else: conn.room.handle_action(conn, message.get('id'), message.get('action'))
+                elif kind == 'join':
+                    if conn.room is not None: conn.send({'type': 'error', 'message': 'もう部屋に入っています'})
+                    else: self._join(conn, message)
+                elif kind == 'leave':
+                    if conn.room is not None: conn.room.leave(conn)
+                else:
+                    conn.send({'type': 'error', 'message': f'不明なメッセージです: {kind}'})
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            conn.close()
+            self.connections.discard(conn)
+
+async def serve(args):
+    server = GameServer(args.kaiju_delay, args.kaiju_animation, args.queue_limit)
+    port = await server.start(args.host, args.port)
+    print(f"{args.host}:{port} で待ち受けています")
+    try:
+        while True:
+            await asyncio.sleep(args.report or 3600)
+            if args.report: print(server.stats, f"部屋 {len(server.rooms)}")
+    finally:
+        await server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='キューブ○×ゲームの対局サーバー(TCP / JSON Lines)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--kaiju-delay', type=float, default=KAIJU_DELAY)
+    parser.add_argument('--kaiju-animation', type=float, default=KAIJU_ANIMATION)
+    parser.add_argument('--queue-limit', type=int, default=QUEUE_LIMIT)
+    parser.add_argument('--report', type=float, default=0, help='この秒数ごとに集計を表示する')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# symmetry.py
+
+# ===================================================================================
+# 盤面の「対称性」を扱うファイルです。
+# F面の中心を通る軸のまわりの回転(90°ずつ)と鏡映をあわせた8通りの変換は、
+# F面のラインをラインへ、回転操作を別の回転操作へ移すので、勝敗の上では同じ局面になります。
+# 8通りに変換した盤面のうち最小のものを「代表」とすれば、AIのキャッシュや定跡・解析で
+# 同じ意味の局面を1つにまとめられます。
+#
+# 変換は立体上の座標から作り、読み込み時に「どの回転操作も別の回転操作に移るか」を
+# 確かめたものだけを SYMMETRIES に残します。
+# ===================================================================================
+
+from constants import ALL_MOVES, PLAYER_MARKERS
+from cube_moves import NUM_CELLS, CELLS, CELL_INDEX, MOVE_SOURCES, KAIJU_NEXT_STEP
+from bitboard import LINE_MASKS, build_permutation_tables, permute_bits
+
+def _sticker_position(face, r, c):
+    # ... (マスの立体上の座標 (x: 右, y: 上, z: 手前) を2倍した整数で返す)
+    if face == 'F': return (2 * (c - 1), 2 * (1 - r), 3)
+    if face == 'B': return (2 * (1 - c), 2 * (1 - r), -3)
+    if face == 'U': return (2 * (c - 1), 3, 2 * (r - 1))
+    if face == 'D': return (2 * (c - 1), -3, 2 * (1 - r))
+    if face == 'L': return (-3, 2 * (1 - r), 2 * (c - 1))
+    return (3, 2 * (1 - r), 2 * (1 - c))
+
+# F面の軸(z軸)を動かさない8通りの変換。(x, y) だけを入れ替える
+_PLANE_TRANSFORMS = {
+    'identity':  lambda x, y: (x, y),
+    'rot90':     lambda x, y: (-y, x),
+    'rot180':    lambda x, y: (-x, -y),
+    'rot270':    lambda x, y: (y, -x),
+    'mirror_lr': lambda x, y: (-x, y),
+    'mirror_ud': lambda x, y: (x, -y),
+    'diag':      lambda x, y: (y, x),
+    'anti_diag': lambda x, y: (-y, -x),
+}
+
+def _build_symmetries():
+    # ... (各変換をマスの並べ替えにし、回転操作の対応表が作れるものだけを返す)
+    position_index = {_sticker_position(*cell): i for i, cell in enumerate(CELLS)}
+    move_by_sources = {MOVE_SOURCES[move]: move for move in ALL_MOVES}
+    line_masks = set(LINE_MASKS)
+    names, destinations, move_maps = [], [], []
+    for name, transform in _PLANE_TRANSFORMS.items():
+        dest = []
+        for cell in CELLS:
+            x, y, z = _sticker_position(*cell)
+            dest.append(position_index[transform(x, y) + (z,)])
+        # 回転操作 m を変換で写した並べ替え: 移動先 dest[i] の中身は dest[MOVE_SOURCES[m][i]] から来る
+        move_map = {}
+        for move in ALL_MOVES:
+            sources = [0] * NUM_CELLS
+            for i, source in enumerate(MOVE_SOURCES[move]): sources[dest[i]] = dest[source]
+            mapped = move_by_sources.get(tuple(sources))
+            if mapped is None: break
+            move_map[move] = mapped
+        else:
+            if {sum(1 << dest[i] for i in range(NUM_CELLS) if mask >> i & 1) for mask in LINE_MASKS} == line_masks:
+                names.append(name); destinations.append(tuple(dest)); move_maps.append(move_map)
+    return names, destinations, move_maps
+
+SYMMETRY_NAMES, SYMMETRIES, MOVE_MAPS = _build_symmetries()
+SYMMETRY_TABLES = [build_permutation_tables(dest) for dest in SYMMETRIES]
+# INVERSE_SYMMETRY[s]: 変換 s を元に戻す変換の番号
+INVERSE_SYMMETRY = [next(t for t, other in enumerate(SYMMETRIES) if all(other[d] == i for i, d in enumerate(dest)))
+                    for dest in SYMMETRIES]
+
+def _kaiju_symmetries():
+    # ... (怪獣がF面へ向かう道順は面ごとに決まっているので、その道順を変えない変換だけを選ぶ)
+    step = KAIJU_NEXT_STEP
+    return [s for s, dest in enumerate(SYMMETRIES) if all(dest[step[i]] == step[dest[i]] for i in range(NUM_CELLS))]
+
+KAIJU_SYMMETRIES = _kaiju_symmetries()
+
+def transform_action(action, symmetry):
+    # ... (GameEngine の行動を、変換 symmetry で写した盤面での行動に直す)
+    kind, arg = action
+    if kind == 'rotate': return (kind, MOVE_MAPS[symmetry][arg])
+    return (kind, CELLS[SYMMETRIES[symmetry][CELL_INDEX[arg]]])
+
+def canonical_form(boards, symmetries=None):
+    # ... (ビットボードの組を全ての変換で写し、辞書順で最小の組とその変換の番号を返す)
+    best, best_symmetry = None, 0
+    for s in (range(len(SYMMETRIES)) if symmetries is None else symmetries):
+        tables = SYMMETRY_TABLES[s]
+        key = tuple(permute_bits(board, tables) for board in boards)
+        if best is None or key < best: best, best_symmetry = key, s
+    return best, best_symmetry
+
+def position_boards(game):
+    # ... (GameLogic の局面を「各プレイヤーのマーク・怪獣・普通の卵・金の卵」のビットボードの組にする)
+    eggs = {'normal': 0, 'golden': 0}
+    for pos, type in game.egg_positions.items(): eggs[type] |= 1 << CELL_INDEX[pos]
+    return tuple(game.bitboards[player] for player in PLAYER_MARKERS) + (game.kaiju_mask, eggs['normal'], eggs['golden'])
+
+def canonical_position(game, side=None):
+    """
+    GameLogic の局面の代表キーと、そこへ写す変換の番号を返します。
+    side(手番のマーク)を渡すとキーの最後に加えます。
+    怪獣がいる局面では、怪獣の道順を変えない変換だけを使います。
+    代表の局面で選んだ行動は transform_action(action, INVERSE_SYMMETRY[s]) で元の局面に戻せます。
+    """
+    boards = position_boards(game)
+    key, symmetry = canonical_form(boards, KAIJU_SYMMETRIES if boards[len(PLAYER_MARKERS)] else None)
+    if side is not None: key += (side,)
+    return key, symmetry
@@ -0,0 +1,134 @@
+# tablebase.py
+
+# ===================================================================================
+# ノーマルモード(2人対戦)の「解析済みの局面の表」を引くためのファイルです。
+# 表は tablebase_gen.py で前もって作り、ファイルとして置いておきます。
+# - 局面は「手番側のマーク・相手のマーク」の組を、8通りの対称変換でまとめた代表のキー(64ビット)で表す
+# - ファイルはキーの順に並んだ固定長(10バイト)の記録の列なので、mmap で開いて二分探索するだけで引ける
+#   (読み込み時に全体を読んだり、辞書を作ったりしない)
+# - 値は手番側から見た勝ち負けと、決着までの手数(正: d 手で勝てる / 負: d 手で負ける)。0 の記録はない
+#
+# マークは増える一方なので、「マークが max_markers 個以下の局面」の表は、終盤ではなく序盤の表になります。
+# 表にあるのは、その範囲の中で勝ち負けが証明できた局面だけです。引き分け(回転で2人とも揃う)には
+# マークが6個以上いるので、作れる大きさの表(max_markers が4〜5)の範囲では起こらず、表には載りません。
+# 表にない局面は「引き分け」ではなく「分からない」です。これまで通り探索で手を選びます。
+#
+# ヘッダには表の中で一番長い決着までの手数(longest)も入れておきます。AIPlayer は、それが自分の
+# 探索の深さ以下なら、表を引きません(表で分かることは、探索でも分かるため)。
+# --markers 4 で作る表は最長 2 手(1手で勝てる局面と2手で負ける局面だけ)なので、既定の深さ 4 の
+# AIPlayer では使われません。役に立つのは、もっと大きい表を作ったときだけです。
+#
+# ファイルの形式(リトルエンディアン):
+#   ヘッダ 24バイト: 'CTTB', 形式の版(2バイト), プレイヤー数(1バイト), max_markers(1バイト), 記録の数(8バイト),
+#                    一番長い決着までの手数(2バイト), 空き(6バイト)
+#   記録 10バイト  : キー(8バイト), 値(符号付き2バイト)
+# ===================================================================================
+
+import mmap
+import os
+import struct
+from constants import ALL_MOVES
+from bitboard import FULL_MASK, rotate_bits, has_line, permute_bits, iter_bits
+from symmetry import SYMMETRY_TABLES
+from search import ROTATION_BASE
+
+MAGIC = b'CTTB'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sHBBQH6x')
+ENTRY = struct.Struct('<Qh')
+PATTERN_BITS = 10   # キーの下位ビット: マークのあるマスのうち、どれが手番側のものか(マークは最大10個)
+
+def position_key(me, opp):
+    # ... (局面のキー。上位にマークのあるマス、下位の10ビットに「小さい番号のマスから順に、手番側のマークか」)
+    occupied = me | opp
+    pattern, i, rest = 0, 0, occupied
+    while rest:
+        low = rest & -rest
+        if me & low: pattern |= 1 << i
+        i += 1; rest ^= low
+    return occupied << PATTERN_BITS | pattern
+
+def canonical_key(me, opp):
+    # ... (8通りの対称変換で写したキーのうち最小のもの。対称な局面は同じキーになる)
+    return min(position_key(permute_bits(me, tables), permute_bits(opp, tables)) for tables in SYMMETRY_TABLES)
+
+def move_outcome(me, opp, code):
+    # ... (手 code を指した結果。(1, None): その手で勝ち / (-1, None): 相手が揃って負け /
+    #      (0, None): 2人とも揃って引き分け / (None, (相手, 自分)): 続きの局面)
+    if code >= ROTATION_BASE:
+        move = ALL_MOVES[code - ROTATION_BASE]
+        me2, opp2 = rotate_bits(me, move), rotate_bits(opp, move)
+        mine, theirs = has_line(me2), has_line(opp2)
+        if mine or theirs: return (0 if mine and theirs else (1 if mine else -1)), None
+        return None, (opp2, me2)
+    me2 = me | 1 << code
+    if has_line(me2): return 1, None
+    return None, (opp, me2)
+
+class Tablebase:
+    """
+    tablebase_gen.py で作った表を mmap で開き、局面を二分探索で引くクラス。
+    probe(me, opp) は手番側から見た値(d 手で勝ち: d / d 手で負け: -d / 載っていない: None)を返し、
+    best_move(me, opp) は表で勝ち負けが分かる局面なら、最短で勝つ手(負けなら一番長く粘る手)の番号を返します。
+    longest は表の中で一番長い決着までの手数です。
+    """
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.players, self.max_markers, self.count, self.longest = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} は対応している表のファイルではありません")
+        self.probes = 0
+
+    @classmethod
+    def open(cls, path):
+        # ... (ファイルがあれば開き、なければ None を返す)
+        return cls(path) if path and os.path.exists(path) else None
+
+    def close(self):
+        self._map.close(); self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, key):
+        # ... (キーの値を二分探索で引く。O(log n) 回だけファイルの中身を読む)
+        self.probes += 1
+        data, lo, hi = self._map, 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key, value = ENTRY.unpack_from(data, HEADER.size + mid * ENTRY.size)
+            if mid_key < key: lo = mid + 1
+            elif mid_key > key: hi = mid
+            else: return value
+        return None
+
+    def probe(self, me, opp):
+        if (me | opp).bit_count() > self.max_markers: return None
+        return self.lookup(canonical_key(me, opp))
+
+    def move_value(self, me, opp, code):
+        # ... (手 code の手番側から見た値。続きの局面が表にない場合は None)
+        result, child = move_outcome(me, opp, code)
+        if child is None: return result if result else None
+        value = self.probe(*child)
+        if value is None: return None
+        return -value + 1 if value < 0 else -(value + 1)
+
+    def best_move(self, me, opp):
+        # ... (表で勝ち負けが分かる局面なら (手の番号, 値) を、そうでなければ None を返す)
+        value = self.probe(me, opp)
+        if value is None: return None
+        free = FULL_MASK & ~(me | opp)
+        best_code, best_value = None, None
+        for code in list(iter_bits(free)) + list(range(ROTATION_BASE, ROTATION_BASE + len(ALL_MOVES))):
+            move_value = self.move_value(me, opp, code)
+            if value > 0:
+                # 勝てる局面: 最短で勝てる手
+                if move_value is None or move_value <= 0: continue
+            elif move_value is None:
+                # 負ける局面: 一番長く粘れる手。値の分からない手は、相手がすぐ勝つ手として扱う
+                move_value = -2
+            if best_value is None or move_value < best_value: best_code, best_value = code, move_value
+        return (best_code, best_value) if best_code is not None else None
@@ -0,0 +1,236 @@
+# tablebase_gen.py
+
+# ===================================================================================
+# tablebase.py で引く「解析済みの局面の表」を作るためのファイルです(NumPy が必要)。
+# ノーマルモードの2人対戦は運の要素がないので、局面の勝ち負けを後ろから決めていけます。
+# - マークは増える一方なので、マークが k 個の局面の値は「k 個の局面(回転)」と「k + 1 個の局面(置く)」
+#   だけで決まる。そこで max_markers 個の局面から 0 個の局面へ向かって、1段ずつ解く
+# - 同じ段の中では回転で局面が行き来する(輪になる)ので、決着までの手数の短い順に、
+#   「負ける局面へ動ける局面は勝ち」「どう動いても勝たれる局面は負け」を繰り返し決める(後退解析)
+# - いちばん上の段から置いた先(max_markers + 1 個)は解かず、「次の手番がすぐ勝てるか」だけを見る
+# 証明できなかった局面(表の外の局面次第で決まるもの)は表に載せません。引き分けにはマークが6個以上いるので、
+# 作れる大きさの表の中には現れません。
+# 同じ局面の3回目の繰り返し(引き分け)は、その局面より前の手順が分からないので考えていません。
+#
+# 使い方の例:
+#   python tablebase_gen.py --markers 4 --workers 4 --out tablebase.bin
+#   (--markers 4 の表は最長 2 手で、深さ 4 の AIPlayer の探索で分かることしか載らない。役に立つのは 5 以上)
+# ===================================================================================
+
+import argparse
+import itertools
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from constants import *
+from cube_moves import NUM_CELLS, F_LINES
+from bitboard import LINE_MASKS, ROTATION_TABLES
+from symmetry import SYMMETRY_TABLES
+from tablebase import MAGIC, FORMAT_VERSION, HEADER, PATTERN_BITS
+
+_SYMMETRY_TABLES = np.array(SYMMETRY_TABLES, dtype=np.uint64)                           # (8, 7, 256)
+_ROTATION_TABLES = np.array([ROTATION_TABLES[move] for move in ALL_MOVES], dtype=np.uint64)  # (16, 7, 256)
+_LINE_MASKS = [np.uint64(mask) for mask in LINE_MASKS]
+# 「あと1つで揃う」形: (そのラインの残り2マス, 空いていてほしい1マス)
+_LINE_GAPS = [(np.uint64(sum(1 << i for i in line if i != gap)), np.uint64(1 << gap)) for line in F_LINES for gap in line]
+_SHIFTS = [np.uint64(8 * j) for j in range(7)]
+_BYTE = np.uint64(255)
+_ONE = np.uint64(1)
+
+# 回転の行き先の番号の代わりに入れる、その場で決着する回転の印
+_ROTATION_WIN, _ROTATION_LOSS, _ROTATION_DRAW = -1, -2, -3
+_NO_WIN = np.iinfo(np.int16).max
+ENTRY_DTYPE = np.dtype([('key', '<u8'), ('value', '<i2')])
+
+# --- 盤面の配列の一括処理 ---
+def _permute(boards, tables):
+    # ... (bitboard.permute_bits の配列版)
+    out = tables[0][boards & _BYTE]
+    for j in range(1, 7): out |= tables[j][(boards >> _SHIFTS[j]) & _BYTE]
+    return out
+
+def _has_line(boards):
+    result = np.zeros(boards.shape, dtype=bool)
+    for mask in _LINE_MASKS: result |= (boards & mask) == mask
+    return result
+
+def _keys(me, opp, markers):
+    # ... (tablebase.position_key の配列版。マークの数はどの局面も markers 個)
+    occupied = me | opp
+    pattern, rest = np.zeros_like(occupied), occupied.copy()
+    for i in range(markers):
+        low = rest & (~rest + _ONE)
+        pattern |= ((me & low) != 0).astype(np.uint64) << np.uint64(i)
+        rest ^= low
+    return occupied << np.uint64(PATTERN_BITS) | pattern
+
+def canonical_keys(me, opp, markers):
+    # ... (tablebase.canonical_key の配列版)
+    best = None
+    for tables in _SYMMETRY_TABLES:
+        keys = _keys(_permute(me, tables), _permute(opp, tables), markers)
+        best = keys if best is None else np.minimum(best, keys)
+    return best
+
+def _immediate_win(me, opp):
+    # ... (手番側(me)が次の1手で勝てるか。置いて揃える / 自分だけが揃う回転がある)
+    empty = ~(me | opp)
+    result = np.zeros(me.shape, dtype=bool)
+    for pair, gap in _LINE_GAPS: result |= ((me & pair) == pair) & ((empty & gap) != 0)
+    for tables in _ROTATION_TABLES:
+        result |= _has_line(_permute(me, tables)) & ~_has_line(_permute(opp, tables))
+    return result
+
+def enumerate_level(markers):
+    # ... (マークが markers 個で、まだ誰も揃っていない局面を全て作り、代表のキーの順に並べて返す)
+    cells = np.array(list(itertools.combinations(range(NUM_CELLS), markers)), dtype=np.uint64).reshape(-1, max(markers, 1))
+    bits = _ONE << cells
+    occupied = np.bitwise_or.reduce(bits, axis=1) if markers else np.zeros(1, dtype=np.uint64)
+    parts = []
+    for pattern in range(1 << markers):
+        me = np.zeros_like(occupied)
+        for i in range(markers):
+            if pattern >> i & 1: me |= bits[:, i]
+        opp = occupied ^ me
+        alive = ~(_has_line(me) | _has_line(opp))
+        me, opp = me[alive], opp[alive]
+        keys, index = np.unique(canonical_keys(me, opp, markers), return_index=True)
+        parts.append((keys, me[index], opp[index]))
+    keys = np.concatenate([p[0] for p in parts])
+    keys, index = np.unique(keys, return_index=True)
+    return keys, np.concatenate([p[1] for p in parts])[index], np.concatenate([p[2] for p in parts])[index]
+
+# --- 1段分の手の展開(プロセスごとに分けて実行できる) ---
+_shared = {}
+
+def _init_worker(markers, level_keys, next_keys, next_values):
+    _shared.update(markers=markers, level_keys=level_keys, next_keys=next_keys, next_values=next_values)
+
+def _lookup(keys, query):
+    index = np.searchsorted(keys, query)
+    assert (keys[np.minimum(index, len(keys) - 1)] == query).all(), "表にない局面があります"
+    return index
+
+def _expand(me, opp):
+    # ... (局面ごとに、回転の行き先(同じ段の番号か決着の印)と、置く手の値をまとめたものを返す)
+    # 置く手の値(手番側から見た値)は、勝てる最短の手数 / 負ける手の最長の手数 / 値の分からない手があるか にまとめる
+    markers, level_keys = _shared['markers'], _shared['level_keys']
+    next_keys, next_values = _shared['next_keys'], _shared['next_values']
+    n = len(me)
+    rotation_children = np.empty((len(ALL_MOVES), n), dtype=np.int32)
+    for r, tables in enumerate(_ROTATION_TABLES):
+        me2, opp2 = _permute(me, tables), _permute(opp, tables)
+        mine, theirs = _has_line(me2), _has_line(opp2)
+        going_on = ~(mine | theirs)
+        children = np.empty(n, dtype=np.int32)
+        children[going_on] = _lookup(level_keys, canonical_keys(opp2[going_on], me2[going_on], markers))
+        children[mine & ~theirs] = _ROTATION_WIN
+        children[theirs & ~mine] = _ROTATION_LOSS
+        children[mine & theirs] = _ROTATION_DRAW
+        rotation_children[r] = children
+
+    win = np.full(n, _NO_WIN, dtype=np.int16)
+    lose = np.zeros(n, dtype=np.int16)
+    unknown = np.zeros(n, dtype=bool)
+    for cell in range(NUM_CELLS):
+        bit = np.uint64(1 << cell)
+        index = np.nonzero(((me | opp) & bit) == 0)[0]
+        me2, opp2 = me[index] | bit, opp[index]
+        values = np.zeros(len(index), dtype=np.int16)
+        wins = _has_line(me2)
+        values[wins] = 1
+        rest = ~wins
+        if next_keys is not None:
+            child = next_values[_lookup(next_keys, canonical_keys(opp2[rest], me2[rest], markers + 1))]
+        else:
+            # 表の外の段: 相手がすぐ勝てることだけを使う
+            child = _immediate_win(opp2[rest], me2[rest]).astype(np.int16)
+        values[rest] = np.where(child < 0, 1 - child, np.where(child > 0, -(child + 1), 0))
+        win[index] = np.minimum(win[index], np.where(values > 0, values, _NO_WIN))
+        lose[index] = np.maximum(lose[index], np.where(values < 0, -values, 0))
+        unknown[index] |= values == 0
+    return rotation_children, win, lose, unknown
+
+def solve_level(rotation_children, win, lose, unknown):
+    # ... (1段分の後退解析。手数 d = 1, 2, ... の順に、d 手で勝てる局面・d 手で負ける局面を決める)
+    for children in rotation_children:
+        win = np.where(children == _ROTATION_WIN, np.minimum(win, 1), win)
+        lose = np.where(children == _ROTATION_LOSS, np.maximum(lose, 1), lose)
+        unknown = unknown | (children == _ROTATION_DRAW)
+    n = len(win)
+    values = np.zeros(n, dtype=np.int16)
+    known_wins = win[win < _NO_WIN]
+    last_static = max(int(known_wins.max()) if known_wins.size else 0, int(lose.max()) if n else 0)
+    open_moves = unknown | (win < _NO_WIN)
+    pending = np.arange(n)
+    d = 1
+    while pending.size:
+        children = rotation_children[:, pending]
+        inner = children >= 0
+        child_values = np.where(inner, values[np.where(inner, children, 0)], 0)
+        best_win = np.minimum(win[pending], np.where(inner & (child_values < 0), 1 - child_values, _NO_WIN).min(axis=0))
+        all_lose = ~open_moves[pending] & (~inner | (child_values > 0)).all(axis=0)
+        longest_loss = np.maximum(lose[pending], np.where(inner, child_values + 1, 0).max(axis=0))
+        won = best_win == d
+        lost = all_lose & (longest_loss == d) & ~won
+        values[pending[won]] = d
+        values[pending[lost]] = -d
+        settled = won | lost
+        if not settled.any() and d > last_static: break
+        pending = pending[~settled]
+        d += 1
+    return values
+
+def _expand_level(me, opp, markers, level_keys, next_keys, next_values, workers, chunk_size=20000):
+    # ... (段の局面をいくつかの塊に分け、workers 個のプロセスで並行して展開する)
+    chunks = [(me[i:i + chunk_size], opp[i:i + chunk_size]) for i in range(0, len(me), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(markers, level_keys, next_keys, next_values)
+        results = [_expand(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(markers, level_keys, next_keys, next_values)) as pool:
+            results = list(pool.map(_expand, *zip(*chunks)))
+    return (np.concatenate([r[0] for r in results], axis=1),) + tuple(np.concatenate([r[i] for r in results]) for i in (1, 2, 3))
+
+def generate(max_markers, workers=1, log=print):
+    # ... (マークが max_markers 個以下の局面を解き、表に載せる (キー, 値) の配列を返す)
+    if not 0 <= max_markers <= PATTERN_BITS: raise ValueError("max_markers が大きすぎます")
+    entries = []
+    next_keys = next_values = None
+    for markers in range(max_markers, -1, -1):
+        start = time.perf_counter()
+        keys, me, opp = enumerate_level(markers)
+        expanded = _expand_level(me, opp, markers, keys, next_keys, next_values, workers)
+        values = solve_level(*expanded)
+        proven = values != 0
+        table = np.empty(int(proven.sum()), dtype=ENTRY_DTYPE)
+        table['key'], table['value'] = keys[proven], values[proven]
+        entries.append(table)
+        log(f"マーク{markers}個: {len(keys)}局面 / 勝ち {int((values > 0).sum())} / 負け {int((values < 0).sum())} "
+            f"/ 最長 {int(np.abs(values).max()) if len(values) else 0}手 ({time.perf_counter() - start:.1f}秒)")
+        next_keys, next_values = keys, values
+    table = np.concatenate(entries)
+    return table[np.argsort(table['key'], kind='stable')]
+
+def write_tablebase(path, table, max_markers):
+    longest = int(np.abs(table['value']).max()) if len(table) else 0
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 2, max_markers, len(table), longest))
+        table.tofile(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ノーマルモードの解析済みの局面の表を作ります。')
+    parser.add_argument('--markers', type=int, default=4, help='解くマークの数の上限(5 以上は時間とメモリが大きく増える)')
+    parser.add_argument('--workers', type=int, default=1, help='並行して使うプロセスの数')
+    parser.add_argument('--out', default=TABLEBASE_FILE)
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    table = generate(args.markers, args.workers)
+    write_tablebase(args.out, table, args.markers)
+    print(f"{args.out}: {len(table)}局面 ({time.perf_counter() - start:.1f}秒)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
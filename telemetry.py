@@ -0,0 +1,235 @@
+# telemetry.py
+
+# ===================================================================================
+# ゲームの「どこで時間がかかっているか」を記録するファイルです(カクついたときの調査用)。
+# - Histogram: 値(時間・探索した局面の数など)の分布。幅が約19%ずつ広がる区間で数えるので、
+#              何万回記録しても大きくならず、中央値や99パーセンタイルもすぐ出せる
+# - Telemetry: フェーズ(ターンの処理・回転・勝利判定・AIの思考・update・draw など)ごとの時間、
+#              AIが1手で探索した局面の数、フレームの間隔、メモリの確保の数
+#              (sys.getallocatedblocks の増減)、GC で止まった時間を集める
+# 計測は instrument(obj, 'メソッド名', 'フェーズ名') で、そのオブジェクトのメソッドを包んで行います。
+# Telemetry を作らなければ何も包まないので、計測しないときの速さには一切影響しません。
+# AI は思考用のスレッドで、GC の記録はどのスレッドでも記録するので、記録と集計は1つのロックで守ります
+# (集計は、ロックを持って写しを取ってから行います)。
+# 集めたものは export_json(path) で集計を、export_chrome_trace(path) で chrome://tracing や
+# Perfetto (ui.perfetto.dev) で開けるタイムラインを書き出します。
+#
+# 使い方の例:
+#   tel = Telemetry()
+#   tel.instrument_engine(engine); tel.instrument_player(ai)
+#   ...                                   (いつも通りに対局を進める)
+#   print('\n'.join(tel.overlay_lines()))
+#   tel.export('session.trace.json')      (.trace.json なら Chrome のトレース、それ以外は集計の JSON)
+#   python cli.py --players ai,mcts --games 5 --telemetry session.trace.json
+# ===================================================================================
+
+import gc
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# 1オクターブ(2倍)を何区間に分けるか。4なら区間の幅は約19%
+_STEPS_PER_OCTAVE = 4
+
+class Histogram:
+    """
+    正の値の分布。add(value) で記録し、percentile(q) で q(0〜1)の位置の値を返します。
+    区間の上端の値を返すので、誤差は約19%以内(最大値を超えることはありません)。
+    lock を渡すと、記録と集計をそのロックで守ります(Telemetry はすべてのヒストグラムで1つのロックを使います)。
+    """
+    def __init__(self, lock=None):
+        self.buckets = {}   # 区間の番号 -> 回数(0以下の値は区間 None)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = lock if lock is not None else threading.RLock()
+
+    def add(self, value):
+        key = math.floor(math.log2(value) * _STEPS_PER_OCTAVE) if value > 0 else None
+        with self._lock:
+            self.buckets[key] = self.buckets.get(key, 0) + 1
+            self.count += 1
+            self.total += value
+            if value > self.max: self.max = value
+
+    def percentile(self, q):
+        # 別のスレッドが記録している最中でも数え直せるよう、ロックを持って写しを取ってから数える
+        with self._lock:
+            buckets, count, maximum = dict(self.buckets), self.count, self.max
+        if not count: return 0.0
+        rank = q * count
+        seen = buckets.get(None, 0)
+        if seen >= rank and seen: return 0.0
+        for key in sorted(k for k in buckets if k is not None):
+            seen += buckets[key]
+            if seen >= rank: return min(maximum, 2 ** ((key + 1) / _STEPS_PER_OCTAVE))
+        return maximum
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        # ... (回数・合計・平均・中央値・90/99 パーセンタイル・最大)
+        return {'count': self.count, 'total': self.total, 'mean': self.mean, 'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9), 'p99': self.percentile(0.99), 'max': self.max}
+
+class Telemetry:
+    """
+    フェーズごとの時間(ミリ秒)のヒストグラム・メモリの確保の数・タイムラインを集めるクラス。
+    instrument() でメソッドを包むと、呼ばれるたびに時間と、その間に増えたメモリのブロックの数を記録します。
+    detach() で包んだメソッドをすべて元に戻し、close() でさらに GC の記録もやめます。
+    タイムラインは直近 max_events 件だけ残します(ヒストグラムは全部の回数を数えます)。
+    record() はどのスレッドから呼んでもよく、集計や書き出しは記録の写しに対して行います。
+    """
+    def __init__(self, max_events=200000):
+        self.phases = {}        # フェーズ名 -> Histogram (ミリ秒)
+        self.values = {}        # 名前 -> Histogram (探索した局面の数など、時間以外の値)
+        self.allocations = {}   # フェーズ名 -> 呼び出し中に増えたメモリのブロックの数の合計
+        self.events = deque(maxlen=max_events)   # (フェーズ名, 開始, 終了, スレッド, 追加の値)
+        # 記録を守るロック。記録の途中(ロックを持ったまま)に同じスレッドで GC が走り、
+        # _on_gc からまた record() が呼ばれることがあるので、同じスレッドなら何度でも取れる RLock にする
+        self._lock = threading.RLock()
+        self.start = time.perf_counter()
+        self._patched = []      # (オブジェクト, メソッド名, 包む前にインスタンスにあったもの)
+        self._last_frame = None
+        self._gc_start = None
+        gc.callbacks.append(self._on_gc)
+
+    # --- 記録 ---
+    def record(self, phase, start, end, blocks=0, args=None):
+        # ... (フェーズ phase が start〜end(perf_counter の秒)にかかったことを記録する)
+        with self._lock:
+            histogram = self.phases.get(phase)
+            if histogram is None: histogram = self.phases[phase] = Histogram(self._lock)
+            histogram.add((end - start) * 1000)
+            self.allocations[phase] = self.allocations.get(phase, 0) + blocks
+            if args:
+                for name, value in args.items(): self.add_value(f"{phase}.{name}", value)
+            self.events.append((phase, start, end, threading.get_ident(), args))
+
+    def add_value(self, name, value):
+        with self._lock:
+            histogram = self.values.get(name)
+            if histogram is None: histogram = self.values[name] = Histogram(self._lock)
+            histogram.add(value)
+
+    def _snapshot(self):
+        # ... (フェーズと値のヒストグラムの辞書と、メモリのブロックの数の写し(ほかのスレッドが記録しても変わらない))
+        with self._lock:
+            return dict(self.phases), dict(self.values), dict(self.allocations)
+
+    def frame(self):
+        # ... (1フレームの始まり。前のフレームの始まりからの間隔を 'frame' として記録する)
+        now = time.perf_counter()
+        if self._last_frame is not None: self.record('frame', self._last_frame, now)
+        self._last_frame = now
+
+    def _on_gc(self, phase, info):
+        # ... (GC で止まった時間を 'gc' として記録する)
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            self.record('gc', self._gc_start, time.perf_counter(), args={'generation': info['generation']})
+            self._gc_start = None
+
+    # --- メソッドを包む ---
+    def instrument(self, obj, name, phase=None, args=None, frame=False):
+        """
+        obj.name を、呼ばれるたびに時間を記録するものに置き換えます(そのインスタンスだけ)。
+        phase はフェーズ名(省略するとメソッド名)。呼ぶ前の obj から名前を決める関数も渡せます。
+        args(obj, 戻り値) を渡すと、その返す辞書の値(探索した局面の数など)も記録します。
+        frame=True にすると、呼ばれるたびにフレームの始まりとして frame() も呼びます。
+        """
+        original = getattr(obj, name)
+        phase = phase or name
+        clock, blocks, record = time.perf_counter, sys.getallocatedblocks, self.record
+        def instrumented(*a, **kw):
+            if frame: self.frame()
+            label = phase(obj) if callable(phase) else phase
+            b0 = blocks(); t0 = clock()
+            result = original(*a, **kw)
+            t1 = clock()
+            record(label, t0, t1, blocks() - b0, args(obj, result) if args else None)
+            return result
+        self._patched.append((obj, name, vars(obj).get(name)))
+        setattr(obj, name, instrumented)
+
+    def instrument_engine(self, engine):
+        # ... (GameEngine のターンの処理・回転・勝利判定・怪獣の番を計測する)
+        self.instrument(engine, 'apply_action', 'turn')
+        self.instrument(engine, 'check_win')
+        self.instrument(engine, 'kaiju_step')
+        self.instrument(engine, 'end_kaiju_phase')
+        self.instrument(engine.game, 'rotate')
+
+    def instrument_player(self, player, phase='ai_move'):
+        # ... (AI の choose_action を計測する。AIPlayer は探索した局面の数、MCTSPlayer は試行の回数も記録する)
+        if hasattr(player, 'nodes'):
+            self.instrument(player, 'choose_action', phase, lambda p, _: {'nodes': p.nodes})
+        elif hasattr(player, 'simulations'):
+            self.instrument(player, 'choose_action', phase, lambda p, _: {'simulations': p.simulations})
+        else:
+            self.instrument(player, 'choose_action', phase)
+
+    def detach(self):
+        # ... (包んだメソッドを元に戻す。集めたものはそのまま残る)
+        for obj, name, previous in reversed(self._patched):
+            if previous is None: delattr(obj, name)
+            else: setattr(obj, name, previous)
+        self._patched.clear()
+
+    def close(self):
+        # ... (計測を終える。包んだメソッドを戻し、GC の記録もやめる)
+        self.detach()
+        if self._on_gc in gc.callbacks: gc.callbacks.remove(self._on_gc)
+
+    # --- 集計と書き出し ---
+    def summary(self):
+        # ... (フェーズごとの時間の分布(ミリ秒)と1回あたりのメモリのブロックの増減、値の分布)
+        recorded, values, allocations = self._snapshot()
+        phases = {}
+        for phase, histogram in sorted(recorded.items()):
+            phases[phase] = dict(histogram.summary(), blocks_per_call=allocations.get(phase, 0) / histogram.count)
+        return {'duration_s': time.perf_counter() - self.start, 'phases': phases,
+                'values': {name: histogram.summary() for name, histogram in sorted(values.items())}}
+
+    def overlay_lines(self, phases=('frame', 'update', 'kaiju_animation', 'draw', 'turn', 'ai_move', 'gc')):
+        # ... (画面の隅に重ねて表示する行。まだ記録のないフェーズは出さない)
+        recorded, values_by_name, _ = self._snapshot()
+        lines = []
+        for phase in phases:
+            histogram = recorded.get(phase)
+            if histogram is None: continue
+            line = (f"{phase:<15} p50 {histogram.percentile(0.5):6.2f} p99 {histogram.percentile(0.99):6.2f} "
+                    f"max {histogram.max:6.2f}ms n={histogram.count}")
+            for name in ('nodes', 'simulations'):
+                values = values_by_name.get(f"{phase}.{name}")
+                if values: line += f" {name} {values.mean:.0f}"
+            lines.append(line)
+        return lines
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def export_chrome_trace(self, path):
+        # ... (Chrome のトレース形式(完了イベント 'X'、時刻はマイクロ秒)で書き出す)
+        # 書き出している間にも AI のスレッドや GC で記録が増えるので、ロックを持って先に写しを取る
+        with self._lock:
+            recorded = list(self.events)
+        pid = os.getpid()
+        events = [{'name': phase, 'cat': 'game', 'ph': 'X', 'ts': (start - self.start) * 1e6,
+                   'dur': (end - start) * 1e6, 'pid': pid, 'tid': tid, 'args': args or {}}
+                  for phase, start, end, tid, args in recorded]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def export(self, path):
+        # ... (ファイル名が .trace.json で終われば Chrome のトレース、それ以外は集計の JSON)
+        if path.endswith('.trace.json'): self.export_chrome_trace(path)
+        else: self.export_json(path)
@@ -0,0 +1,96 @@
+# test_board_view.py
+
+# ===================================================================================
+# プレイ画面(board_view.BoardView)が、変わったレイヤーだけを描き直しているかを確かめるテストです。
+# iPad の scene モジュールは使わず、描画命令を記録するだけの render.RecordingBackend で描きます。
+# - 何も変わらないフレームでは、どのレイヤーも描き直さない(焼き付けた画像を貼るだけ)
+# - マークを置いただけならマークの層だけ、手番が変われば見出しとボタンも描き直す
+# - 回転ではマークの層を、マスの色が動いたときはマスの層も描き直す
+#
+# 使い方の例:
+#   python -m pytest test_board_view.py
+#   python -m unittest test_board_view
+# ===================================================================================
+
+import unittest
+from board_view import BoardView
+from game_engine import GameEngine
+from render import RecordingBackend
+
+SIZE = (1024, 768)
+
+class BoardViewTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine('normal', '2P', 1, seed=0)
+        self.view = BoardView()
+        self.backend = RecordingBackend()
+        self.frame()   # 最初のフレームで全部のレイヤーを作る
+
+    def frame(self, size=SIZE):
+        # ... (1フレーム描き、このフレームで描き直したレイヤーの名前の集合と、命令の回数を返す)
+        before = {layer.name: layer.renders for layer in self.view.layers}
+        self.backend.begin_frame()
+        self.view.update_layout(*size)
+        self.view.draw(self.backend, self.engine, '2P')
+        counts = self.backend.end_frame()
+        return {layer.name for layer in self.view.layers if layer.renders != before[layer.name]}, counts
+
+    def test_first_frame_renders_every_layer(self):
+        self.assertEqual([layer.renders for layer in self.view.layers], [1] * len(self.view.layers))
+
+    def test_idle_frame_renders_nothing(self):
+        for _ in range(3):
+            rendered, counts = self.frame()
+            self.assertEqual(rendered, set())
+            # 焼き付けた画像を貼るだけで、マスや文字の命令は1つも出ない
+            self.assertEqual(counts['layer'], len(self.view.layers))
+            self.assertEqual(self.backend.draw_calls(counts), len(self.view.layers))
+
+    def test_placement_renders_only_markers(self):
+        self.engine.game.place_marker(('F', 1, 1), 'O')
+        self.assertEqual(self.frame()[0], {'markers'})
+        self.assertEqual(self.frame()[0], set())
+
+    def test_turn_renders_markers_header_and_buttons(self):
+        # 手番が変わると、見出しの文字とボタンの色も変わる
+        self.assertTrue(self.engine.play(('place', ('F', 0, 0))))
+        self.assertEqual(self.frame()[0], {'markers', 'header', 'buttons'})
+
+    def test_rotation_moves_markers(self):
+        self.engine.game.place_marker(('F', 0, 2), 'O')
+        self.frame()
+        self.engine.game.rotate('R')
+        # マスの色はどこも同じなので、マスの層はそのまま
+        self.assertEqual(self.frame()[0], {'markers'})
+
+    def test_rotation_without_visible_change_renders_nothing(self):
+        # 色が全部同じで、マークも卵もなければ、回しても見た目は変わらない
+        self.engine.game.rotate('U')
+        self.assertEqual(self.frame()[0], set())
+
+    def test_rotation_with_coloured_tiles_renders_tiles(self):
+        game = self.engine.game
+        game.colors[:] = [f"#{i:06X}" for i in range(len(game.colors))]
+        self.assertEqual(self.frame()[0], {'tiles'})
+        game.rotate('R')
+        self.assertEqual(self.frame()[0], {'tiles'})
+        game.place_marker(('F', 1, 2), 'X'); game.rotate("R'")
+        self.assertEqual(self.frame()[0], {'tiles', 'markers'})
+
+    def test_egg_change_renders_markers(self):
+        self.engine.game.set_egg(('F', 2, 2), 'golden')
+        self.assertEqual(self.frame()[0], {'markers'})
+        self.engine.game.remove_egg(('F', 2, 2))
+        self.assertEqual(self.frame()[0], {'markers'})
+
+    def test_resize_renders_every_layer(self):
+        rendered, _ = self.frame((800, 600))
+        self.assertEqual(rendered, {layer.name for layer in self.view.layers})
+
+    def test_immediate_mode_renders_every_frame(self):
+        self.view.retained = False
+        for _ in range(2):
+            self.assertEqual(self.frame()[0], {layer.name for layer in self.view.layers})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+# test_cli.py
+
+# ===================================================================================
+# スクリプトファイルの行動(cli.py --script)と GameEngine.apply_action() が、
+# おかしな行動を落ちずに断るかを確かめるテストです。
+# - キューブにないマス(F 5 5 や Q 0 0)に置く、ない回転をする、は False / 終了コード 1 になる
+#
+# 使い方の例:
+#   python -m pytest test_cli.py
+#   python -m unittest test_cli
+# ===================================================================================
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import cli
+from game_engine import GameEngine
+
+BAD_ACTIONS = [('place', ('F', 5, 5)), ('place', ('Q', 0, 0)), ('place', ('F', -1, 0)), ('rotate', 'Z')]
+
+class InvalidActionTest(unittest.TestCase):
+    def test_engine_rejects_missing_cells(self):
+        for ruleset in ('normal', 'custom'):
+            engine = GameEngine(ruleset, '2P', 3, seed=0)
+            for action in BAD_ACTIONS:
+                with self.subTest(ruleset=ruleset, action=action):
+                    self.assertFalse(engine.apply_action(action))
+                    self.assertEqual(engine.turn_count, 0)
+                    self.assertEqual(engine.current_player, 'O')
+            # 断った後も、ふつうの行動はそのまま受け付ける
+            self.assertTrue(engine.play(('rotate', 'U')))
+
+    def run_script(self, text):
+        # ... (text をスクリプトファイルにして cli.py --script で進め、(終了コード, 表示) を返す)
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False) as f:
+            f.write(text)
+        try:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out): code = cli.main(['--script', f.name, '--seed', '0'])
+            return code, out.getvalue()
+        finally:
+            os.unlink(f.name)
+
+    def test_script_rejects_missing_cells(self):
+        for line in ('place F 5 5', 'place Q 0 0', 'rotate Z'):
+            with self.subTest(line=line):
+                code, output = self.run_script(f"place F 1 1\n{line}\n")
+                self.assertEqual(code, 1)
+                self.assertIn('2行目', output)
+
+    def test_script_accepts_valid_actions(self):
+        code, output = self.run_script("place F 1 1\nrotate U\nplace F 0 0\n")
+        self.assertEqual(code, 0)
+        self.assertIn('3手', output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# test_cube_moves.py
+
+# ===================================================================================
+# 並べ替え表の回転(cube_moves.MOVE_SOURCES / GameLogic.rotate)が、以前の「行や列を切り出して
+# 入れ替える」回転と同じ結果になるかを確かめるテストです。
+# - _LegacyCube は、並べ替え表にする前の GameLogic.rotate / rotate_face をそのまま写したもの
+#   (怪獣は、以前の GameScene.handle_rotate_action と同じく、マークの欄に印を付けて一緒に回す)
+# - ランダムな色・マーク・怪獣・卵の盤面で16種類の回転を比べ、回転とその逆回転で元に戻ることも確かめる
+#
+# 使い方の例:
+#   python -m pytest test_cube_moves.py
+#   python -m unittest test_cube_moves
+# ===================================================================================
+
+import random
+import unittest
+from constants import FACE_KEYS, ALL_MOVES, PLAYER_MARKERS
+from cube_moves import MOVE_SOURCES, INVERSE_MOVES, CELLS, apply_move
+from game_logic import GameLogic
+
+class _LegacyCube:
+    # ... (以前の回転。cube_state / marker_state は state[face][r][c] のリスト)
+    def __init__(self, cube_state, marker_state):
+        self.cube_state, self.marker_state = cube_state, marker_state
+
+    def rotate_face(self, face_key, clockwise=True):
+        # ... (指定された「面」だけを90度回転させる)
+        for state in [self.cube_state, self.marker_state]:
+            face = state[face_key]
+            if clockwise: state[face_key] = [list(row) for row in zip(*face[::-1])]
+            else: state[face_key] = [list(row) for row in zip(*face)][::-1]
+
+    def rotate(self, move):
+        # ... (指定された「層」(U, D, Mなど)を回転させる複雑な処理)
+        s, m = self.cube_state, self.marker_state
+        face_moves = {"U":('U',True), "U'":('U',False), "D":('D',True), "D'":('D',False), "R":('R',False), "R'":('R',True), "L":('L',False), "L'":('L',True), "F":('F',True), "F'":('F',False), "B":('B',True), "B'":('B',False)}
+        if move in face_moves: face, clockwise = face_moves[move]; self.rotate_face(face, clockwise)
+        # (以下、各層の回転ロジックは元のコードと同じ)
+        if move in ("D","D'"):
+            temp_s_f,temp_m_f=s['F'][2][:],m['F'][2][:]; temp_s_r,temp_m_r=s['R'][2][:],m['R'][2][:]; temp_s_b,temp_m_b=s['B'][2][:],m['B'][2][:]; temp_s_l,temp_m_l=s['L'][2][:],m['L'][2][:]
+            if move=="D": s['R'][2],m['R'][2]=temp_s_f,temp_m_f; s['F'][2],m['F'][2]=temp_s_l,temp_m_l; s['L'][2],m['L'][2]=temp_s_b,temp_m_b; s['B'][2],m['B'][2]=temp_s_r,temp_m_r
+            else: s['L'][2],m['L'][2]=temp_s_f,temp_m_f; s['F'][2],m['F'][2]=temp_s_r,temp_m_r; s['R'][2],m['R'][2]=temp_s_b,temp_m_b; s['B'][2],m['B'][2]=temp_s_l,temp_m_l
+        elif move in ("U","U'"):
+            temp_s_f,temp_m_f=s['F'][0][:],m['F'][0][:]; temp_s_r,temp_m_r=s['R'][0][:],m['R'][0][:]; temp_s_b,temp_m_b=s['B'][0][:],m['B'][0][:]; temp_s_l,temp_m_l=s['L'][0][:],m['L'][0][:]
+            if move=="U": s['L'][0],m['L'][0]=temp_s_f,temp_m_f; s['F'][0],m['F'][0]=temp_s_r,temp_m_r; s['R'][0],m['R'][0]=temp_s_b,temp_m_b; s['B'][0],m['B'][0]=temp_s_l,temp_m_l
+            else: s['R'][0],m['R'][0]=temp_s_f,temp_m_f; s['F'][0],m['F'][0]=temp_s_l,temp_m_l; s['L'][0],m['L'][0]=temp_s_b,temp_m_b; s['B'][0],m['B'][0]=temp_s_r,temp_m_r
+        elif move in ("R","R'"):
+            temp_s_u,temp_m_u=[s['U'][i][2] for i in range(3)],[m['U'][i][2] for i in range(3)]; temp_s_f,temp_m_f=[s['F'][i][2] for i in range(3)],[m['F'][i][2] for i in range(3)]; temp_s_d,temp_m_d=[s['D'][i][2] for i in range(3)],[m['D'][i][2] for i in range(3)]; temp_s_b,temp_m_b=[s['B'][i][0] for i in range(3)],[m['B'][i][0] for i in range(3)]
+            if move=="R":
+                for i in range(3): s['F'][i][2],m['F'][i][2]=temp_s_u[i],temp_m_u[i]; s['D'][i][2],m['D'][i][2]=temp_s_f[i],temp_m_f[i]; s['B'][2-i][0],m['B'][2-i][0]=temp_s_d[i],temp_m_d[i]; s['U'][i][2],m['U'][i][2]=temp_s_b[2-i],temp_m_b[2-i]
+            else:
+                for i in range(3): s['B'][2-i][0],m['B'][2-i][0]=temp_s_u[i],temp_m_u[i]; s['D'][i][2],m['D'][i][2]=temp_s_b[2-i],temp_m_b[2-i]; s['F'][i][2],m['F'][i][2]=temp_s_d[i],temp_m_d[i]; s['U'][i][2],m['U'][i][2]=temp_s_f[i],temp_m_f[i]
+        elif move in ("L","L'"):
+            temp_s_u,temp_m_u=[s['U'][i][0] for i in range(3)],[m['U'][i][0] for i in range(3)]; temp_s_f,temp_m_f=[s['F'][i][0] for i in range(3)],[m['F'][i][0] for i in range(3)]; temp_s_d,temp_m_d=[s['D'][i][0] for i in range(3)],[m['D'][i][0] for i in range(3)]; temp_s_b,temp_m_b=[s['B'][i][2] for i in range(3)],[m['B'][i][2] for i in range(3)]
+            if move=="L":
+                for i in range(3): s['B'][2-i][2],m['B'][2-i][2]=temp_s_u[i],temp_m_u[i]; s['D'][i][0],m['D'][i][0]=temp_s_b[2-i],temp_m_b[2-i]; s['F'][i][0],m['F'][i][0]=temp_s_d[i],temp_m_d[i]; s['U'][i][0],m['U'][i][0]=temp_s_f[i],temp_m_f[i]
+            else:
+                for i in range(3): s['F'][i][0],m['F'][i][0]=temp_s_u[i],temp_m_u[i]; s['D'][i][0],m['D'][i][0]=temp_s_f[i],temp_m_f[i]; s['B'][2-i][2],m['B'][2-i][2]=temp_s_d[i],temp_m_d[i]; s['U'][i][0],m['U'][i][0]=temp_s_b[2-i],temp_m_b[2-i]
+        elif move in ("M","M'"):
+            temp_s_u,temp_m_u=[s['U'][i][1] for i in range(3)],[m['U'][i][1] for i in range(3)]; temp_s_f,temp_m_f=[s['F'][i][1] for i in range(3)],[m['F'][i][1] for i in range(3)]; temp_s_d,temp_m_d=[s['D'][i][1] for i in range(3)],[m['D'][i][1] for i in range(3)]; temp_s_b,temp_m_b=[s['B'][i][1] for i in range(3)],[m['B'][i][1] for i in range(3)]
+            if move=="M":
+                for i in range(3): s['F'][i][1],m['F'][i][1]=temp_s_u[i],temp_m_u[i]; s['D'][i][1],m['D'][i][1]=temp_s_f[i],temp_m_f[i]; s['B'][2-i][1],m['B'][2-i][1]=temp_s_d[i],temp_m_d[i]; s['U'][i][1],m['U'][i][1]=temp_s_b[2-i],temp_m_b[2-i]
+            else:
+                for i in range(3): s['B'][2-i][1],m['B'][2-i][1]=temp_s_u[i],temp_m_u[i]; s['D'][i][1],m['D'][i][1]=temp_s_b[2-i],temp_m_b[2-i]; s['F'][i][1],m['F'][i][1]=temp_s_d[i],temp_m_d[i]; s['U'][i][1],m['U'][i][1]=temp_s_f[i],temp_m_f[i]
+        elif move in ("E","E'"):
+            temp_s_f,temp_m_f=s['F'][1][:],m['F'][1][:]; temp_s_r,temp_m_r=s['R'][1][:],m['R'][1][:]; temp_s_b,temp_m_b=s['B'][1][:],m['B'][1][:]; temp_s_l,temp_m_l=s['L'][1][:],m['L'][1][:]
+            if move=="E": s['L'][1],m['L'][1]=temp_s_f,temp_m_f; s['B'][1],m['B'][1]=temp_s_l,temp_m_l; s['R'][1],m['R'][1]=temp_s_b,temp_m_b; s['F'][1],m['F'][1]=temp_s_r,temp_m_r
+            else: s['R'][1],m['R'][1]=temp_s_f,temp_m_f; s['B'][1],m['B'][1]=temp_s_r,temp_m_r; s['L'][1],m['L'][1]=temp_s_b,temp_m_b; s['F'][1],m['F'][1]=temp_s_l,temp_m_l
+
+def _legacy_rotate(logic, move):
+    # ... (GameLogic の今の局面を以前の形に写し、以前の回転をして (色, マーク, 怪獣の位置) を返す)
+    cube = _LegacyCube({f: [[logic.cube_state[f][r][c] for c in range(3)] for r in range(3)] for f in FACE_KEYS},
+                       {f: [[logic.marker_state[f][r][c] for c in range(3)] for r in range(3)] for f in FACE_KEYS})
+    for i, (face, r, c) in enumerate(logic.kaiju_positions): cube.marker_state[face][r][c] = f'KAIJU_{i}'
+    cube.rotate(move)
+    kaiju = [None] * len(logic.kaiju_positions)
+    for face in FACE_KEYS:
+        for r in range(3):
+            for c in range(3):
+                marker = cube.marker_state[face][r][c]
+                if isinstance(marker, str) and marker.startswith('KAIJU_'):
+                    kaiju[int(marker.split('_')[1])] = (face, r, c)
+                    cube.marker_state[face][r][c] = None
+    return cube.cube_state, cube.marker_state, kaiju
+
+def _random_logic(seed):
+    # ... (どのマスも違う色で、マーク・怪獣・卵がランダムに散らばった局面)
+    rng = random.Random(seed)
+    logic = GameLogic(random.Random(seed))
+    logic.colors[:] = [f"{face}{r}{c}" for face, r, c in CELLS]
+    logic.place_kaiju(rng.randint(0, 6))
+    free = [pos for pos in CELLS if pos not in logic.kaiju_positions]
+    rng.shuffle(free)
+    for pos in free[:rng.randint(0, 20)]: logic.place_marker(pos, rng.choice(PLAYER_MARKERS))
+    for pos in free[20:20 + rng.randint(0, 4)]: logic.set_egg(pos, rng.choice(['normal', 'golden']))
+    return logic
+
+def _layers(logic):
+    return ({f: [[logic.cube_state[f][r][c] for c in range(3)] for r in range(3)] for f in FACE_KEYS},
+            {f: [[logic.marker_state[f][r][c] for c in range(3)] for r in range(3)] for f in FACE_KEYS})
+
+class CubeMovesTest(unittest.TestCase):
+    def test_all_moves_listed(self):
+        self.assertEqual(sorted(MOVE_SOURCES), sorted(ALL_MOVES))
+        self.assertEqual(len(ALL_MOVES), 16)
+
+    def test_rotate_matches_legacy(self):
+        for seed in range(40):
+            for move in ALL_MOVES:
+                logic = _random_logic(seed)
+                eggs = dict(logic.egg_positions)
+                colors, markers, kaiju = _legacy_rotate(logic, move)
+                logic.rotate(move)
+                with self.subTest(seed=seed, move=move):
+                    self.assertEqual(_layers(logic), (colors, markers))
+                    self.assertEqual(logic.kaiju_positions, kaiju)
+                    # 卵は回転で動かない
+                    self.assertEqual(logic.egg_positions, eggs)
+                    self.assertEqual(logic.hash, logic.compute_hash())
+
+    def test_apply_move_matches_legacy(self):
+        # 表だけで並べ替えたリストも、以前の回転の色と同じ並びになる
+        layer = [f"{face}{r}{c}" for face, r, c in CELLS]
+        for move in ALL_MOVES:
+            cube = _LegacyCube({f: [[f"{f}{r}{c}" for c in range(3)] for r in range(3)] for f in FACE_KEYS},
+                               {f: [[None] * 3 for _ in range(3)] for f in FACE_KEYS})
+            cube.rotate(move)
+            expected = [cube.cube_state[face][r][c] for face, r, c in CELLS]
+            self.assertEqual(apply_move(layer, move), expected, move)
+
+    def test_inverse_restores(self):
+        identity = list(range(len(CELLS)))
+        for move in ALL_MOVES:
+            inverse = INVERSE_MOVES[move]
+            self.assertEqual(apply_move(apply_move(identity, move), inverse), identity, move)
+            for seed in range(10):
+                logic = _random_logic(seed)
+                before = (_layers(logic), dict(logic.bitboards), list(logic.kaiju_positions), logic.kaiju_mask, logic.hash)
+                logic.rotate(move); logic.rotate(inverse)
+                after = (_layers(logic), dict(logic.bitboards), list(logic.kaiju_positions), logic.kaiju_mask, logic.hash)
+                self.assertEqual(after, before, (move, seed))
+
+if __name__ == '__main__':
+    unittest.main()
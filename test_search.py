@@ -0,0 +1,34 @@
+# test_search.py
+
+# ===================================================================================
+# 置換表に残した「勝ち・負けの値」が、別の手数の所で使われてもずれないかを確かめるテストです。
+# 勝ちの値は WIN_SCORE - (根から勝つまでの手数) なので、置換表には局面から勝つまでの手数で入れ、
+# 取り出すときに今の手数に直します(置換表は次の手番にも残るので、同じ局面に違う手数で出会う)。
+#
+# 使い方の例:
+#   python -m pytest test_search.py
+#   python -m unittest test_search
+# ===================================================================================
+
+import unittest
+from search import AlphaBetaSearch, WIN_SCORE, _INFINITY, CELL_INDEX
+from expectimax import ExpectimaxSearch
+
+# F面の上の段に2つ並べて、あと1つ置けば揃う局面
+ALMOST = (1 << CELL_INDEX[('F', 0, 0)]) | (1 << CELL_INDEX[('F', 0, 1)])
+
+class MateScoreTest(unittest.TestCase):
+    def test_alpha_beta_reuses_win_at_another_ply(self):
+        search = AlphaBetaSearch(depth=2)
+        self.assertEqual(search._negamax(ALMOST, 0, 0, 0, 1, -_INFINITY, _INFINITY, 3), WIN_SCORE - 3)
+        # 同じ局面を、置換表に残った値で 1 手目に読む
+        self.assertEqual(search._negamax(ALMOST, 0, 0, 0, 1, -_INFINITY, _INFINITY, 1), WIN_SCORE - 1)
+
+    def test_expectimax_reuses_win_at_another_ply(self):
+        search = ExpectimaxSearch(depth=2)
+        eggs = (0, 0, 0)
+        self.assertEqual(search._node(ALMOST, 0, 0, eggs, 1, -_INFINITY, _INFINITY, 3), WIN_SCORE - 3)
+        self.assertEqual(search._node(ALMOST, 0, 0, eggs, 1, -_INFINITY, _INFINITY, 1), WIN_SCORE - 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# test_server.py
+
+# ===================================================================================
+# 対戦サーバー(server.GameServer)が、おかしなメッセージで接続を落とさずにエラーを返すかと、
+# 部屋の名前が重ならないかを確かめるテストです。127.0.0.1 の空いているポートで実際に待ち受けます。
+#
+# 使い方の例:
+#   python -m pytest test_server.py
+#   python -m unittest test_server
+# ===================================================================================
+
+import asyncio
+import json
+import unittest
+from server import GameServer
+
+class _Client:
+    # ... (1行1メッセージの JSON を送り受けするだけの接続)
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+
+    async def send(self, message):
+        self.writer.write((json.dumps(message) + '\n').encode()); await self.writer.drain()
+
+    async def receive(self, kind=None):
+        # ... (次のメッセージ。kind を渡すとその種類が来るまで読み飛ばす)
+        while True:
+            message = json.loads(await asyncio.wait_for(self.reader.readline(), 2))
+            if kind is None or message['type'] == kind: return message
+
+    def close(self):
+        self.writer.close()
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = GameServer(kaiju_delay=0, kaiju_animation=0)
+        self.port = await self.server.start(port=0)
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients: client.close()
+        await self.server.close()
+
+    async def client(self):
+        client = await _Client.connect(self.port)
+        self.clients.append(client)
+        return client
+
+    async def test_malformed_join_keeps_connection(self):
+        client = await self.client()
+        for fields in ({'kaiju': None}, {'kaiju': [1]}, {'kaiju': 'abc'}, {'seed': [1]}, {'seed': 'x'}, {'room': {}}):
+            await client.send(dict(type='join', **fields))
+            self.assertEqual((await client.receive())['type'], 'error', fields)
+        await client.send({'type': 'join', 'kaiju': '3', 'seed': 5, 'ruleset': 'custom'})
+        self.assertEqual((await client.receive())['type'], 'joined')
+
+    async def test_non_string_action_is_rejected(self):
+        first, second = await self.client(), await self.client()
+        await first.send({'type': 'join', 'seed': 1}); await second.send({'type': 'join', 'seed': 1})
+        await first.receive('joined'); await second.receive('joined')
+        for i, action in enumerate((123, ['place'], {'place': 1}, 'place Q 0 0')):
+            await first.send({'type': 'action', 'id': i, 'action': action})
+            result = await first.receive('result')
+            self.assertEqual((result['id'], result['accepted']), (i, False), action)
+        # 断った後も同じ接続で指せる
+        await first.send({'type': 'action', 'id': 'ok', 'action': 'place F 1 1'})
+        self.assertTrue((await first.receive('result'))['accepted'])
+
+    async def test_auto_room_skips_taken_names(self):
+        named, auto = await self.client(), await self.client()
+        await named.send({'type': 'join', 'room': 'room-1'})
+        self.assertEqual((await named.receive('joined'))['room'], 'room-1')
+        await auto.send({'type': 'join', 'mode': '3P'})
+        joined = await auto.receive('joined')
+        self.assertNotEqual(joined['room'], 'room-1')
+        self.assertEqual(set(self.server.rooms), {'room-1', joined['room']})
+
+if __name__ == '__main__':
+    unittest.main()
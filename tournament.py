@@ -0,0 +1,207 @@
+# tournament.py
+
+# ===================================================================================
+# AI の設定どうしを大量に対戦させて、強さやルール変更の影響を調べるためのファイルです。
+# - 参加する設定(random / greedy / ai / ai:深さ)の全ての組み合わせと座席順で対局する
+# - ノーマル / 怪獣モード、2人 / 3人対戦をまとめて指定できる
+# - 対局は複数のプロセスに分けて実行し、結果はキューで1局ずつ受け取って集計する
+# - 勝率には95%信頼区間、平均手数には標準誤差から求めた区間を付けて表示する
+# 各対局の乱数は「全体のシード・組み合わせ・局の番号」から決まるので、
+# プロセスの数や実行順が変わっても同じ結果になります(AI の時間制限は使いません)。
+#
+# 使い方の例:
+#   python tournament.py --players random,greedy,ai,ai:6 --games 200 --seed 1
+#   python tournament.py --players greedy,ai --rulesets normal,custom --modes 2P,3P --workers 8 --json result.json
+# ===================================================================================
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+import traceback
+from constants import *
+from game_engine import GameEngine
+from cli import make_players, play_game
+
+def wilson_interval(successes, trials, z=1.96):
+    # ... (二項分布の割合の信頼区間(ウィルソンの方法)。試行が0回なら (0, 1))
+    if trials == 0: return (0.0, 1.0)
+    p = successes / trials
+    center = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+def make_matchups(configs, rulesets, modes):
+    # ... (対戦の組み合わせの一覧。各組み合わせは座席を1つずつずらした全ての並びで対局する)
+    matchups = []
+    for ruleset in rulesets:
+        for mode in modes:
+            seats = 3 if mode == '3P' else 2
+            if len(configs) >= seats:
+                lineups = list(itertools.combinations(configs, seats))
+            else:
+                lineups = [c for c in itertools.combinations_with_replacement(configs, seats) if len(set(c)) > 1]
+            for lineup in lineups:
+                matchups.append({'ruleset': ruleset, 'mode': mode, 'lineup': lineup,
+                                 'seatings': [lineup[i:] + lineup[:i] for i in range(seats)]})
+    return matchups
+
+def game_seed(seed, matchup_index, seating_index, game_index):
+    # ... (1局ごとの乱数のシード。どのプロセスで実行しても同じ値になる)
+    return random.Random(f"{seed}/{matchup_index}/{seating_index}/{game_index}").getrandbits(31)
+
+def play_one(task):
+    # ... (1局を実行し、結果を辞書で返す。ワーカープロセスの中で呼ばれる)
+    matchup_index, seating_index, game_index, ruleset, mode, seating, num_kaiju, seed, max_turns = task
+    rng = random.Random(seed)
+    engine = GameEngine(ruleset, mode, num_kaiju, seed)
+    players = make_players(','.join(seating), mode, rng, time_limit=None)
+    start = time.perf_counter()
+    result = play_game(engine, players, max_turns)
+    markers = PLAYER_MARKERS if mode == '3P' else PLAYER_MARKERS[:2]
+    winner = seating[markers.index(result)] if result in markers else result
+    return {'matchup': matchup_index, 'seating': seating_index, 'game': game_index,
+            'winner': winner, 'winning_seat': result, 'turns': engine.turn_count,
+            'seconds': time.perf_counter() - start}
+
+def _worker(task_queue, result_queue):
+    # ... (タスクを1つずつ取り出して対局し、結果をキューに返す。None が来たら終了)
+    for task in iter(task_queue.get, None):
+        try:
+            result_queue.put(('result', play_one(task)))
+        except Exception:
+            result_queue.put(('error', traceback.format_exc()))
+    result_queue.put(('done', os.getpid()))
+
+class Tally:
+    """
+    1つの組み合わせの集計。設定ごとの勝ち数、引き分け・打ち切りの数、手数を記録します。
+    """
+    def __init__(self, matchup):
+        self.matchup = matchup
+        self.games = 0
+        self.wins = {config: 0 for config in matchup['lineup']}
+        self.seat_wins = {}
+        self.draws = 0
+        self.unfinished = 0
+        self.turns = []
+
+    def add(self, result):
+        self.games += 1
+        self.turns.append(result['turns'])
+        if result['winner'] is None: self.draws += 1
+        elif result['winner'] == 'unfinished': self.unfinished += 1
+        else:
+            self.wins[result['winner']] += 1
+            self.seat_wins[result['winning_seat']] = self.seat_wins.get(result['winning_seat'], 0) + 1
+
+    def summary(self):
+        # ... (勝率・引き分け率とその信頼区間、平均手数とその区間をまとめた辞書)
+        n = self.games
+        mean = sum(self.turns) / n if n else 0.0
+        sd = math.sqrt(sum((t - mean) ** 2 for t in self.turns) / (n - 1)) if n > 1 else 0.0
+        margin = 1.96 * sd / math.sqrt(n) if n else 0.0
+        rate = lambda k: {'count': k, 'rate': k / n if n else 0.0, 'ci95': wilson_interval(k, n)}
+        return {'ruleset': self.matchup['ruleset'], 'mode': self.matchup['mode'], 'lineup': list(self.matchup['lineup']),
+                'games': n, 'wins': {config: rate(k) for config, k in self.wins.items()},
+                'seat_wins': self.seat_wins, 'draws': rate(self.draws), 'unfinished': rate(self.unfinished),
+                'turns': {'mean': mean, 'sd': sd, 'ci95': (mean - margin, mean + margin)}}
+
+def run_tournament(matchups, games, seed=0, num_kaiju=1, max_turns=1000, workers=None, progress=None):
+    """
+    全ての組み合わせを、座席順ごとに games 局ずつ対局させ、(集計の一覧, 経過秒数) を返します。
+    workers はプロセス数(省略時は CPU の数)。1 ならプロセスを作らずにそのまま実行します。
+    progress を渡すと、結果が届くたびに progress(届いた数, 全体の数) を呼びます。
+    """
+    tallies = [Tally(matchup) for matchup in matchups]
+    tasks = [(m, s, g, matchup['ruleset'], matchup['mode'], seating, num_kaiju,
+              game_seed(seed, m, s, g), max_turns)
+             for m, matchup in enumerate(matchups)
+             for s, seating in enumerate(matchup['seatings'])
+             for g in range(games)]
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    if workers == 1:
+        for done, task in enumerate(tasks, 1):
+            result = play_one(task)
+            tallies[result['matchup']].add(result)
+            if progress: progress(done, len(tasks))
+        return tallies, time.perf_counter() - start
+
+    task_queue, result_queue = multiprocessing.Queue(), multiprocessing.Queue()
+    for task in tasks: task_queue.put(task)
+    for _ in range(workers): task_queue.put(None)
+    processes = [multiprocessing.Process(target=_worker, args=(task_queue, result_queue), daemon=True)
+                 for _ in range(workers)]
+    for process in processes: process.start()
+    done = finished_workers = 0
+    try:
+        while finished_workers < workers:
+            kind, payload = result_queue.get()
+            if kind == 'error': raise RuntimeError(f"対局中にエラーが起きました:\n{payload}")
+            if kind == 'done':
+                finished_workers += 1
+                continue
+            tallies[payload['matchup']].add(payload)
+            done += 1
+            if progress: progress(done, len(tasks))
+    finally:
+        for process in processes:
+            if process.is_alive(): process.terminate()
+            process.join()
+    return tallies, time.perf_counter() - start
+
+def format_summary(summary):
+    # ... (1つの組み合わせの集計を、表示用の文字列にする)
+    lines = [f"[{summary['ruleset']} / {summary['mode']}] {' vs '.join(summary['lineup'])} ({summary['games']}局)"]
+    percent = lambda r: f"{r['rate']:6.1%} [{r['ci95'][0]:.1%}, {r['ci95'][1]:.1%}]"
+    for config, rate in summary['wins'].items():
+        lines.append(f"  {config:>10} の勝ち: {rate['count']:5d} {percent(rate)}")
+    lines.append(f"  {'引き分け':>8}: {summary['draws']['count']:5d} {percent(summary['draws'])}")
+    if summary['unfinished']['count']:
+        lines.append(f"  {'打ち切り':>8}: {summary['unfinished']['count']:5d} {percent(summary['unfinished'])}")
+    turns = summary['turns']
+    lines.append(f"  平均手数: {turns['mean']:.1f} [{turns['ci95'][0]:.1f}, {turns['ci95'][1]:.1f}]")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AI の設定どうしを複数プロセスで対戦させ、結果を集計します。')
+    parser.add_argument('--players', default='random,greedy,ai', help='参加する設定(random / greedy / ai / ai:深さ)')
+    parser.add_argument('--rulesets', default='normal', help='normal,custom のようにカンマ区切り')
+    parser.add_argument('--modes', default='2P', help='2P,3P のようにカンマ区切り')
+    parser.add_argument('--kaiju', type=int, default=1, help='怪獣の数(怪獣モードのみ)')
+    parser.add_argument('--games', type=int, default=100, help='組み合わせ・座席順ごとの対局数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-turns', type=int, default=300, help='この手数で決着しなければ打ち切り')
+    parser.add_argument('--workers', type=int, default=None, help='プロセス数(省略時は CPU の数)')
+    parser.add_argument('--json', default=None, help='集計を JSON で書き出すファイル')
+    args = parser.parse_args(argv)
+
+    configs = args.players.split(',')
+    matchups = make_matchups(configs, args.rulesets.split(','), args.modes.split(','))
+    if not matchups:
+        print("対戦の組み合わせがありません")
+        return 1
+    kaiju = max(1, min(MAX_KAIJU_TOTAL, args.kaiju))
+    progress = lambda done, total: print(f"\r{done}/{total}局", end='', file=sys.stderr, flush=True)
+    tallies, elapsed = run_tournament(matchups, args.games, args.seed, kaiju, args.max_turns, args.workers, progress)
+    print(file=sys.stderr)
+
+    summaries = [tally.summary() for tally in tallies]
+    total_games = sum(s['games'] for s in summaries)
+    for summary in summaries: print(format_summary(summary)); print()
+    print(f"合計 {total_games}局 / {elapsed:.2f}秒 ({total_games / elapsed:.1f} 局/秒, {args.workers or os.cpu_count()}プロセス)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'seed': args.seed, 'games_per_seating': args.games, 'seconds': elapsed,
+                       'games_per_second': total_games / elapsed, 'matchups': summaries}, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
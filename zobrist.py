@@ -0,0 +1,32 @@
+# zobrist.py
+
+# ===================================================================================
+# 局面を64ビットの「指紋」(ゾブリストハッシュ)で表すための乱数表をまとめたファイルです。
+# 「マス × 中身(各プレイヤーのマーク・怪獣・卵)」ごとに固定の乱数を割り当て、
+# 盤面にあるものの乱数を XOR した値を局面のハッシュとします。
+# マークを置く・消す・回転する、といった変化はその差分を XOR するだけで反映できるため、
+# 局面全体を調べ直さずに「同じ局面か」を判定できます。
+# ===================================================================================
+
+import random
+from constants import PLAYER_MARKERS
+from cube_moves import NUM_CELLS, MOVE_DESTINATIONS
+
+def build_zobrist_tables(num_cells, move_destinations):
+    # ... (マスの数と各回転の移動先の表から、下の7つの表をまとめて作る。N×N×N のキューブにも使う)
+    # 乱数は固定のシードで作るので、実行するたびに同じ値になる
+    rng = random.Random(0x5EED)
+    keys = lambda: [rng.getrandbits(64) for _ in range(num_cells)]
+    marker_keys = {player: keys() for player in PLAYER_MARKERS}
+    kaiju_keys = keys()
+    egg_keys = {'normal': keys(), 'golden': keys()}
+    side_keys = {player: rng.getrandbits(64) for player in PLAYER_MARKERS}
+    # moved_masks[move]: その回転で位置が変わるマスのビットマスク
+    moved_masks = {move: sum(1 << i for i, d in enumerate(dests) if d != i) for move, dests in move_destinations.items()}
+    # 回転でマス i の中身が移動したときに XOR する値: 移動前の乱数 ^ 移動後の乱数
+    deltas = lambda keys: {move: [keys[i] ^ keys[d] for i, d in enumerate(dests)] for move, dests in move_destinations.items()}
+    return (marker_keys, kaiju_keys, egg_keys, side_keys, moved_masks,
+            {player: deltas(keys) for player, keys in marker_keys.items()}, deltas(kaiju_keys))
+
+(MARKER_KEYS, KAIJU_KEYS, EGG_KEYS, SIDE_KEYS, MOVED_MASKS,
+ MARKER_ROTATION_DELTAS, KAIJU_ROTATION_DELTAS) = build_zobrist_tables(NUM_CELLS, MOVE_DESTINATIONS)